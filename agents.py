@@ -1,22 +1,32 @@
 import os
+import time
 from crewai import Agent, Crew, Task, Process
-from config import LLM_TYPE, OLLAMA_MODEL, OLLAMA_BASE_URL
+from config import LLM_TYPE, OLLAMA_MODEL, OLLAMA_BASE_URL, AGENT_PROCESS, LLM_REQUEST_TIMEOUT, LLM_QUERY_DEADLINE
 import json
 from typing import List, Dict, Any, Optional
 
 # Initialize the LLM
 def get_llm():
     """Initialize and return the language model using Ollama."""
-    from langchain_community.llms import Ollama
+    from llm_gateway import create_gateway_llm
+    from streaming import forward_llm_stream_events
     
-    # Configure Ollama LLM
-    llm = Ollama(
-        model=OLLAMA_MODEL,
+    # Configure the Ollama model through crewAI's LLM; requests are admitted
+    # through the shared LLM gateway and streamed chunks are forwarded to an
+    # active chat stream
+    forward_llm_stream_events()
+    llm = create_gateway_llm(
+        model=f"ollama/{OLLAMA_MODEL}",
         temperature=0.2,
-        base_url=OLLAMA_BASE_URL
+        base_url=OLLAMA_BASE_URL,
+        timeout=LLM_REQUEST_TIMEOUT,
+        stream=True
     )
     return llm
 
+# Role of the agent whose answer is shown to the user
+REPORTING_AGENT_ROLE = "Reporting Agent"
+
 # Define the agents
 def create_project_risk_manager(llm) -> Agent:
     """Create the Project Risk Manager agent."""
@@ -75,7 +85,7 @@ def create_project_status_tracking_agent(llm) -> Agent:
 def create_reporting_agent(llm) -> Agent:
     """Create the Reporting Agent."""
     return Agent(
-        role="Reporting Agent",
+        role=REPORTING_AGENT_ROLE,
         goal="Generate comprehensive risk reports and alerts for decision-makers",
         backstory="""You are a communication specialist who excels at transforming complex 
         risk data into clear, actionable reports. You know how to prioritize information for 
@@ -87,9 +97,14 @@ def create_reporting_agent(llm) -> Agent:
     )
 
 # Initialize the crew with all agents
-def initialize_crew() -> Crew:
-    """Initialize and return the crew with all agents."""
-    llm = get_llm()
+def initialize_crew(llm=None) -> Crew:
+    """
+    Initialize and return the crew with all agents.
+    
+    Args:
+        llm: Language model for the agents; by default get_llm() creates one whose Ollama calls go through the shared LLM gateway
+    """
+    llm = llm or get_llm()
     
     # Create all agents
     project_risk_manager = create_project_risk_manager(llm)
@@ -109,24 +124,85 @@ def initialize_crew() -> Crew:
         ],
         tasks=[],  # Tasks will be added dynamically based on user queries
         verbose=True,
-        process=Process.sequential  # Agents will work sequentially
+        process=Process.sequential  # Used by crew.kickoff() when AGENT_PROCESS is "sequential"; "parallel" runs the task graph scheduler instead
     )
     
     return crew
 
 # Function to get project risk assessment based on user query
-def get_project_risk_assessment(crew: Crew, user_query: str, selected_project: str) -> str:
+def get_project_risk_assessment(user_query: str, selected_project: str, crew: Optional[Crew] = None) -> str:
     """
     Get a project risk assessment based on the user's query.
     
     Args:
-        crew: The initialized crew of agents
         user_query: The user's question or request
         selected_project: The currently selected project or "All Projects"
+        crew: Crew to run; by default one is checked out of the shared crew pool
         
     Returns:
         A response string with the risk assessment
     """
+    from data_handlers import get_data_version
+    from query_router import answer_directly
+    from response_cache import get_response_cache
+    from streaming import emit_progress
+    from llm_gateway import current_session
+    from tracing import trace
+    
+    # Everything done for the question is recorded as one trace when tracing is on
+    with trace("chat turn", query=user_query, project=selected_project, session=current_session()) as turn:
+        # Factual questions (counts, top risks, comparisons, mitigations) are answered
+        # straight from the tools; only open-ended questions need the crew
+        direct_answer = answer_directly(user_query, selected_project)
+        if direct_answer is not None:
+            emit_progress("Answered directly from project data")
+            turn.set(path="direct")
+            return direct_answer
+        
+        # Serve a cached answer if the same question was asked about the same data
+        response_cache = get_response_cache()
+        data_version = get_data_version()
+        cached_response = response_cache.get(user_query, selected_project, data_version)
+        if cached_response is not None:
+            turn.set(path="response cache")
+            return cached_response
+        
+        from llm_gateway import llm_deadline
+        from request_context import request_scope
+        
+        # Bound the total time the question's LLM calls may take, queueing included;
+        # tools share one data snapshot and memoized results for the whole kickoff
+        with llm_deadline(LLM_QUERY_DEADLINE), request_scope():
+            if crew is None:
+                from crew_pool import get_crew_pool
+            
+                # Each query gets exclusive use of a pooled crew and its task list
+                on_wait = lambda position: emit_progress(f"Waiting for a free analysis crew (position {position} in queue)")
+                with get_crew_pool().checkout(on_wait=on_wait) as pooled_crew:
+                    result = run_crew(pooled_crew, user_query, selected_project)
+            else:
+                result = run_crew(crew, user_query, selected_project)
+        
+        response_cache.put(user_query, selected_project, data_version, result)
+        turn.set(path="crew", response_chars=len(result))
+        
+        # Return the final report from the reporting agent
+        return result
+
+def run_crew(crew: Crew, user_query: str, selected_project: str) -> str:
+    """
+    Build the task graph for a query on the given crew and execute it.
+    
+    Args:
+        crew: A crew not used by any other query while this runs
+        user_query: The user's question or request
+        selected_project: The currently selected project or "All Projects"
+        
+    Returns:
+        The reporting agent's final report
+    """
+    from streaming import emit_progress, set_stage, stage
+    from tracing import get_tracer, payload_size, span
     from tasks import (
         create_analyze_market_conditions_task,
         create_assess_project_status_task,
@@ -186,7 +262,53 @@ def get_project_risk_assessment(crew: Crew, user_query: str, selected_project: s
     ]
     
     # Execute the tasks and get the result
-    result = crew.kickoff()
+    with span("crew.kickoff", "crew", process=AGENT_PROCESS, tasks=len(crew.tasks)) as kickoff:
+        if AGENT_PROCESS == "parallel":
+            # Run independent tasks concurrently, each as soon as its dependencies finish
+            from task_scheduler import run_task_graph
+            result = run_task_graph(
+                crew,
+                on_task_start=lambda task, _: emit_progress(f"{task.agent.role} started"),
+                on_task_complete=lambda task, _: emit_progress(f"{task.agent.role} finished")
+            )
+        else:
+            # Tasks run one after another, so each one spans from the previous task's end to its own
+            task_started = [time.perf_counter()]
+            roles = [task.agent.role for task in crew.tasks]
+            completed = [0]
+            
+            def on_task_complete(output) -> None:
+                emit_progress(f"{output.agent} finished")
+                get_tracer().record(f"task: {output.agent}", "task", task_started[0], **payload_size(str(output)))
+                task_started[0] = time.perf_counter()
+                # The callback runs on the kickoff thread, so the next task's tokens get its stage
+                completed[0] += 1
+                if completed[0] < len(roles):
+                    set_stage(roles[completed[0]])
+            
+            crew.task_callback = on_task_complete
+            with stage(roles[0]):
+                result = str(crew.kickoff())
+        kickoff.set(**payload_size(result))
     
-    # Return the final report from the reporting agent
     return result
+
+def stream_project_risk_assessment(user_query: str, selected_project: str, crew: Optional[Crew] = None):
+    """
+    Start a project risk assessment in the background and stream its output.
+    
+    Args:
+        user_query: The user's question or request
+        selected_project: The currently selected project or "All Projects"
+        crew: Crew to run; by default one is checked out of the shared crew pool
+        
+    Returns:
+        A ResponseStream carrying progress events, the reporting agent's
+        tokens as they are generated, and the final response
+    """
+    from streaming import ResponseStream, run_streaming
+    
+    # The reporting agent produces the answer the user sees
+    stream = ResponseStream(final_stage=REPORTING_AGENT_ROLE)
+    run_streaming(stream, get_project_risk_assessment, user_query, selected_project, crew)
+    return stream
@@ -0,0 +1,380 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from config import DEFAULT_PROJECTS
+
+# Where generated benchmark datasets and local vector indexes are kept between runs
+BENCHMARK_DATA_DIRECTORY = ".benchmark_data"
+BENCHMARK_SEED = 7
+
+# Dimension of the hashed stand-in embeddings used when no recording covers a text
+STUB_EMBEDDING_DIMENSION = 256
+
+DEFAULT_RISK_SCALES = [1_000, 100_000, 1_000_000]
+DEFAULT_PROJECT_SCALES = [5, 500]
+DEFAULT_DAYS_BACK = [7, 30, 90, 365]
+
+# Regressions smaller than these are treated as noise whatever the relative change
+MIN_TIME_REGRESSION = 0.002  # seconds
+MIN_MEMORY_REGRESSION = 256 * 1024  # bytes
+
+SEARCH_QUERY = "budget overrun caused by vendor delays"
+
+class RecordedEmbeddings:
+    """
+    Offline, deterministic stand-in for the embedding model.
+
+    Texts found in the recordings file get their recorded vector. Any other
+    text gets a hashed bag-of-words vector, which is stable across runs and
+    machines. With a live embedding function (record mode), misses are sent
+    to the real model and added to the recordings instead.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dimension: int = STUB_EMBEDDING_DIMENSION,
+        live: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ):
+        self.path = path
+        self.live = live
+        self.recordings: Dict[str, List[float]] = {}
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.recordings = json.load(f)
+        self.dimension = len(next(iter(self.recordings.values()))) if self.recordings else dimension
+        self.recorded_hits = 0
+
+    def _hashed(self, texts: Sequence[str]) -> np.ndarray:
+        from lexical_search import tokenize
+
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = zlib.crc32(token.encode("utf-8"))
+                rows.append(row)
+                columns.append(digest % self.dimension)
+                signs.append(1.0 if digest & 0x80000000 else -1.0)
+        np.add.at(matrix, (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)), np.array(signs, dtype=np.float32))
+        return matrix
+
+    def embed_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into a float32 matrix, one row per text."""
+        from embeddings import text_hash
+
+        keys = [text_hash(text) for text in texts]
+        missing = [i for i, key in enumerate(keys) if key not in self.recordings]
+
+        if missing and self.live is not None:
+            vectors = self.live([texts[i] for i in missing])
+            if self.recordings and len(vectors[0]) != self.dimension:
+                raise ValueError("Live embeddings do not match the dimension of the recordings")
+            self.dimension = len(vectors[0])
+            for i, vector in zip(missing, vectors):
+                self.recordings[keys[i]] = list(vector)
+            missing = []
+
+        matrix = self._hashed(texts) if missing else np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, key in enumerate(keys):
+            if key in self.recordings:
+                matrix[i] = self.recordings[key]
+                self.recorded_hits += 1
+        return matrix
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    def save(self) -> None:
+        if self.path:
+            with open(self.path, "w") as f:
+                json.dump(self.recordings, f)
+
+class Dataset:
+    """A synthetic risk store and matching local vector index for one (risks, projects) scale."""
+
+    def __init__(self, risks: int, projects: int, embeddings: RecordedEmbeddings, directory: str = BENCHMARK_DATA_DIRECTORY):
+        from risk_store import RiskRepository
+        from workload import load_risk_repository, project_names
+
+        self.risks = risks
+        self.projects = projects
+        self.project_names = project_names(projects)
+        self.project = self.project_names[0]
+
+        # Dates are relative to today, so datasets are regenerated once per day
+        name = f"risks{risks}_projects{projects}_seed{BENCHMARK_SEED}_{datetime.now():%Y%m%d}"
+        os.makedirs(directory, exist_ok=True)
+        db_path = os.path.join(directory, f"{name}.db")
+        ready_marker = os.path.join(directory, f"{name}.ready")
+
+        if not os.path.exists(ready_marker):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            started = time.perf_counter()
+            load_risk_repository(RiskRepository(db_path), risks, self.project_names, seed=BENCHMARK_SEED)
+            self._build_vector_index(os.path.join(directory, f"{name}_vectors"), embeddings)
+            open(ready_marker, "w").close()
+            print(f"Generated dataset {name} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        from vector_db import VectorDBConnectionManager
+        self.repository = RiskRepository(db_path)
+        self.vector_db_manager = VectorDBConnectionManager(
+            db_type="local",
+            manifest_path=os.path.join(directory, f"{name}_manifest.json"),
+            local_directory=os.path.join(directory, f"{name}_vectors")
+        )
+        self.vector_db = self.vector_db_manager.get_connection()
+
+    def _build_vector_index(self, directory: str, embeddings: RecordedEmbeddings, chunk_size: int = 50_000) -> None:
+        import shutil
+        from local_vector_index import LocalVectorIndex
+        from vector_sync import risk_text
+        from workload import iter_risk_frames
+
+        shutil.rmtree(directory, ignore_errors=True)
+        index = LocalVectorIndex(directory)
+        # The same seed regenerates exactly the risks that were loaded into the store
+        for frame in iter_risk_frames(self.risks, self.project_names, seed=BENCHMARK_SEED, chunk_size=chunk_size):
+            records = frame.to_dict("records")
+            for risk in records:
+                risk["mitigation_strategies"] = json.loads(risk["mitigation_strategies"])
+            index.upsert(
+                ids=[risk["id"] for risk in records],
+                vectors=embeddings.embed_matrix([risk_text(risk) for risk in records]),
+                metadatas=[{"project": risk["project"], "category": risk["category"], "level": risk["level"]} for risk in records],
+                documents=[json.dumps(risk) for risk in records]
+            )
+
+class BenchmarkCase:
+    """
+    One hot path to measure.
+
+    prepare(dataset, days_back) does untimed setup and returns the function to time.
+    """
+
+    def __init__(self, name: str, prepare: Callable[["Dataset", int], Callable[[], Any]], uses_days_back: bool = True):
+        self.name = name
+        self.prepare = prepare
+        self.uses_days_back = uses_days_back
+
+def _tool_case(tool_name: str, arguments: Callable[["Dataset", int], tuple]) -> Callable[["Dataset", int], Callable[[], Any]]:
+    def prepare(dataset: Dataset, days_back: int) -> Callable[[], Any]:
+        import tools
+        tool = getattr(tools, tool_name)()
+        args = arguments(dataset, days_back)
+        return lambda: tool._run(*args)
+    return prepare
+
+def _report_summary(dataset: Dataset, days_back: int) -> Callable[[], Any]:
+    from data_handlers import get_project_data
+    from utils import generate_risk_report_summary
+    risks = get_project_data(dataset.project, days_back)["risks"]
+    return lambda: generate_risk_report_summary(dataset.project, risks)
+
+def _vector_query(dataset: Dataset, days_back: int) -> Callable[[], Any]:
+    from data_handlers import query_risks_from_vector_db
+    return lambda: query_risks_from_vector_db(SEARCH_QUERY, dataset.project, 10, vector_db=dataset.vector_db)
+
+def _project_data(dataset: Dataset, days_back: int) -> Callable[[], Any]:
+    from data_handlers import get_project_data
+    return lambda: get_project_data(dataset.project, days_back)
+
+def _portfolio_data(dataset: Dataset, days_back: int) -> Callable[[], Any]:
+    # "All Projects" in the app means the default projects only, so build the same
+    # aggregate over every project in the dataset to follow the project scale
+    from data_handlers import _build_portfolio_data
+    return lambda: _build_portfolio_data(dataset.project_names, days_back)
+
+CASES = [
+    BenchmarkCase("get_project_data", _project_data),
+    BenchmarkCase("portfolio data[all dataset projects]", _portfolio_data),
+    BenchmarkCase("generate_risk_report_summary", _report_summary),
+    BenchmarkCase("ProjectInfoTool._run", _tool_case("ProjectInfoTool", lambda d, days: (d.project, days))),
+    BenchmarkCase("RiskAnalysisTool._run", _tool_case("RiskAnalysisTool", lambda d, days: (d.project, days))),
+    BenchmarkCase("MarketAnalysisTool._run", _tool_case("MarketAnalysisTool", lambda d, days: (d.project, days))),
+    BenchmarkCase("MitigationStrategiesTool._run", _tool_case("MitigationStrategiesTool", lambda d, days: (d.project, "Budget", "High")), uses_days_back=False),
+    BenchmarkCase("ProjectComparisonTool._run", _tool_case("ProjectComparisonTool", lambda d, days: (", ".join(DEFAULT_PROJECTS[:3]),)), uses_days_back=False),
+    BenchmarkCase("SemanticRiskSearchTool._run", _tool_case("SemanticRiskSearchTool", lambda d, days: (SEARCH_QUERY, d.project, 10)), uses_days_back=False),
+    BenchmarkCase("query_risks_from_vector_db", _vector_query, uses_days_back=False)
+]
+
+def _reset_caches() -> None:
+    from data_handlers import invalidate_project_data_cache
+    invalidate_project_data_cache()
+
+def measure(run: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Time a function with cold data caches and trace its memory use.
+
+    Returns:
+        Median and minimum wall time over repeat runs, peak traced memory
+        during one run, and the blocks and bytes still allocated after it
+    """
+    _reset_caches()
+    run()  # warm up imports, connections and lazily built indexes
+
+    times = []
+    for _ in range(repeat):
+        _reset_caches()
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    _reset_caches()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = snapshot.statistics("filename")
+
+    return {
+        "wall_time": statistics.median(times),
+        "min_wall_time": min(times),
+        "peak_memory": peak,
+        "retained_blocks": sum(stat.count for stat in retained),
+        "retained_bytes": sum(stat.size for stat in retained)
+    }
+
+def case_key(case: BenchmarkCase, risks: int, projects: int, days_back: Optional[int]) -> str:
+    key = f"{case.name} risks={risks} projects={projects}"
+    return f"{key} days_back={days_back}" if days_back is not None else key
+
+def run_benchmarks(
+    risk_scales: Iterable[int],
+    project_scales: Iterable[int],
+    days_back_values: Sequence[int],
+    cases: Sequence[BenchmarkCase],
+    repeat: int,
+    embeddings: RecordedEmbeddings
+) -> Dict[str, Dict[str, float]]:
+    """Run every case at every scale and return the measurements by case key."""
+    from data_handlers import reset_lexical_index
+    from embeddings import EmbeddingService, set_embedding_service
+    from risk_store import set_risk_repository
+    from vector_db import set_vector_db_manager
+
+    set_embedding_service(EmbeddingService(cache=None, embed_batch=embeddings))
+    results = {}
+    for risks in risk_scales:
+        for projects in project_scales:
+            dataset = Dataset(risks, projects, embeddings)
+            set_risk_repository(dataset.repository)
+            set_vector_db_manager(dataset.vector_db_manager)
+            reset_lexical_index()
+            _reset_caches()
+
+            for case in cases:
+                for days_back in (days_back_values if case.uses_days_back else [None]):
+                    key = case_key(case, risks, projects, days_back)
+                    try:
+                        run = case.prepare(dataset, days_back or 30)
+                    except ImportError as e:
+                        print(f"SKIP {key}: {str(e)}", file=sys.stderr)
+                        continue
+                    results[key] = measure(run, repeat)
+                    result = results[key]
+                    print(
+                        f"{key}: {result['wall_time'] * 1000:.2f} ms, "
+                        f"peak {result['peak_memory'] / 1024:.0f} KiB, {result['retained_blocks']} blocks retained",
+                        file=sys.stderr
+                    )
+    return results
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    time_threshold: float,
+    memory_threshold: float
+) -> List[str]:
+    """Return a description of every case that regressed past the thresholds."""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        time_limit = max(previous["wall_time"] * (1 + time_threshold), previous["wall_time"] + MIN_TIME_REGRESSION)
+        if result["wall_time"] > time_limit:
+            regressions.append(
+                f"{key}: wall time {result['wall_time'] * 1000:.2f} ms vs baseline {previous['wall_time'] * 1000:.2f} ms"
+            )
+        memory_limit = max(previous["peak_memory"] * (1 + memory_threshold), previous["peak_memory"] + MIN_MEMORY_REGRESSION)
+        if result["peak_memory"] > memory_limit:
+            regressions.append(
+                f"{key}: peak memory {result['peak_memory'] / 1024:.0f} KiB vs baseline {previous['peak_memory'] / 1024:.0f} KiB"
+            )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the data, tool, search and report hot paths.")
+    parser.add_argument("--risks", type=int, nargs="+", default=DEFAULT_RISK_SCALES, help="Risk counts to test")
+    parser.add_argument("--projects", type=int, nargs="+", default=DEFAULT_PROJECT_SCALES, help="Project counts to test")
+    parser.add_argument("--days-back", type=int, nargs="+", default=DEFAULT_DAYS_BACK, help="days_back values to test")
+    parser.add_argument("--cases", nargs="*", help="Only run cases whose name contains one of these strings")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=0.25, help="Allowed relative wall time increase")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="Allowed relative peak memory increase")
+    parser.add_argument("--recordings", default="benchmark_embeddings.json", help="Recorded embeddings to replay")
+    parser.add_argument("--record", action="store_true", help="Embed unrecorded texts with the live model and save them")
+    args = parser.parse_args()
+
+    live = None
+    if args.record:
+        from embeddings import EmbeddingService
+        live = EmbeddingService()._backend()
+    embeddings = RecordedEmbeddings(args.recordings, live=live)
+
+    cases = [case for case in CASES if not args.cases or any(pattern in case.name for pattern in args.cases)]
+    results = run_benchmarks(args.risks, args.projects, args.days_back, cases, args.repeat, embeddings)
+    if args.record:
+        embeddings.save()
+
+    if args.save_baseline:
+        baseline = {"results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        baseline["results"].update(results)
+        baseline["environment"] = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "recorded_at": datetime.now().isoformat(timespec="seconds")
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(results)} cases, {len(regressions)} regressions")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only; copy it before changing it")
+
+class ReadOnlyDict(dict):
+    """A dict that refuses changes, so a cached value can be shared instead of copied."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Copies and pickles are plain, changeable dicts
+        return dict, (dict(self),)
+
+class ReadOnlyList(list):
+    """A list that refuses changes, so a cached value can be shared instead of copied."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+def freeze(value: Any) -> Any:
+    """Return value with its dicts and lists, at any depth, made read-only; other values are kept as they are."""
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ReadOnlyList(freeze(item) for item in value)
+    return value
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 32,
+        clock: Callable[[], float] = time.monotonic,
+        copy: Optional[Callable[[Any], Any]] = None
+    ):
+        """
+        Create a new cache.
+
+        Args:
+            ttl: Seconds an entry stays valid after it was stored
+            max_entries: Maximum number of entries kept before the least recently used is evicted
+            clock: Time source, overridable for testing
+            copy: Applied to every value handed out, so callers that modify
+                their result cannot change the cached entry
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._copy = copy
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        # Bumped by invalidate() so builds started before it are not stored: the
+        # generation for a full clear, and per key for single-entry invalidations
+        self._generation = 0
+        self._key_generations: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable, default: Any) -> Any:
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        stored_at, value = entry
+        if self._clock() - stored_at >= self.ttl:
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _hand_out(self, value: Any) -> Any:
+        return self._copy(value) if self._copy is not None else value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if it is missing or expired."""
+        sentinel = object()
+        with self._lock:
+            value = self._lookup(key, sentinel)
+            if value is sentinel:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return self._hand_out(value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, building and storing it with factory on a miss.
+
+        Concurrent callers asking for the same key share one build instead of
+        each doing their own. Only that key's lock is held while factory runs,
+        so builds of other keys and all other cache calls carry on meanwhile.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                # Another caller may have finished the build while we waited
+                value = self._lookup(key, sentinel)
+                generation = self._generation_of(key)
+            try:
+                if value is sentinel:
+                    value = factory()
+                    with self._lock:
+                        if self._generation_of(key) == generation:
+                            self.set(key, value)
+            finally:
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+        return self._hand_out(value)
+
+    def _generation_of(self, key: Hashable) -> tuple:
+        # Caller holds self._lock
+        return self._generation, self._key_generations.get(key, 0)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drop a single entry, or every entry when no key is given.
+
+        A build of an invalidated key that is still running when this is
+        called is handed to its callers but not stored; builds of other keys
+        are unaffected.
+        """
+        with self._lock:
+            if key is None:
+                self._generation += 1
+                self._key_generations.clear()
+                self._entries.clear()
+            else:
+                self._invalidate_key(key)
+
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Invalidate every stored or currently building key for which predicate(key) is true."""
+        with self._lock:
+            for key in set(self._entries) | set(self._key_locks):
+                if predicate(key):
+                    self._invalidate_key(key)
+
+    def _invalidate_key(self, key: Hashable) -> None:
+        # Caller holds self._lock
+        self._key_generations[key] = self._key_generations.get(key, 0) + 1
+        self._entries.pop(key, None)
+
+    def keys(self) -> list:
+        """Return the keys currently stored, least recently used first."""
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
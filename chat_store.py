@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import quote
+from config import CHAT_LOG_DIRECTORY, MAX_CHAT_HISTORY, CHAT_LOG_COMPACT_FACTOR
+
+WELCOME_MESSAGE = {
+    "role": "assistant",
+    "content": "👋 Welcome to the AI Project Risk Management System! I can help you identify, assess, and mitigate risks across your IT projects. How can I assist you today?"
+}
+
+# Longest encoded chat id used as a file name as is; longer ones are shortened and hashed
+MAX_FILE_ID_LENGTH = 128
+
+def _safe_id(chat_id: str) -> str:
+    """
+    Turn a session or user id into a file name, distinct for distinct ids.
+
+    Characters other than letters, digits and "_.-~" are percent-encoded,
+    so the name can be decoded back to the id and ids made only of those
+    characters keep their earlier file names. Very long ids are cut and
+    suffixed with a hash of the full id.
+    """
+    encoded = quote(chat_id, safe="")
+    if len(encoded) > MAX_FILE_ID_LENGTH:
+        digest = hashlib.sha256(chat_id.encode("utf-8")).hexdigest()[:16]
+        encoded = f"{encoded[:MAX_FILE_ID_LENGTH - 17]}-{digest}"
+    return encoded
+
+class ChatStore:
+    """
+    Chat history kept as one append-only JSONL log per session or user.
+
+    Saving a message appends a single line, so its cost does not depend on
+    the length of the history. Only the last `window` messages are ever
+    loaded. When a log has grown to `compact_factor` times the window, a
+    background thread rewrites it to the last `window` lines through a
+    temporary file and an atomic rename, so readers and a crash mid-write
+    never see a partial file.
+
+    The store does no access control: whoever passes a chat id can read
+    that chat, so ids must be hard to guess or the app must authenticate
+    users before choosing the id.
+    """
+
+    def __init__(
+        self,
+        directory: str = CHAT_LOG_DIRECTORY,
+        window: int = MAX_CHAT_HISTORY,
+        compact_factor: int = CHAT_LOG_COMPACT_FACTOR
+    ):
+        """
+        Args:
+            directory: Directory holding one <chat id>.jsonl file per chat
+            window: Number of most recent messages kept
+            compact_factor: Log length, as a multiple of window, that triggers compaction
+        """
+        self.directory = directory
+        self.window = window
+        self.compact_factor = max(compact_factor, 2)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file_locks: Dict[str, threading.Lock] = {}
+        # Lines in each log, counted once when it is first touched
+        self._line_counts: Dict[str, int] = {}
+        self._compacting = set()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-compactor")
+
+    def path(self, chat_id: str) -> str:
+        return os.path.join(self.directory, f"{_safe_id(chat_id)}.jsonl")
+
+    def _file_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._file_locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _read_tail(path: str, limit: int) -> List[Dict[str, str]]:
+        messages: deque = deque(maxlen=limit)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short by a crash is skipped
+                    continue
+        return list(messages)
+
+    def load(self, chat_id: str) -> List[Dict[str, str]]:
+        """
+        Load the most recent messages of a chat.
+
+        Args:
+            chat_id: Session or user id
+
+        Returns:
+            Up to `window` messages, oldest first, or the welcome message for a new chat
+        """
+        path = self.path(chat_id)
+        if not os.path.exists(path):
+            return [dict(WELCOME_MESSAGE)]
+        try:
+            with self._file_lock(path):
+                messages = self._read_tail(path, self.window)
+        except Exception as e:
+            print(f"Error loading chat history: {str(e)}")
+            return [dict(WELCOME_MESSAGE)]
+        return messages or [dict(WELCOME_MESSAGE)]
+
+    def append(self, chat_id: str, message: Dict[str, str]) -> None:
+        """
+        Append one message to a chat's log.
+
+        Args:
+            chat_id: Session or user id
+            message: Chat message with role and content
+        """
+        path = self.path(chat_id)
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self._file_lock(path):
+                if path not in self._line_counts:
+                    self._line_counts[path] = self._count_lines(path)
+                    if self._ends_mid_line(path):
+                        # Terminate a line cut short by a crash so the new message stays parseable
+                        line = b"\n" + line
+                # One write on an O_APPEND descriptor, so lines are never interleaved
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+                self._line_counts[path] += 1
+                needs_compaction = (
+                    self._line_counts[path] >= self.window * self.compact_factor
+                    and path not in self._compacting
+                )
+                if needs_compaction:
+                    self._compacting.add(path)
+        except Exception as e:
+            print(f"Error saving chat message: {str(e)}")
+            return
+
+        if needs_compaction:
+            self._compactor.submit(self._compact, path)
+
+    @staticmethod
+    def _ends_mid_line(path: str) -> bool:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return False
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    @staticmethod
+    def _count_lines(path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            return sum(1 for _ in f)
+
+    def _compact(self, path: str) -> None:
+        try:
+            with self._file_lock(path):
+                messages = self._read_tail(path, self.window)
+                fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        for message in messages:
+                            f.write(json.dumps(message, ensure_ascii=False) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_path, path)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+                self._line_counts[path] = len(messages)
+        except Exception as e:
+            print(f"Error compacting chat log {path}: {str(e)}")
+        finally:
+            with self._file_lock(path):
+                self._compacting.discard(path)
+
+    def flush(self) -> None:
+        """Wait for scheduled compactions to finish."""
+        self._compactor.submit(lambda: None).result()
+
+_chat_store = None
+_chat_store_lock = threading.Lock()
+
+def get_chat_store() -> ChatStore:
+    """Return the process-wide chat store."""
+    global _chat_store
+    if _chat_store is None:
+        with _chat_store_lock:
+            if _chat_store is None:
+                _chat_store = ChatStore()
+    return _chat_store
+
+def trim_history(chat_history: List[Dict[str, str]], window: int = MAX_CHAT_HISTORY) -> None:
+    """Drop all but the last window messages from an in-memory history, in place."""
+    if len(chat_history) > window:
+        del chat_history[:-window]
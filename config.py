@@ -4,14 +4,40 @@ import os
 LLM_TYPE = "ollama"  # "ollama" instead of "openai"
 OLLAMA_MODEL = "llama3"  # or another model you prefer to use
 OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_MAX_PARALLEL_REQUESTS = int(os.getenv("OLLAMA_NUM_PARALLEL", "2"))  # generations the Ollama server runs at once
+LLM_MAX_IN_FLIGHT = OLLAMA_MAX_PARALLEL_REQUESTS  # requests the LLM gateway lets through at once, across all sessions
+LLM_REQUEST_TIMEOUT = int(os.getenv("LLM_REQUEST_TIMEOUT", "120"))  # seconds per HTTP request to Ollama
+LLM_QUERY_DEADLINE = 900  # seconds all LLM calls for one chat question may take, including queueing
+LLM_MAX_RETRIES = 3  # retries of a request that failed with a transient error
+LLM_RETRY_BACKOFF = 1.0  # seconds before the first retry, doubled for each further retry
+LLM_RETRY_BACKOFF_MAX = 20.0
 
 # Vector Database Configuration
-VECTOR_DB_TYPE = "none"  # "chromadb", "pinecone", or "none" to disable
+VECTOR_DB_TYPE = "none"  # "chromadb", "pinecone", "local", or "none" to disable
 CHROMA_PERSIST_DIRECTORY = "chroma_db"
+CHROMA_PERSISTENT = os.getenv("CHROMA_PERSISTENT", "True").lower() == "true"  # False keeps Chroma in memory
+VECTOR_INDEX_MANIFEST_PATH = os.path.join(CHROMA_PERSIST_DIRECTORY, "index_manifest.json")
+VECTOR_DATA_VERSION = "1"  # bump when the indexed sample data or document format changes
+VECTOR_SYNC_MANIFEST_PATH = os.path.join(CHROMA_PERSIST_DIRECTORY, "sync_manifest.json")
+VECTOR_SYNC_BATCH_SIZE = 256  # records per upsert/delete call when syncing the vector store
+LOCAL_VECTOR_INDEX_DIRECTORY = os.getenv("LOCAL_VECTOR_INDEX_DIRECTORY", "vector_index")
+LOCAL_VECTOR_COARSE_MIN_ROWS = 100_000  # from this size, local searches scan a reduced projection first
+LOCAL_VECTOR_COARSE_DIMENSIONS = 64  # dimensions of that projection
+LOCAL_VECTOR_RERANK_CANDIDATES = 512  # coarse matches re-scored with the full embeddings
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT", "us-west1-gcp")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "project-risks")
 
+# Embedding Configuration
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_MAX_BYTES = 256 * 1024 * 1024  # evict least recently used vectors beyond this size
+EMBEDDING_BATCH_SIZE = 64  # texts per embed_documents call
+EMBEDDING_MAX_WORKERS = 4  # embedding batches in flight at once
+
+# Risk Store Configuration
+RISK_DB_PATH = os.getenv("RISK_DB_PATH", "risk_register.db")
+RISK_DB_SEED_DAYS = 90  # days of mock risks seeded for a project with no stored risks
+
 # Application Configuration
 APP_NAME = "AI Project Risk Management System"
 APP_VERSION = "1.0.0"
@@ -34,6 +60,13 @@ RISK_CATEGORIES = [
     "Security"
 ]
 
+# Kinds of risk used in mock and synthetic risk titles
+RISK_TITLES = [
+    "Resource shortage", "Schedule delay", "Budget overrun", "Technical debt",
+    "Quality issues", "Scope creep", "Communication breakdown", "External dependency",
+    "Vendor reliability", "Regulatory compliance", "Market shift", "Security vulnerability"
+]
+
 RISK_LEVELS = {
     "Low": {"color": "#26eb77", "threshold": 30},
     "Medium": {"color": "#f0cc45", "threshold": 70},
@@ -50,12 +83,51 @@ DEFAULT_PROJECTS = [
 ]
 
 # Chat Configuration
-MAX_CHAT_HISTORY = 50
-CHAT_SAVE_PATH = "chat_history.json"
+MAX_CHAT_HISTORY = 50  # messages kept per chat, in memory and after log compaction
+CHAT_LOG_DIRECTORY = os.getenv("CHAT_LOG_DIRECTORY", "chat_logs")  # one <chat id>.jsonl log per session or user
+CHAT_LOG_COMPACT_FACTOR = 4  # compact a log once it holds this many times MAX_CHAT_HISTORY messages
 
 # Agent System Configuration
 AGENT_TEMPERATURE = 0.2
-AGENT_PROCESS = "sequential"  # "sequential" or "parallel"
+TOOL_OUTPUT_DEFAULT_TOKEN_BUDGET = 600  # approximate tokens a tool result may add to an agent prompt
+TOOL_OUTPUT_TOKEN_BUDGETS = {
+    "project_info_tool": 300,
+    "risk_analysis_tool": 600,
+    "market_analysis_tool": 400,
+    "mitigation_strategies_tool": 800,
+    "project_comparison_tool": 600,
+    "semantic_risk_search_tool": 800
+}
+TOOL_OUTPUT_MAX_TEXT_LENGTH = 160  # characters of a text field kept in tool output
+AGENT_PROCESS = "parallel"  # "parallel" (dependency-aware task graph) or "sequential" (crewAI kickoff)
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "4"))  # crews shared by all sessions; extra queries queue
+CREW_POOL_CHECKOUT_TIMEOUT = 300  # seconds a query waits for a free crew before giving up
+
+# Export Configuration
+# Exports live under Streamlit's static folder, so downloads are streamed from disk by the server
+EXPORT_DIRECTORY = os.getenv("EXPORT_DIRECTORY", "static/exports")  # cached export artifacts
+EXPORT_URL_PATH = os.getenv("EXPORT_URL_PATH", "app/static/exports")  # URL the export directory is served at
+EXPORT_CHUNK_SIZE = 50_000  # risks read from the store and written per chunk
+EXPORT_MAX_ARTIFACTS = 20  # most recently used export files kept on disk
+
+# PDF Report Configuration
+REPORT_DIRECTORY = os.getenv("REPORT_DIRECTORY", "reports")  # finished PDF reports
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))  # processes rendering reports in parallel
+REPORT_MAX_JOBS = 50  # most recent report jobs kept; older finished reports are deleted
+REPORT_TOP_RISKS = 25  # highest-scoring risks listed in the detailed table
+
+# Tracing Configuration
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "False").lower() == "true"  # can also be switched on in the sidebar
+TRACE_HISTORY_SIZE = 50  # most recent chat-turn traces kept in memory
+TRACE_MAX_SPANS = 5000  # spans recorded per trace; later ones are counted as dropped
 
 # Data Refresh Configuration
 DATA_REFRESH_INTERVAL = 3600  # in seconds (1 hour)
+DATA_CACHE_MAX_ENTRIES = 64  # project/time-range combinations kept in the data cache
+
+# Response Cache Configuration
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.db")
+RESPONSE_CACHE_TTL = DATA_REFRESH_INTERVAL  # seconds a cached crew answer stays valid
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_SEMANTIC_MATCH = os.getenv("RESPONSE_CACHE_SEMANTIC_MATCH", "False").lower() == "true"
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = 0.95  # cosine similarity for a near-duplicate query to reuse an answer
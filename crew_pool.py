@@ -0,0 +1,153 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from crewai import Crew
+from config import CREW_POOL_SIZE, CREW_POOL_CHECKOUT_TIMEOUT
+
+class CrewPoolTimeout(Exception):
+    """Raised when no crew becomes free before the checkout timeout."""
+
+class CrewPool:
+    """
+    Bounded pool of crews shared by every Streamlit session in the process.
+
+    A crew is checked out for the duration of one query, which gives the
+    query exclusive use of the crew's task list, and is returned with its
+    tasks cleared. Crews are created lazily up to size; once they are all
+    busy, further queries wait in arrival order until one is checked in.
+    """
+
+    def __init__(
+        self,
+        size: int = CREW_POOL_SIZE,
+        factory: Optional[Callable[[], Crew]] = None,
+        checkout_timeout: float = CREW_POOL_CHECKOUT_TIMEOUT
+    ):
+        """
+        Args:
+            size: Maximum number of crews
+            factory: Builds a new crew; defaults to crews sharing one LLM client
+            checkout_timeout: Seconds a checkout waits for a free crew
+        """
+        self.size = max(size, 1)
+        self.factory = factory or _default_factory()
+        self.checkout_timeout = checkout_timeout
+        self._idle: List[Crew] = []
+        self._created = 0
+        self._queue: List[object] = []
+        self._condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+
+    def acquire(self, timeout: Optional[float] = None, on_wait: Optional[Callable[[int], None]] = None) -> Crew:
+        """
+        Take a crew from the pool, creating or waiting for one as needed.
+
+        Args:
+            timeout: Seconds to wait; defaults to the pool's checkout timeout
+            on_wait: Called with the queue position if the caller has to wait
+
+        Returns:
+            A crew with an empty task list
+
+        Raises:
+            CrewPoolTimeout: If no crew became free in time
+        """
+        deadline = time.monotonic() + (self.checkout_timeout if timeout is None else timeout)
+        ticket = object()
+        create = False
+
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    # Serve waiters in arrival order
+                    if self._queue[0] is ticket:
+                        if self._idle:
+                            crew = self._idle.pop()
+                            break
+                        if self._created < self.size:
+                            self._created += 1
+                            create = True
+                            break
+
+                    if on_wait is not None:
+                        self.waits += 1
+                        on_wait(self._queue.index(ticket) + 1)
+                        on_wait = None
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise CrewPoolTimeout(f"No crew became available within {self.checkout_timeout} seconds")
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+            self.checkouts += 1
+
+        if create:
+            try:
+                crew = self.factory()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify_all()
+                raise
+        return crew
+
+    def release(self, crew: Crew) -> None:
+        """Return a crew to the pool, clearing everything left from its last query."""
+        crew.tasks = []
+        crew.task_callback = None
+        with self._condition:
+            self._idle.append(crew)
+            self._condition.notify_all()
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None, on_wait: Optional[Callable[[int], None]] = None) -> Iterator[Crew]:
+        """Context manager around acquire() and release()."""
+        crew = self.acquire(timeout, on_wait)
+        try:
+            yield crew
+        finally:
+            self.release(crew)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+                "waiting": len(self._queue),
+                "checkouts": self.checkouts,
+                "waits": self.waits
+            }
+
+def _default_factory() -> Callable[[], Crew]:
+    from agents import get_llm, initialize_crew
+
+    llm = None
+    llm_lock = threading.Lock()
+
+    def factory() -> Crew:
+        # The Ollama client holds no per-query state, so every crew shares one
+        nonlocal llm
+        with llm_lock:
+            if llm is None:
+                llm = get_llm()
+        return initialize_crew(llm)
+
+    return factory
+
+_crew_pool = None
+_crew_pool_lock = threading.Lock()
+
+def get_crew_pool() -> CrewPool:
+    """Return the process-wide crew pool."""
+    global _crew_pool
+    if _crew_pool is None:
+        with _crew_pool_lock:
+            if _crew_pool is None:
+                _crew_pool = CrewPool()
+    return _crew_pool
@@ -1,27 +1,54 @@
 import os
 import json
 import random
+import threading
+import uuid
 from datetime import datetime, timedelta
 import pandas as pd
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, Iterable, List, Any, Optional, Union
 from config import (
     RISK_CATEGORIES, 
     RISK_LEVELS, 
+    RISK_TITLES,
     DEFAULT_PROJECTS,
-    OLLAMA_MODEL,
     VECTOR_DB_TYPE,
-    CHROMA_PERSIST_DIRECTORY
+    VECTOR_DATA_VERSION,
+    DATA_REFRESH_INTERVAL,
+    DATA_CACHE_MAX_ENTRIES,
+    RISK_DB_SEED_DAYS
 )
+from cache import TTLCache, freeze
+from risk_store import get_risk_repository, since_date
+from risk_table import RiskTable
+from vector_db import get_vector_db_manager
+from vector_sync import get_vector_sync
+from embeddings import get_embedding_service
+from lexical_search import BM25Index
+from request_context import current_request
+from chat_store import get_chat_store
+from tracing import traced
+
+# Process-wide cache of built project data, shared by the dashboard and the agent tools. Entries
+# are frozen into read-only views (RiskTable operations always return new tables), so every
+# caller shares one copy
+_project_data_cache = TTLCache(ttl=DATA_REFRESH_INTERVAL, max_entries=DATA_CACHE_MAX_ENTRIES)
+
+# Repository whose writes invalidate the project data cache
+_cache_subscription = None
+_cache_subscription_lock = threading.Lock()
+
+# Guards first-time seeding of the risk store so concurrent callers don't seed twice
+_seed_lock = threading.Lock()
+
+# Keyword index over the risk store, built lazily by get_lexical_index, and the store it follows
+_lexical_index = None
+_lexical_index_repository = None
+_lexical_index_lock = threading.Lock()
 
 # Mock data generator for development purposes
 def generate_mock_risk(project_name: str, date: datetime) -> Dict[str, Any]:
     """Generate a mock risk for development purposes."""
     risk_levels = list(RISK_LEVELS.keys())
-    risk_titles = [
-        "Resource shortage", "Schedule delay", "Budget overrun", "Technical debt",
-        "Quality issues", "Scope creep", "Communication breakdown", "External dependency",
-        "Vendor reliability", "Regulatory compliance", "Market shift", "Security vulnerability"
-    ]
     
     category = random.choice(RISK_CATEGORIES)
     level = random.choice(risk_levels)
@@ -30,12 +57,12 @@ def generate_mock_risk(project_name: str, date: datetime) -> Dict[str, Any]:
         RISK_LEVELS[level]["threshold"]
     )
     
-    # Generate a more unique ID using timestamp to avoid duplicates
-    unique_id = f"RISK-{int(datetime.now().timestamp() * 1000)}-{random.randint(1000, 9999)}"
+    # Random 64-bit suffix; a millisecond timestamp plus 4 random digits collided under bulk generation
+    unique_id = f"RISK-{int(datetime.now().timestamp() * 1000)}-{uuid.uuid4().hex[:16]}"
     
     return {
         "id": unique_id,
-        "title": f"{category} {random.choice(risk_titles)}",
+        "title": f"{category} {random.choice(RISK_TITLES)}",
         "description": f"This is a {level.lower()}-level risk related to {category.lower()} for {project_name}.",
         "category": category,
         "level": level,
@@ -131,86 +158,221 @@ def generate_mock_risk_by_category(project_name: str) -> List[Dict[str, Any]]:
     
     return risk_by_category
 
+@traced()
+def ensure_project_seeded(project_name: str) -> bool:
+    """
+    Seed the risk store with mock risks for a default project that has none yet.
+    
+    Only names in DEFAULT_PROJECTS are seeded, so a project name made up by
+    an agent never writes risks into the register.
+    
+    Returns:
+        True if the project has risks in the store or was seeded, False for an unknown project
+    """
+    repository = get_risk_repository()
+    if repository.has_project(project_name):
+        return True
+    if project_name not in DEFAULT_PROJECTS:
+        return False
+    
+    with _seed_lock:
+        if repository.has_project(project_name):
+            return True
+        
+        seed_risks = []
+        dates = [datetime.now() - timedelta(days=i) for i in range(RISK_DB_SEED_DAYS)]
+        
+        # Generate 1-3 risks per day (with some randomness)
+        for date in dates:
+            if random.random() > 0.7:  # 30% chance of generating risks for this day
+                num_risks = random.randint(1, 3)
+                for _ in range(num_risks):
+                    risk = generate_mock_risk(project_name, date)
+                    risk["project"] = project_name
+                    seed_risks.append(risk)
+        
+        repository.insert_risks(seed_risks)
+        return True
+
+def is_known_project(project_name: str) -> bool:
+    """Return whether project_name is "All Projects" or a project in the risk store, seeding default projects on first use."""
+    return project_name == "All Projects" or ensure_project_seeded(project_name)
+
+def unknown_project_message(project_name: str) -> str:
+    return f"Unknown project '{project_name}'. Available projects are: {', '.join(DEFAULT_PROJECTS)}"
+
+@traced()
 def get_project_data(project_name: str, days_back: int = 30) -> Dict[str, Any]:
     """
     Get project data including risks, trends, and metrics.
     
+    Results are cached per (project_name, days_back) for DATA_REFRESH_INTERVAL
+    seconds, or until risks of the project are written to the store, so
+    repeated calls within a rerun share one build. Inside a request scope (a
+    crew kickoff) the first result is pinned, so every tool sees the same
+    snapshot even if the cache is refreshed meanwhile.
+    
     Args:
         project_name: Name of the project or "All Projects"
         days_back: Number of days of historical data to include
         
     Returns:
-        Dictionary containing project data
+        Read-only dictionary containing project data; "risks" is a columnar RiskTable
+    """
+    _subscribe_project_data_cache()
+    # Seed before building: seeding writes to the store, which would invalidate a build under way
+    for name in (DEFAULT_PROJECTS if project_name == "All Projects" else [project_name]):
+        ensure_project_seeded(name)
+    cached = lambda: _project_data_cache.get_or_set(
+        (project_name, days_back),
+        lambda: freeze(_build_project_data(project_name, days_back))
+    )
+    request = current_request()
+    if request is not None:
+        return request.project_data(project_name, days_back, cached)
+    return cached()
+
+def _invalidate_written_projects(risks: List[Dict[str, Any]]) -> None:
+    """Risk store listener dropping the cached data of the projects that were written to."""
+    projects = {risk.get("project") for risk in risks}
+    if projects & set(DEFAULT_PROJECTS):
+        projects.add("All Projects")
+    _project_data_cache.invalidate_matching(lambda key: key[0] in projects)
+
+def _subscribe_project_data_cache() -> None:
+    """Subscribe the project data cache to writes of the current risk store, once per store."""
+    global _cache_subscription
+    repository = get_risk_repository()
+    if _cache_subscription is not repository:
+        with _cache_subscription_lock:
+            if _cache_subscription is not repository:
+                repository.subscribe(_invalidate_written_projects)
+                _cache_subscription = repository
+
+def invalidate_project_data_cache(project_name: Optional[str] = None, days_back: Optional[int] = None) -> None:
     """
-    # For demo purposes, we'll generate mock data
-    # In a real implementation, this would retrieve actual project data from a database
+    Invalidate cached project data.
+    
+    Every invalidation also moves the data version forward, so answers
+    cached against the old data are no longer served.
+    
+    Args:
+        project_name: Project to invalidate, or None to clear the whole cache
+        days_back: Time range to invalidate; requires project_name
+    """
+    get_risk_repository().bump_refresh_generation()
+    if project_name is None:
+        _project_data_cache.invalidate()
+    elif days_back is not None:
+        _project_data_cache.invalidate((project_name, days_back))
+    else:
+        _project_data_cache.invalidate_matching(lambda key: key[0] == project_name)
+
+def get_data_version() -> str:
+    """
+    Return a stamp identifying the current state of the project data.
+    
+    The stamp changes whenever risks are written to the store or the
+    project data cache is refreshed.
+    """
+    repository = get_risk_repository()
+    return f"{repository.data_version()}.{repository.refresh_generation()}"
+
+def get_project_data_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the project data cache."""
+    return _project_data_cache.stats()
+
+def get_rollup_views(projects: Union[str, List[str]], days_back: int) -> Dict[str, Any]:
+    """
+    Read the dashboard aggregates for one or more projects from the risk store's rollups.
+    
+    The cost depends on the number of days and category/level groups in
+    range, not on the number of stored risks.
+    
+    Args:
+        projects: Project name or list of project names
+        days_back: Number of days of history to include
+        
+    Returns:
+        Dictionary with trend_data (daily risk score per project),
+        risk_by_category (counts per project, category and level),
+        risk_counts (total and per-level counts) and window (the projects
+        and earliest date the aggregates cover, for queries that must match them)
+    """
+    repository = get_risk_repository()
+    since = since_date(days_back)
+    
+    trend_data = [
+        {"date": row["date_identified"], "risk_score": round(row["risk_score"], 1), "project": row["project"]}
+        for row in repository.daily_scores(project=projects, since=since)
+    ]
+    risk_by_category = [
+        {"category": row["category"], "level": row["level"], "count": row["count"], "project": row["project"]}
+        for row in repository.rollup_counts(["project", "category", "level"], project=projects, since=since)
+    ]
+    level_counts = {row["level"]: row["count"] for row in repository.rollup_counts(["level"], project=projects, since=since)}
+    
+    return {
+        "trend_data": trend_data,
+        "risk_by_category": risk_by_category,
+        "risk_counts": {"total": sum(level_counts.values()), "by_level": level_counts},
+        "window": {"projects": projects, "since": since}
+    }
+
+def _build_portfolio_data(projects: List[str], days_back: int) -> Dict[str, Any]:
+    """Build the aggregate data of several projects, as shown for "All Projects"."""
+    rollups = get_rollup_views(projects, days_back)
+    
+    all_risks = RiskTable(get_risk_repository().query_frame(
+        project=projects,
+        since=since_date(days_back)
+    ))
+    
+    # Calculate aggregate metrics
+    completion_percentage = random.uniform(0, 100)
+    risk_trend = random.uniform(-10, 15)
+    mitigation_rate = random.uniform(40, 90)
+    
+    return {
+        "risks": all_risks,
+        **rollups,
+        "status": "Various",
+        "completion_percentage": completion_percentage,
+        "risk_trend": risk_trend,
+        "mitigation_rate": mitigation_rate,
+        "budget_status": "Mixed",
+        "resource_utilization": random.uniform(60, 95),
+        "start_date": (datetime.now() - timedelta(days=random.randint(90, 180))).strftime("%Y-%m-%d"),
+        "end_date": (datetime.now() + timedelta(days=random.randint(30, 180))).strftime("%Y-%m-%d"),
+        "key_metrics": {
+            "total_projects": len(projects),
+            "at_risk_projects": random.randint(0, len(projects)),
+            "on_track_projects": random.randint(0, len(projects))
+        },
+        "market_data": generate_mock_market_data()
+    }
+
+@traced()
+def _build_project_data(project_name: str, days_back: int) -> Dict[str, Any]:
+    """Build project data from scratch, bypassing the cache."""
+    # Risks and their aggregates come from the SQLite risk store; the remaining metrics are still mock data
     
     if project_name == "All Projects":
         # Aggregate data from all projects
-        all_risks = []
-        all_trend_data = []
-        all_risk_by_category = []
-        
         for project in DEFAULT_PROJECTS:
-            # Generate dates from days_back until now
-            dates = [datetime.now() - timedelta(days=i) for i in range(days_back)]
-            
-            # Generate 2-5 risks per project per day (with some randomness)
-            for date in dates:
-                if random.random() > 0.7:  # 30% chance of generating risks for this day
-                    num_risks = random.randint(1, 3)
-                    for _ in range(num_risks):
-                        all_risks.append(generate_mock_risk(project, date))
-            
-            # Generate trend data
-            all_trend_data.extend(generate_mock_trend_data(project, days_back))
-            
-            # Generate risk by category
-            all_risk_by_category.extend(generate_mock_risk_by_category(project))
+            ensure_project_seeded(project)
         
-        # Calculate aggregate metrics
-        completion_percentage = random.uniform(0, 100)
-        risk_trend = random.uniform(-10, 15)
-        mitigation_rate = random.uniform(40, 90)
-        
-        return {
-            "risks": all_risks,
-            "trend_data": all_trend_data,
-            "risk_by_category": all_risk_by_category,
-            "status": "Various",
-            "completion_percentage": completion_percentage,
-            "risk_trend": risk_trend,
-            "mitigation_rate": mitigation_rate,
-            "budget_status": "Mixed",
-            "resource_utilization": random.uniform(60, 95),
-            "start_date": (datetime.now() - timedelta(days=random.randint(90, 180))).strftime("%Y-%m-%d"),
-            "end_date": (datetime.now() + timedelta(days=random.randint(30, 180))).strftime("%Y-%m-%d"),
-            "key_metrics": {
-                "total_projects": len(DEFAULT_PROJECTS),
-                "at_risk_projects": random.randint(0, len(DEFAULT_PROJECTS)),
-                "on_track_projects": random.randint(0, len(DEFAULT_PROJECTS))
-            },
-            "market_data": generate_mock_market_data()
-        }
+        return _build_portfolio_data(DEFAULT_PROJECTS, days_back)
     else:
-        # Generate data for a specific project
-        project_risks = []
-        
-        # Generate dates from days_back until now
-        dates = [datetime.now() - timedelta(days=i) for i in range(days_back)]
-        
-        # Generate 1-3 risks per day (with some randomness)
-        for date in dates:
-            if random.random() > 0.7:  # 30% chance of generating risks for this day
-                num_risks = random.randint(1, 3)
-                for _ in range(num_risks):
-                    project_risks.append(generate_mock_risk(project_name, date))
+        # Load risks for a specific project from the risk store
+        ensure_project_seeded(project_name)
+        project_risks = RiskTable(get_risk_repository().query_frame(
+            project=project_name,
+            since=since_date(days_back)
+        ))
         
-        # Generate trend data
-        trend_data = generate_mock_trend_data(project_name, days_back)
-        
-        # Generate risk by category
-        risk_by_category = generate_mock_risk_by_category(project_name)
+        # Daily risk scores and category/level counts from the rollups
+        rollups = get_rollup_views(project_name, days_back)
         
         # Calculate project metrics
         completion_percentage = random.uniform(0, 100)
@@ -219,8 +381,7 @@ def get_project_data(project_name: str, days_back: int = 30) -> Dict[str, Any]:
         
         return {
             "risks": project_risks,
-            "trend_data": trend_data,
-            "risk_by_category": risk_by_category,
+            **rollups,
             "status": random.choice(["On Track", "At Risk", "Delayed", "On Hold"]),
             "completion_percentage": completion_percentage,
             "risk_trend": risk_trend,
@@ -238,111 +399,61 @@ def get_project_data(project_name: str, days_back: int = 30) -> Dict[str, Any]:
             "market_data": generate_mock_market_data()
         }
 
-def load_chat_history() -> List[Dict[str, str]]:
+def load_chat_history(chat_id: str) -> List[Dict[str, str]]:
     """
-    Load chat history from storage. If no history exists, return a welcome message.
+    Load the most recent messages of a chat. If no history exists, return a welcome message.
     
+    Args:
+        chat_id: Session or user id the chat belongs to
+        
     Returns:
-        List of chat messages with role and content
+        Up to MAX_CHAT_HISTORY chat messages with role and content
     """
-    chat_history_path = "chat_history.json"
-    
-    if os.path.exists(chat_history_path):
-        try:
-            with open(chat_history_path, "r") as f:
-                return json.load(f)
-        except Exception:
-            # If there's an error loading the file, return default welcome message
-            pass
-    
-    # Default welcome message
-    return [
-        {
-            "role": "assistant", 
-            "content": "👋 Welcome to the AI Project Risk Management System! I can help you identify, assess, and mitigate risks across your IT projects. How can I assist you today?"
-        }
-    ]
+    return get_chat_store().load(chat_id)
 
-def save_chat_history(chat_history: List[Dict[str, str]]) -> None:
+def save_chat_message(chat_id: str, message: Dict[str, str]) -> None:
     """
-    Save chat history to storage.
+    Append one message to a chat's log.
     
     Args:
-        chat_history: List of chat messages with role and content
+        chat_id: Session or user id the chat belongs to
+        message: Chat message with role and content
     """
-    chat_history_path = "chat_history.json"
-    
-    try:
-        with open(chat_history_path, "w") as f:
-            json.dump(chat_history, f)
-    except Exception as e:
-        print(f"Error saving chat history: {str(e)}")
+    get_chat_store().append(chat_id, message)
 
 def initialize_vector_db():
-    """Initialize and return the vector database connection."""
-    if VECTOR_DB_TYPE == "none":
-        print("Vector database functionality is disabled")
-        return {"disabled": True}
-    elif VECTOR_DB_TYPE == "chromadb":
-        try:
-            import chromadb
-            from chromadb.config import Settings
-            
-            # Use in-memory client instead of persistent to avoid tenant issues
-            client = chromadb.Client(Settings(is_persistent=False))
-            
-            # Create collections if they don't exist
-            try:
-                risks_collection = client.get_or_create_collection("project_risks")
-                projects_collection = client.get_or_create_collection("projects")
-                market_collection = client.get_or_create_collection("market_data")
-                return {
-                    "client": client,
-                    "collections": {
-                        "risks": risks_collection,
-                        "projects": projects_collection,
-                        "market": market_collection
-                    }
-                }
-            except Exception as e:
-                print(f"Error creating ChromaDB collections: {str(e)}")
-                return {"disabled": True}
-        except ImportError:
-            print("ChromaDB not installed. Please install it with 'pip install chromadb'")
-            return {"disabled": True}
-    elif VECTOR_DB_TYPE == "pinecone":
-        try:
-            import pinecone
-            from config import PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME
-            
-            pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
-            
-            # Check if index exists, if not this would error in a real implementation
-            # but for demo purposes we'll just return the index
-            index = pinecone.Index(PINECONE_INDEX_NAME)
-            return {
-                "client": pinecone,
-                "index": index
-            }
-        except ImportError:
-            print("Pinecone not installed. Please install it with 'pip install pinecone-client'")
-            return {"disabled": True}
-    else:
-        print(f"Unsupported vector database type: {VECTOR_DB_TYPE}")
-        return {"disabled": True}
+    """
+    Return the shared vector database connection.
+    
+    The client and collection handles are created once per process by the
+    connection manager and reused by every caller.
+    """
+    return get_vector_db_manager().get_connection()
 
-def store_risk_data_in_vector_db(risks: List[Dict[str, Any]]) -> bool:
+@traced()
+def store_risk_data_in_vector_db(
+    risks: Iterable[Dict[str, Any]],
+    vector_db: Optional[Dict[str, Any]] = None,
+    deleted_ids: Optional[List[str]] = None,
+    prune_missing: bool = False
+) -> bool:
     """
     Store risk data in the vector database.
     
+    Writes are incremental: only risks whose content hash changed since the
+    last sync are re-embedded and upserted, in batches of VECTOR_SYNC_BATCH_SIZE.
+    
     Args:
-        risks: List of risk dictionaries to store
+        risks: Risk dictionaries to store, e.g. streamed from the risk register
+        vector_db: Connection handle to use; defaults to the shared connection
+        deleted_ids: Ids of tombstoned risks to remove from the store
+        prune_missing: Treat risks as the full register and remove every other stored id
         
     Returns:
         Boolean indicating success or failure
     """
     try:
-        vector_db = initialize_vector_db()
+        vector_db = vector_db or initialize_vector_db()
         if not vector_db:
             print("Failed to initialize vector database")
             return False
@@ -351,61 +462,28 @@ def store_risk_data_in_vector_db(risks: List[Dict[str, Any]]) -> bool:
         if "disabled" in vector_db and vector_db["disabled"]:
             print("Vector database functionality is disabled")
             return True
-            
-        if VECTOR_DB_TYPE == "chromadb":
-            collection = vector_db["collections"]["risks"]
-            
-            # Prepare data for ChromaDB
-            ids = [risk["id"] for risk in risks]
-            documents = [json.dumps(risk) for risk in risks]
-            metadata = [{
-                "project": risk.get("project", "Unknown"),
-                "category": risk.get("category", "Unknown"),
-                "level": risk.get("level", "Unknown"),
-                "score": str(risk.get("score", 0))
-            } for risk in risks]
-            
-            # Add data to collection
-            collection.add(
-                ids=ids,
-                documents=documents,
-                metadatas=metadata
-            )
-            return True
-            
-        elif VECTOR_DB_TYPE == "pinecone":
-            index = vector_db["index"]
-            
-            # Prepare vectors for Pinecone
-            # In a real implementation, you would use an embedding model here
-            # For demo purposes, we'll use a simplified approach
-            vectors = []
-            from langchain_community.embeddings import OllamaEmbeddings
-            embeddings = OllamaEmbeddings(model=OLLAMA_MODEL)
-            
-            for risk in risks:
-                risk_text = f"{risk.get('title', '')} {risk.get('description', '')}"
-                vector = embeddings.embed_query(risk_text)
-                vectors.append({
-                    "id": risk["id"],
-                    "values": vector,
-                    "metadata": {
-                        "project": risk.get("project", "Unknown"),
-                        "category": risk.get("category", "Unknown"),
-                        "level": risk.get("level", "Unknown"),
-                        "score": risk.get("score", 0),
-                        "data": json.dumps(risk)
-                    }
-                })
-            
-            # Upsert vectors to Pinecone
-            index.upsert(vectors=vectors)
-            return True
+        
+        manager = get_vector_db_manager()
+        sync = get_vector_sync(vector_db.get("type", manager.db_type), manager.sync_manifest_path())
+        stats = sync.sync(vector_db, risks, deleted_ids=deleted_ids, prune_missing=prune_missing)
+        print(
+            f"Vector sync: {stats['upserted']} upserted, {stats['deleted']} deleted, "
+            f"{stats['unchanged']} unchanged"
+        )
+        return True
     except Exception as e:
         print(f"Error storing risk data in vector database: {str(e)}")
         return False
 
-def query_risks_from_vector_db(query: str, project: str = None, limit: int = 10) -> List[Dict[str, Any]]:
+@traced()
+def query_risks_from_vector_db(
+    query: str,
+    project: str = None,
+    limit: int = 10,
+    vector_db: Optional[Dict[str, Any]] = None,
+    category: Optional[str] = None,
+    level: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Query risks from the vector database based on semantic similarity.
     
@@ -413,12 +491,15 @@ def query_risks_from_vector_db(query: str, project: str = None, limit: int = 10)
         query: The natural language query
         project: Optional project name to filter by
         limit: Maximum number of results to return
+        vector_db: Connection handle to use; defaults to the shared connection
+        category: Optional risk category to filter by
+        level: Optional risk level to filter by
         
     Returns:
         List of risk dictionaries matching the query
     """
     try:
-        vector_db = initialize_vector_db()
+        vector_db = vector_db or initialize_vector_db()
         if not vector_db:
             print("Failed to initialize vector database")
             return []
@@ -428,12 +509,22 @@ def query_risks_from_vector_db(query: str, project: str = None, limit: int = 10)
             print("Vector database functionality is disabled")
             # Just return empty results when disabled
             return []
+        
+        # Metadata filters shared by every backend
+        filters = {"project": project if project != "All Projects" else None, "category": category, "level": level}
+        filters = {field: value for field, value in filters.items() if value}
+        
+        # Handles carry their backend, so a connection to another backend than the configured one can be passed in
+        db_type = vector_db.get("type", VECTOR_DB_TYPE)
             
-        if VECTOR_DB_TYPE == "chromadb":
+        if db_type == "chromadb":
             collection = vector_db["collections"]["risks"]
             
-            # Prepare filter if project is specified
-            where_filter = {"project": project} if project and project != "All Projects" else None
+            # Prepare filter if project, category or level is specified
+            if len(filters) > 1:
+                where_filter = {"$and": [{field: value} for field, value in filters.items()]}
+            else:
+                where_filter = filters or None
             
             # Query the collection
             results = collection.query(
@@ -454,16 +545,14 @@ def query_risks_from_vector_db(query: str, project: str = None, limit: int = 10)
             
             return risks
             
-        elif VECTOR_DB_TYPE == "pinecone":
+        elif db_type == "pinecone":
             index = vector_db["index"]
             
-            # Generate query embedding
-            from langchain_community.embeddings import OllamaEmbeddings
-            embeddings = OllamaEmbeddings(model=OLLAMA_MODEL)
-            query_embedding = embeddings.embed_query(query)
+            # Generate query embedding; repeated queries are served from the embedding cache
+            query_embedding = get_embedding_service().embed_query(query)
             
-            # Prepare filter if project is specified
-            filter_dict = {"project": {"$eq": project}} if project and project != "All Projects" else None
+            # Prepare filter if project, category or level is specified
+            filter_dict = {field: {"$eq": value} for field, value in filters.items()} or None
             
             # Query Pinecone
             query_response = index.query(
@@ -483,28 +572,125 @@ def query_risks_from_vector_db(query: str, project: str = None, limit: int = 10)
                     continue
             
             return risks
+            
+        elif db_type == "local":
+            index = vector_db["index"]
+            
+            # Embed the query and score it against the memory-mapped index
+            query_embedding = get_embedding_service().embed_query(query)
+            matches = index.query(query_embedding, top_k=limit, filters=filters)
+            
+            # Parse results
+            risks = []
+            for match in matches:
+                try:
+                    risks.append(json.loads(match["document"] or "{}"))
+                except json.JSONDecodeError:
+                    continue
+            
+            return risks
     except Exception as e:
         print(f"Error querying risks from vector database: {str(e)}")
         return []
 
-def populate_vector_db_with_sample_data():
+@traced()
+def get_lexical_index() -> BM25Index:
+    """
+    Return the process-wide BM25 index over the current risk store.
+    
+    The index is built by streaming the stored risks on first use and then
+    kept up to date incrementally through a risk store subscription. It
+    holds only ids and postings; results are read back from the store.
+    When the risk store is replaced, the index is rebuilt from the new one.
+    """
+    global _lexical_index, _lexical_index_repository
+    repository = get_risk_repository()
+    if _lexical_index is None or _lexical_index_repository is not repository:
+        with _lexical_index_lock:
+            if _lexical_index is None or _lexical_index_repository is not repository:
+                _drop_lexical_index()
+                index = BM25Index(repository.get_risks)
+                repository.subscribe(index.add_many)
+                index.add_many(repository.iter_risks())
+                _lexical_index = index
+                _lexical_index_repository = repository
+    return _lexical_index
+
+def _drop_lexical_index() -> None:
+    """Unsubscribe the BM25 index from its risk store and forget it; the caller holds _lexical_index_lock."""
+    global _lexical_index, _lexical_index_repository
+    if _lexical_index is not None:
+        _lexical_index_repository.unsubscribe(_lexical_index.add_many)
+    _lexical_index = None
+    _lexical_index_repository = None
+
+def reset_lexical_index() -> None:
+    """Drop the BM25 index so it is rebuilt from the current risk store on next use."""
+    with _lexical_index_lock:
+        _drop_lexical_index()
+
+@traced()
+def search_risks(
+    query: str,
+    project: Optional[str] = None,
+    limit: int = 10,
+    vector_db: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
-    Populate the vector database with sample risk data.
-    This is for demonstration purposes only.
+    Search risks, combining semantic and keyword ranking.
+    
+    Semantic results from the vector database are re-ranked together with
+    BM25 keyword matches using reciprocal rank fusion. Both indexes are
+    built from the risk register and share its ids, so a risk found by
+    both methods ranks above one found by either alone. Vector hits are
+    read back from the register, so risks changed or deleted since the
+    last vector sync are returned as stored or dropped. When the vector
+    database is disabled or returns nothing, the BM25 results are used on
+    their own.
+    
+    Args:
+        query: The natural language or keyword query
+        project: Optional project name to filter by
+        limit: Maximum number of results to return
+        vector_db: Connection handle to use; defaults to the shared connection
+        
+    Returns:
+        List of risk dictionaries matching the query
     """
-    # Generate sample risk data for all projects
-    all_risks = []
+    for name in ([project] if project and project != "All Projects" else DEFAULT_PROJECTS):
+        ensure_project_seeded(name)
+    lexical_index = get_lexical_index()
     
+    vector_results = query_risks_from_vector_db(query, project, limit, vector_db=vector_db)
+    if vector_results:
+        stored = {risk["id"]: risk for risk in get_risk_repository().get_risks([risk["id"] for risk in vector_results])}
+        vector_results = [stored[risk["id"]] for risk in vector_results if risk["id"] in stored]
+    if not vector_results:
+        return [risk for risk, _ in lexical_index.search(query, limit, project=project)]
+    return lexical_index.rerank(query, vector_results, limit=limit, project=project)
+
+def populate_vector_db_with_sample_data():
+    """
+    Bring the vector database in line with the risk register.
+    
+    The default projects are seeded with sample risks if the register has
+    none yet. Risks are then streamed from the register into the
+    incremental vector sync, which re-embeds only changed risks and removes
+    risks no longer in the register. The sync is skipped when the index
+    manifest shows the register's current data version is already indexed,
+    so a warm start does not even hash anything.
+    """
+    repository = get_risk_repository()
     for project in DEFAULT_PROJECTS:
-        dates = [datetime.now() - timedelta(days=i) for i in range(30)]
-        
-        for date in dates:
-            num_risks = random.randint(1, 3)
-            for _ in range(num_risks):
-                risk = generate_mock_risk(project, date)
-                # Add project name to risk data
-                risk["project"] = project
-                all_risks.append(risk)
-    
-    # Store data in vector DB
-    return store_risk_data_in_vector_db(all_risks)
+        ensure_project_seeded(project)
+    
+    manager = get_vector_db_manager()
+    data_version = f"{VECTOR_DATA_VERSION}.{repository.data_version()}"
+    if manager.index_is_current(data_version):
+        print("Vector index is up to date; skipping vector sync")
+        return True
+    
+    stored = store_risk_data_in_vector_db(repository.iter_risks(), prune_missing=True)
+    if stored and manager.is_connected():
+        manager.write_manifest(repository.count_risks(), data_version=data_version, projects=DEFAULT_PROJECTS)
+    return stored
@@ -0,0 +1,230 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from config import (
+    OLLAMA_MODEL,
+    OLLAMA_BASE_URL,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_WORKERS
+)
+
+def text_hash(text: str) -> str:
+    """Return the cache key component for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    SQLite-backed cache of embeddings keyed by model name and text hash.
+
+    Vectors are stored as float32 blobs. When the stored vectors exceed
+    max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._connection.commit()
+        self._total_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for the given text hashes, keyed by hash."""
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = list(hashes[start:start + 500])
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({', '.join('?' for _ in chunk)})",
+                    [model] + chunk
+                ).fetchall()
+                for digest, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[digest] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, digest) for digest in found]
+                )
+                self._connection.commit()
+
+            self.hits += len(found)
+            self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]) -> None:
+        """Store vectors keyed by text hash, evicting old entries if the cache is over size."""
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = [(model, digest, array("f", vector).tobytes(), now) for digest, vector in vectors.items()]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._total_bytes += sum(len(row[2]) for row in rows)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is at 90% of max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        self._total_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        cursor = self._connection.execute(
+            "SELECT model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        )
+        victims = []
+        for model, digest, size in cursor:
+            if self._total_bytes <= target:
+                break
+            victims.append((model, digest))
+            self._total_bytes -= size
+        self._connection.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+class EmbeddingService:
+    """
+    Batched, cached access to the embedding model.
+
+    Texts are de-duplicated and looked up in the disk cache first. Whatever
+    is missing is split into batches that are embedded concurrently with
+    embed_documents on a bounded worker pool, then written back to the cache.
+    """
+
+    def __init__(
+        self,
+        model: str = OLLAMA_MODEL,
+        cache: Optional[EmbeddingCache] = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_workers: int = EMBEDDING_MAX_WORKERS,
+        embed_batch: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ):
+        """
+        Args:
+            model: Embedding model name, also part of the cache key
+            cache: Disk cache to use; None disables caching
+            batch_size: Maximum number of texts per embed_documents call
+            max_workers: Maximum number of batches embedded at the same time
+            embed_batch: Function embedding a list of texts; defaults to Ollama embeddings
+        """
+        self.model = model
+        self.cache = cache
+        self.batch_size = max(batch_size, 1)
+        self.max_workers = max(max_workers, 1)
+        self._embed_batch = embed_batch
+        self._embed_lock = threading.Lock()
+
+    def _backend(self) -> Callable[[List[str]], List[List[float]]]:
+        if self._embed_batch is None:
+            with self._embed_lock:
+                if self._embed_batch is None:
+                    from langchain_community.embeddings import OllamaEmbeddings
+                    self._embed_batch = OllamaEmbeddings(model=self.model, base_url=OLLAMA_BASE_URL).embed_documents
+        return self._embed_batch
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embed a list of texts.
+
+        Args:
+            texts: Texts to embed; duplicates are embedded once
+
+        Returns:
+            One vector per input text, in input order
+        """
+        hashes = [text_hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+
+        vectors = self.cache.get_many(self.model, list(unique)) if self.cache else {}
+        missing = [digest for digest in unique if digest not in vectors]
+
+        if missing:
+            batches = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+            embed_batch = self._backend()
+
+            def run(batch: List[str]) -> Dict[str, List[float]]:
+                return dict(zip(batch, embed_batch([unique[digest] for digest in batch])))
+
+            if len(batches) == 1:
+                fresh = run(batches[0])
+            else:
+                fresh = {}
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                    for result in pool.map(run, batches):
+                        fresh.update(result)
+
+            if self.cache:
+                self.cache.put_many(self.model, fresh)
+            vectors.update(fresh)
+
+        return [vectors[digest] for digest in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query text, using the cache for repeated queries."""
+        return self.embed_documents([text])[0]
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service backed by the disk cache."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService(cache=EmbeddingCache())
+    return _service
+
+def set_embedding_service(service: Optional[EmbeddingService]) -> Optional[EmbeddingService]:
+    """
+    Replace the process-wide embedding service, e.g. with an offline stub for benchmarks.
+
+    Returns:
+        The service that was in use before
+    """
+    global _service
+    with _service_lock:
+        previous, _service = _service, service
+    return previous
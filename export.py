@@ -0,0 +1,245 @@
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+import pandas as pd
+from config import DEFAULT_PROJECTS, EXPORT_DIRECTORY, EXPORT_URL_PATH, EXPORT_CHUNK_SIZE, EXPORT_MAX_ARTIFACTS
+from risk_store import RISK_COLUMNS, get_risk_repository, since_date
+from risk_table import RiskTable
+from tracing import traced
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet")
+}
+
+EXPORT_FORMAT_LABELS = {
+    "csv": "CSV",
+    "csv.gz": "CSV (gzip)",
+    "parquet": "Parquet"
+}
+
+INTEGER_COLUMNS = {"score", "probability", "impact"}
+
+class ExportArtifact:
+    """A finished export file, ready to be offered for download."""
+
+    def __init__(self, path: str, export_format: str, rows: int, cached: bool):
+        self.path = path
+        self.format = export_format
+        self.rows = rows
+        self.cached = cached
+        self.size = os.path.getsize(path)
+
+    @property
+    def mime(self) -> str:
+        return EXPORT_FORMATS[self.format][1]
+
+    @property
+    def url(self) -> str:
+        """Relative URL Streamlit's static file server streams the file from."""
+        return f"{EXPORT_URL_PATH}/{os.path.basename(self.path)}"
+
+    def exists(self) -> bool:
+        """Return False once the file has been evicted to make room for newer exports."""
+        return os.path.exists(self.path)
+
+    def file_name(self, stem: str) -> str:
+        return f"{stem}{EXPORT_FORMATS[self.format][0]}"
+
+def available_formats() -> List[str]:
+    """Return the export formats usable in this environment; Parquet needs pyarrow."""
+    return [
+        export_format for export_format in EXPORT_FORMATS
+        if export_format != "parquet" or importlib.util.find_spec("pyarrow") is not None
+    ]
+
+def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+    """Give every chunk the same column order and types, with mitigation strategies as JSON text."""
+    frame = frame.reindex(columns=RISK_COLUMNS)
+    columns = {}
+    for column in RISK_COLUMNS:
+        values = frame[column]
+        if column in INTEGER_COLUMNS:
+            columns[column] = pd.to_numeric(values, errors="coerce").fillna(0).astype("int64")
+        elif column == "mitigation_strategies":
+            columns[column] = values.map(lambda value: value if isinstance(value, str) or value is None else json.dumps(value))
+        else:
+            columns[column] = values.astype(object)
+    return pd.DataFrame(columns)
+
+def _write_csv(frames: Iterable[pd.DataFrame], path: str, compress: bool) -> int:
+    rows = 0
+    opener = gzip.open if compress else open
+    with opener(path, "wt", encoding="utf-8", newline="") as f:
+        for frame in frames:
+            _normalize(frame).to_csv(f, index=False, header=rows == 0)
+            rows += len(frame)
+        if rows == 0:
+            pd.DataFrame(columns=RISK_COLUMNS).to_csv(f, index=False)
+    return rows
+
+def _write_parquet(frames: Iterable[pd.DataFrame], path: str) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string()) for column in RISK_COLUMNS])
+    rows = 0
+    # Each chunk becomes a row group, so only one chunk is held in memory at a time
+    with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(_normalize(frame), schema=schema, preserve_index=False))
+            rows += len(frame)
+    return rows
+
+def write_frames(frames: Iterable[pd.DataFrame], export_format: str, path: str) -> int:
+    """
+    Write a stream of risk frames to a file in the given format.
+
+    Args:
+        frames: Chunks of risks, each with the RISK_COLUMNS columns
+        export_format: One of EXPORT_FORMATS
+        path: File to write
+
+    Returns:
+        Number of risks written
+    """
+    if export_format == "parquet":
+        return _write_parquet(frames, path)
+    if export_format in ("csv", "csv.gz"):
+        return _write_csv(frames, path, compress=export_format == "csv.gz")
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+class RiskExporter:
+    """
+    Writes risk exports to files on demand and reuses them while the data is unchanged.
+
+    Risks are read from the store in chunks and written out chunk by chunk,
+    so exporting a million-row register needs memory for one chunk only.
+    Files are keyed by format, filters (with the date window they cover)
+    and data version, so a repeated download of unchanged data is served
+    from disk. The least recently used files beyond max_artifacts are
+    deleted; callers holding an artifact check exists() before offering it.
+    """
+
+    def __init__(
+        self,
+        directory: str = EXPORT_DIRECTORY,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        max_artifacts: int = EXPORT_MAX_ARTIFACTS
+    ):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_artifacts = max_artifacts
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _build(self, key: str, export_format: str, frames: Iterable[pd.DataFrame]) -> ExportArtifact:
+        path = os.path.join(self.directory, f"{key}{EXPORT_FORMATS[export_format][0]}")
+        # Concurrent requests for the same export wait for one writer
+        with self._key_lock(key):
+            rows_path = f"{path}.rows"
+            if os.path.exists(path) and os.path.exists(rows_path):
+                os.utime(path)
+                with open(rows_path, "r") as f:
+                    return ExportArtifact(path, export_format, int(f.read() or 0), cached=True)
+
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            try:
+                rows = write_frames(frames, export_format, temp_path)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            with open(rows_path, "w") as f:
+                f.write(str(rows))
+
+        self._evict()
+        return ExportArtifact(path, export_format, rows, cached=False)
+
+    def _evict(self) -> None:
+        with self._lock:
+            artifacts = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if not name.endswith((".rows", ".tmp"))
+            ]
+            artifacts.sort(key=os.path.getmtime, reverse=True)
+            for path in artifacts[self.max_artifacts:]:
+                for stale in (path, f"{path}.rows"):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+
+    @traced("export")
+    def export_register(
+        self,
+        export_format: str,
+        project: str,
+        days_back: int,
+        level: Optional[Sequence[str]] = None,
+        category: Optional[Sequence[str]] = None
+    ) -> ExportArtifact:
+        """
+        Export the stored risks matching the risk list filters.
+
+        Args:
+            export_format: One of EXPORT_FORMATS
+            project: Project name or "All Projects"
+            days_back: Number of days of history to include
+            level: Risk levels to include, or None for all
+            category: Categories to include, or None for all
+
+        Returns:
+            The export file, reused from disk if the data has not changed
+        """
+        from data_handlers import get_data_version
+
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        # Keyed on the first day of the window, so the file is rebuilt when the date rolls over
+        since = since_date(days_back)
+        filters = [project, since, sorted(level) if level is not None else None, sorted(category) if category is not None else None]
+        key = hashlib.sha256(json.dumps([export_format, filters, get_data_version()]).encode("utf-8")).hexdigest()[:24]
+
+        frames = get_risk_repository().iter_frames(
+            project=DEFAULT_PROJECTS if project == "All Projects" else project,
+            since=since,
+            level=level,
+            category=category,
+            chunk_size=self.chunk_size
+        )
+        return self._build(key, export_format, frames)
+
+    @traced("export")
+    def export_table(self, export_format: str, table: RiskTable) -> ExportArtifact:
+        """Export risks already held in memory, such as search results."""
+        frame = table.to_frame()
+        digest = hashlib.sha256(pd.util.hash_pandas_object(_normalize(frame), index=False).values.tobytes()).hexdigest()[:24]
+        chunks = (frame.iloc[start:start + self.chunk_size] for start in range(0, len(frame), self.chunk_size))
+        return self._build(f"table-{digest}", export_format, chunks)
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def get_risk_exporter() -> RiskExporter:
+    """Return the process-wide risk exporter."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = RiskExporter()
+    return _exporter
@@ -0,0 +1,280 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Words too common in risk text to help ranking
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "with", "risk", "risks", "related"
+}
+
+# How many times each field's terms count towards a document's term frequencies
+FIELD_WEIGHTS = {
+    "title": 2,
+    "category": 2,
+    "description": 1,
+    "mitigation_strategies": 1
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case text, split it into terms, drop stopwords and strip plural endings."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def risk_terms(risk: Dict[str, Any]) -> Counter:
+    """Return the weighted term frequencies of a risk's searchable fields."""
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = risk.get(field)
+        if not value:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(item) for item in value)
+        for token in tokenize(str(value)):
+            terms[token] += weight
+    return terms
+
+# Risk fields search results can be restricted on, kept in the index for every risk
+FILTER_FIELDS = ("project", "category", "level")
+
+class BM25Index:
+    """
+    In-process inverted index over risks, ranked with Okapi BM25.
+
+    Risks can be added or replaced one at a time, so the index stays in step
+    with the risk store without ever being rebuilt. The index holds only
+    postings, document lengths and integer codes of the filter fields, with
+    each risk id mapped to a slot; the top results are read back through
+    fetch_risks.
+
+    A search adds up the query terms' per-risk scores in a NumPy array
+    (each term's scores are computed once and kept until the next write)
+    and selects the top slots with a partition, so no Python-level loop
+    runs over the postings.
+    """
+
+    def __init__(
+        self,
+        fetch_risks: Callable[[Sequence[str]], List[Dict[str, Any]]],
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        self.fetch_risks = fetch_risks
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._terms: Dict[int, Tuple[str, ...]] = {}
+        self._lengths = np.zeros(0, dtype=np.float32)
+        # Per filter field: slot -> code of the field's value (-1 for free slots), and value -> code
+        self._field_codes = [np.zeros(0, dtype=np.int32) for _ in FILTER_FIELDS]
+        self._field_values: List[Dict[Any, int]] = [{} for _ in FILTER_FIELDS]
+        self._term_scores: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, risk_id: str) -> bool:
+        return risk_id in self._slots
+
+    def _allocate(self, risk_id: str) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._ids[slot] = risk_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(risk_id)
+            if slot >= len(self._lengths):
+                capacity = max(1024, 2 * len(self._lengths))
+                self._lengths = np.resize(self._lengths, capacity)
+                self._field_codes = [
+                    np.concatenate([codes, np.full(capacity - len(codes), -1, dtype=np.int32)])
+                    for codes in self._field_codes
+                ]
+        self._slots[risk_id] = slot
+        return slot
+
+    def add(self, risk: Dict[str, Any]) -> None:
+        """Add a risk, replacing any earlier version with the same id."""
+        risk_id = risk["id"]
+        terms = risk_terms(risk)
+        with self._lock:
+            slot = self._slots.get(risk_id)
+            if slot is None:
+                slot = self._allocate(risk_id)
+            else:
+                self._remove_postings(slot)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[slot] = frequency
+            length = sum(terms.values())
+            self._lengths[slot] = length
+            self._total_length += length
+            self._terms[slot] = tuple(terms)
+            for codes, values, field in zip(self._field_codes, self._field_values, FILTER_FIELDS):
+                codes[slot] = values.setdefault(risk.get(field), len(values))
+            self._term_scores.clear()
+
+    def add_many(self, risks: Iterable[Dict[str, Any]]) -> None:
+        for risk in risks:
+            self.add(risk)
+
+    def remove(self, risk_id: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(risk_id, None)
+            if slot is not None:
+                self._remove_postings(slot)
+                self._ids[slot] = None
+                for codes in self._field_codes:
+                    codes[slot] = -1
+                self._free_slots.append(slot)
+                self._term_scores.clear()
+
+    def _remove_postings(self, slot: int) -> None:
+        for term in self._terms.pop(slot, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slot, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= int(self._lengths[slot])
+        self._lengths[slot] = 0
+
+    def _idf(self, term: str) -> float:
+        count = len(self._slots)
+        matches = len(self._postings[term])
+        return math.log(1 + (count - matches + 0.5) / (matches + 0.5))
+
+    def _scores_for(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the slots containing a term and the term's BM25 score for each."""
+        cached = self._term_scores.get(term)
+        if cached is None:
+            postings = self._postings[term]
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            average_length = self._total_length / len(self._slots)
+            norms = self.k1 * (1 - self.b + self.b * self._lengths[slots] / average_length)
+            scores = (self._idf(term) * frequencies * (self.k1 + 1) / (frequencies + norms)).astype(np.float32)
+            cached = self._term_scores[term] = (slots, scores)
+        return cached
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """Return the BM25 score of every risk matching at least one query term."""
+        terms = set(tokenize(query))
+        scores: Dict[str, float] = {}
+        with self._lock:
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                for slot, score in zip(*self._scores_for(term)):
+                    risk_id = self._ids[slot]
+                    scores[risk_id] = scores.get(risk_id, 0.0) + float(score)
+        return scores
+
+    def top_ids(
+        self,
+        query: str,
+        limit: int = 10,
+        project: Optional[str] = None,
+        category: Optional[str] = None,
+        level: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Return the ids and scores of the best-matching risks, best match first; see search()."""
+        wanted = (project if project != "All Projects" else None, category, level)
+        with self._lock:
+            terms = [term for term in set(tokenize(query)) if term in self._postings]
+            if not terms or limit <= 0:
+                return []
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term in terms:
+                slots, term_scores = self._scores_for(term)
+                scores[slots] += term_scores
+            for codes, values, value in zip(self._field_codes, self._field_values, wanted):
+                if value:
+                    if value not in values:
+                        return []
+                    scores[codes[:len(scores)] != values[value]] = 0
+
+            # Everything above the limit-th best score, then ties with it in slot order; argpartition
+            # is avoided because it slows down badly on the long runs of equal scores templated text gives
+            best = scores.max()
+            if np.count_nonzero(scores == best) >= limit:
+                kth = best
+            else:
+                kth = -np.partition(-scores, limit - 1)[limit - 1] if limit < len(scores) else 0.0
+            if kth > 0:
+                above = np.flatnonzero(scores > kth)
+                top = np.concatenate([above, np.flatnonzero(scores == kth)[:limit - len(above)]])
+            else:
+                top = np.flatnonzero(scores > 0)
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[slot], float(scores[slot])) for slot in top]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        project: Optional[str] = None,
+        category: Optional[str] = None,
+        level: Optional[str] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Return the best-matching risks for a keyword query.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+            project: Optional project to restrict results to ("All Projects" means no restriction)
+            category: Optional risk category to restrict results to
+            level: Optional risk level to restrict results to
+
+        Returns:
+            List of (risk, score) pairs, best match first
+        """
+        ranked = self.top_ids(query, limit, project=project, category=category, level=level)
+        risks = {risk["id"]: risk for risk in self.fetch_risks([risk_id for risk_id, _ in ranked])}
+        # Risks deleted from the store since they were indexed are left out
+        return [(risks[risk_id], score) for risk_id, score in ranked if risk_id in risks]
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], limit: int = 10,
+               project: Optional[str] = None, rrf_k: int = 60) -> List[Dict[str, Any]]:
+        """
+        Fuse semantic results with BM25 results using reciprocal rank fusion.
+
+        Args:
+            query: The query both result lists were produced for
+            candidates: Risks in semantic (vector) rank order
+            limit: Maximum number of results
+            project: Optional project restriction for the lexical results
+            rrf_k: Rank-fusion damping constant
+
+        Returns:
+            Risks ordered by fused rank
+        """
+        fused: Dict[str, float] = {}
+        by_id: Dict[str, Dict[str, Any]] = {}
+
+        for rank, risk in enumerate(candidates):
+            by_id[risk["id"]] = risk
+            fused[risk["id"]] = fused.get(risk["id"], 0.0) + 1 / (rrf_k + rank + 1)
+
+        for rank, (risk, _) in enumerate(self.search(query, limit=max(limit, len(candidates)), project=project)):
+            by_id.setdefault(risk["id"], risk)
+            fused[risk["id"]] = fused.get(risk["id"], 0.0) + 1 / (rrf_k + rank + 1)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        return [by_id[risk_id] for risk_id, _ in ranked[:limit]]
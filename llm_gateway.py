@@ -0,0 +1,312 @@
+import contextvars
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+from config import (
+    LLM_MAX_IN_FLIGHT,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF,
+    LLM_RETRY_BACKOFF_MAX
+)
+from streaming import restart_stage
+from tool_output import estimate_tokens
+from tracing import get_tracer, span
+
+T = TypeVar("T")
+
+# Exception class names raised by requests, httpx and litellm for errors worth retrying
+TRANSIENT_ERROR_TYPES = {
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "TimeoutException",
+    "RemoteDisconnected", "APIConnectionError", "RateLimitError", "ServiceUnavailableError",
+    "InternalServerError", "APITimeoutError"
+}
+# HTTP statuses worth retrying, read from the error or the response it carries
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+TRANSIENT_STATUS_PATTERN = re.compile(r"\b(?:status code|error code)[:\s]+(429|500|502|503|504)\b", re.IGNORECASE)
+TRANSIENT_MESSAGE_PATTERN = re.compile(r"rate limit|too many requests|server busy|temporarily unavailable", re.IGNORECASE)
+# A used-up quota is reported as a 429 but will not clear by retrying
+PERMANENT_MESSAGE_PATTERN = re.compile(r"quota|billing", re.IGNORECASE)
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised when an LLM request cannot complete before its deadline."""
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Return True if an LLM call failing with error may succeed when retried.
+
+    Errors raised while handling another error are judged by that cause too,
+    since crewAI re-raises streaming failures as a plain Exception.
+    """
+    cause = error.__cause__ or error.__context__
+    if cause is not None and cause is not error and is_transient_error(cause):
+        return not PERMANENT_MESSAGE_PATTERN.search(str(error))
+    message = str(error)
+    if PERMANENT_MESSAGE_PATTERN.search(message):
+        return False
+    if any(cls.__name__ in TRANSIENT_ERROR_TYPES for cls in type(error).__mro__):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code in TRANSIENT_STATUS_CODES:
+        return True
+    return bool(TRANSIENT_STATUS_PATTERN.search(message) or TRANSIENT_MESSAGE_PATTERN.search(message))
+
+_current_session: contextvars.ContextVar[str] = contextvars.ContextVar("llm_session", default="default")
+_current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+@contextmanager
+def llm_session(session_id: str) -> Iterator[None]:
+    """Queue LLM requests made inside the block under the given session."""
+    token = _current_session.set(session_id)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+def current_session() -> str:
+    """Return the session LLM requests are currently queued under."""
+    return _current_session.get()
+
+@contextmanager
+def llm_deadline(seconds: float) -> Iterator[None]:
+    """Fail LLM requests made inside the block that cannot finish within seconds from now."""
+    deadline = time.monotonic() + seconds
+    current = _current_deadline.get()
+    token = _current_deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+class LLMGateway:
+    """
+    Admission control for requests to the LLM server.
+
+    At most max_in_flight requests run at once. Waiting requests are queued
+    per session and free slots are handed out round-robin across sessions,
+    so one session's burst of agent calls cannot starve other users.
+    Transient failures (connection errors, timeouts, rate limits, 5xx) are
+    retried with exponential backoff and jitter, without holding a slot
+    while backing off. Queue waits and retries respect the caller's deadline.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_RETRY_BACKOFF,
+        backoff_max: float = LLM_RETRY_BACKOFF_MAX,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            max_in_flight: Maximum concurrent requests to the LLM server
+            max_retries: Retries of a request that failed with a transient error
+            backoff: Delay before the first retry, doubled for each further retry
+            backoff_max: Upper bound on a single retry delay
+            sleep: Function used to wait between retries
+        """
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        # Session -> waiting tickets; dict order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[object]]" = OrderedDict()
+        self._granted = set()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.deadline_exceeded = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+
+    def _grant(self) -> None:
+        while self._in_flight < self.max_in_flight and self._queues:
+            session_id, tickets = self._queues.popitem(last=False)
+            self._granted.add(tickets.popleft())
+            self._in_flight += 1
+            if tickets:
+                # The session goes to the back of the rotation
+                self._queues[session_id] = tickets
+        self._condition.notify_all()
+
+    def _queue_depth(self) -> int:
+        return sum(len(tickets) for tickets in self._queues.values())
+
+    def acquire(self, session_id: str, deadline: Optional[float] = None) -> None:
+        """
+        Wait for a request slot.
+
+        Raises:
+            LLMDeadlineExceeded: If the deadline passes before a slot is free
+        """
+        ticket = object()
+        queued_at = time.monotonic()
+        with self._condition:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            self.max_queue_depth = max(self.max_queue_depth, self._queue_depth())
+            self._grant()
+            while ticket not in self._granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    tickets = self._queues[session_id]
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del self._queues[session_id]
+                    self.deadline_exceeded += 1
+                    raise LLMDeadlineExceeded("Deadline passed while waiting for the LLM server")
+                self._condition.wait(remaining)
+            self._granted.discard(ticket)
+            self.total_wait += time.monotonic() - queued_at
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._grant()
+
+    def call(self, fn: Callable[[], T], session_id: Optional[str] = None, deadline: Optional[float] = None) -> T:
+        """
+        Run an LLM request through the gateway.
+
+        Args:
+            fn: Performs the request
+            session_id: Queue to wait in; defaults to the session set with llm_session()
+            deadline: time.monotonic() value by which the request must finish;
+                defaults to the deadline set with llm_deadline()
+
+        Returns:
+            fn's result
+
+        Raises:
+            LLMDeadlineExceeded: If the request could not be started or retried in time
+            The last error from fn if it was not transient or retries ran out
+        """
+        session_id = session_id or _current_session.get()
+        deadline = deadline if deadline is not None else _current_deadline.get()
+
+        attempt = 0
+        while True:
+            with span("llm.queue", "queue", attempt=attempt):
+                self.acquire(session_id, deadline)
+            with self._condition:
+                self.requests += 1
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    with self._condition:
+                        self.failures += 1
+                    raise
+                error = e
+            finally:
+                self.release()
+
+            attempt += 1
+            delay = min(self.backoff * 2 ** (attempt - 1), self.backoff_max) * random.uniform(0.5, 1.0)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                with self._condition:
+                    self.failures += 1
+                    self.deadline_exceeded += 1
+                raise LLMDeadlineExceeded(f"Deadline passed before the LLM request could be retried: {error}") from error
+            with self._condition:
+                self.retries += 1
+            print(f"Transient LLM error, retrying in {delay:.1f}s (attempt {attempt} of {self.max_retries}): {str(error)}")
+            self.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "queue_depth": self._queue_depth(),
+                "queue_depth_by_session": {session_id: len(tickets) for session_id, tickets in self._queues.items()},
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "deadline_exceeded": self.deadline_exceeded,
+                "average_wait": self.total_wait / self.requests if self.requests else 0.0
+            }
+
+_llm_gateway = None
+_llm_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide LLM gateway."""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway()
+    return _llm_gateway
+
+_gateway_llm_class = None
+
+def _message_text(messages: Any) -> str:
+    """Text of a crewAI prompt, given as a string or a list of role/content messages."""
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content") or "") for message in messages)
+
+def create_gateway_llm(**kwargs: Any):
+    """
+    Create a crewAI LLM whose requests go through the LLM gateway.
+
+    crewAI only accepts its own LLM classes for an agent and rebuilds
+    anything else, so the gateway wraps crewai.LLM.call rather than a
+    LangChain client. While tracing, each call is recorded as an llm span
+    with estimated token counts; crewAI's call() returns only the text, not
+    the usage Ollama reports. A retried call tells the active response
+    stream to drop what the failed attempt streamed.
+
+    Args:
+        **kwargs: Arguments for crewai.LLM
+
+    Returns:
+        The LLM instance
+    """
+    global _gateway_llm_class
+    if _gateway_llm_class is None:
+        from crewai import LLM
+
+        class GatewayLLM(LLM):
+            """crewAI LLM that waits for a gateway slot before each completion call."""
+
+            def call(
+                self,
+                messages: Any,
+                tools: Optional[List[dict]] = None,
+                callbacks: Optional[List[Any]] = None,
+                available_functions: Optional[Dict[str, Any]] = None
+            ) -> Any:
+                attempts = [0]
+
+                def request() -> Any:
+                    attempts[0] += 1
+                    if attempts[0] > 1:
+                        # Tokens streamed by the failed attempt are about to be generated again
+                        restart_stage()
+                    return LLM.call(self, messages, tools, callbacks, available_functions)
+
+                if not get_tracer().active():
+                    return get_llm_gateway().call(request)
+
+                prompt = _message_text(messages)
+                with span("llm.generate", "llm", model=self.model, prompt_chars=len(prompt)) as current:
+                    result = get_llm_gateway().call(request)
+                    completion = result if isinstance(result, str) else str(result)
+                    current.set(
+                        prompt_tokens=estimate_tokens(prompt),
+                        completion_tokens=estimate_tokens(completion),
+                        completion_chars=len(completion)
+                    )
+                    return result
+
+        _gateway_llm_class = GatewayLLM
+    return _gateway_llm_class(**kwargs)
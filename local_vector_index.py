@@ -0,0 +1,372 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+from config import LOCAL_VECTOR_COARSE_MIN_ROWS, LOCAL_VECTOR_COARSE_DIMENSIONS, LOCAL_VECTOR_RERANK_CANDIDATES
+
+# Metadata fields that can be used in query filters, in attribute column order
+FILTER_FIELDS = ["project", "category", "level"]
+ALIVE_COLUMN = len(FILTER_FIELDS)
+
+# Rows allocated when the first vectors are written; capacity then doubles as needed
+INITIAL_CAPACITY = 1024
+
+# Rows copied or projected per step, so growing the files never loads them whole
+COPY_CHUNK_ROWS = 65_536
+
+# Rows sampled to fit the coarse projection
+PROJECTION_SAMPLE_ROWS = 20_000
+
+class LocalVectorIndex:
+    """
+    File-backed vector index that needs no external service.
+
+    Layout of the index directory:
+        vectors.npy     float32 matrix of unit-normalized embeddings, one row per record
+        attributes.npy  int32 matrix of project/category/level codes plus an alive flag
+        projection.npy  float32 matrix projecting embeddings onto their main directions
+        reduced.npy     float32 matrix of projected embeddings, one row per record
+        vocab.json      value -> code mapping for each filter field
+        records.db      SQLite sidecar mapping row number to record id and stored document
+
+    The .npy files are opened memory-mapped, so opening an existing index
+    costs almost nothing. They are allocated with spare rows that grow
+    geometrically: an upsert writes its rows in place and only flushes the
+    pages it touched, and growing copies the used rows once per doubling,
+    so loading N vectors costs O(N) I/O. Rows beyond the number in use have
+    a zero alive flag and are never scored.
+
+    A query is one matrix-vector product over the rows left after applying
+    the metadata filters as boolean masks. Once the index holds
+    coarse_min_rows records, a projection onto the main directions of the
+    embeddings is fitted, and queries first score the much smaller projected
+    rows, then re-score the best rerank_candidates with the full embeddings.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        coarse_min_rows: int = LOCAL_VECTOR_COARSE_MIN_ROWS,
+        coarse_dimensions: int = LOCAL_VECTOR_COARSE_DIMENSIONS,
+        rerank_candidates: int = LOCAL_VECTOR_RERANK_CANDIDATES
+    ):
+        self.directory = directory
+        self.coarse_min_rows = coarse_min_rows
+        self.coarse_dimensions = coarse_dimensions
+        self.rerank_candidates = rerank_candidates
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(directory, "vectors.npy")
+        self._attributes_path = os.path.join(directory, "attributes.npy")
+        self._projection_path = os.path.join(directory, "projection.npy")
+        self._reduced_path = os.path.join(directory, "reduced.npy")
+        self._vocab_path = os.path.join(directory, "vocab.json")
+
+        self._sidecar = sqlite3.connect(os.path.join(directory, "records.db"), check_same_thread=False)
+        self._sidecar.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                document TEXT
+            )
+        """)
+        self._sidecar.commit()
+
+        self._vocab: Dict[str, Dict[str, int]] = {field: {} for field in FILTER_FIELDS}
+        if os.path.exists(self._vocab_path):
+            with open(self._vocab_path, "r") as f:
+                self._vocab.update(json.load(f))
+
+        self._size = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._attributes: Optional[np.ndarray] = None
+        self._projection: Optional[np.ndarray] = None
+        self._reduced: Optional[np.ndarray] = None
+        self._open_arrays()
+
+    def _open_arrays(self) -> None:
+        # Rows are handed out in order, and a row only counts once its record is committed
+        self._size = self._sidecar.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM records").fetchone()[0]
+        if os.path.exists(self._vectors_path) and os.path.exists(self._attributes_path):
+            self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+            self._attributes = np.load(self._attributes_path, mmap_mode="r+")
+        else:
+            self._vectors = None
+            self._attributes = None
+            self._size = 0
+            # Without the arrays the recorded rows point at nothing; start the sidecar over too
+            with self._sidecar:
+                self._sidecar.execute("DELETE FROM records")
+        if self._vectors is not None and os.path.exists(self._projection_path) and os.path.exists(self._reduced_path):
+            self._projection = np.load(self._projection_path)
+            self._reduced = np.load(self._reduced_path, mmap_mode="r+")
+        else:
+            self._projection = None
+            self._reduced = None
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self._vectors is None else self._vectors.shape[1]
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def count(self) -> int:
+        """Return the number of live (non-deleted) records."""
+        if self._attributes is None:
+            return 0
+        return int(np.count_nonzero(self._attributes[:self._size, ALIVE_COLUMN]))
+
+    def _code(self, field: str, value: Any) -> int:
+        vocab = self._vocab[field]
+        value = str(value)
+        if value not in vocab:
+            vocab[value] = len(vocab)
+        return vocab[value]
+
+    def _save_array(self, path: str, array: np.ndarray) -> None:
+        # Write to a temporary file and swap it in so readers never see a partial file
+        temp_path = f"{path}.tmp.npy"
+        np.save(temp_path, array)
+        os.replace(temp_path, path)
+
+    def _grown(self, path: str, old: Optional[np.ndarray], shape: tuple, dtype: Any, fill=None) -> np.ndarray:
+        """
+        Return a new memory-mapped file of the given shape holding the used rows of old.
+
+        The copy runs in chunks through the page cache. Queries that took a
+        view of the old file keep reading it until they finish.
+        """
+        temp_path = f"{path}.tmp.npy"
+        grown = np.lib.format.open_memmap(temp_path, mode="w+", dtype=dtype, shape=shape)
+        for start in range(0, self._size, COPY_CHUNK_ROWS):
+            stop = min(start + COPY_CHUNK_ROWS, self._size)
+            grown[start:stop] = old[start:stop] if fill is None else fill(start, stop)
+        grown.flush()
+        # The mapping follows the file, so it stays valid after the rename
+        os.replace(temp_path, path)
+        return grown
+
+    def _reserve(self, rows: int, dimension: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, self.capacity * 2, INITIAL_CAPACITY)
+        self._vectors = self._grown(self._vectors_path, self._vectors, (capacity, dimension), np.float32)
+        # New rows start zeroed, so their alive flag is off
+        self._attributes = self._grown(self._attributes_path, self._attributes, (capacity, ALIVE_COLUMN + 1), np.int32)
+        if self._reduced is not None:
+            self._reduced = self._grown(self._reduced_path, self._reduced, (capacity, self._projection.shape[1]), np.float32)
+
+    def _fit_projection(self) -> None:
+        """Fit the coarse projection on a sample of the stored embeddings and project every row."""
+        dimensions = min(self.coarse_dimensions, self.dimension)
+        if dimensions >= self.dimension:
+            return
+        alive = np.flatnonzero(self._attributes[:self._size, ALIVE_COLUMN])
+        if alive.size == 0:
+            return
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(alive, size=min(PROJECTION_SAMPLE_ROWS, alive.size), replace=False))
+        # The top right singular vectors preserve as much of the dot products as any projection of that size
+        _, _, components = np.linalg.svd(np.asarray(self._vectors[sample]), full_matrices=False)
+        projection = np.ascontiguousarray(components[:dimensions].T, dtype=np.float32)
+
+        vectors = self._vectors
+        self._reduced = self._grown(
+            self._reduced_path, None, (self.capacity, dimensions), np.float32,
+            fill=lambda start, stop: vectors[start:stop] @ projection
+        )
+        self._save_array(self._projection_path, projection)
+        self._projection = projection
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[Dict[str, Any]],
+        documents: Sequence[str]
+    ) -> None:
+        """
+        Insert new records and overwrite existing ones with the same id.
+
+        Args:
+            ids: Record ids
+            vectors: Embedding for each record
+            metadatas: Metadata for each record; project, category and level are filterable
+            documents: Stored document returned by queries
+        """
+        if not ids:
+            return
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("Expected one embedding per id")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            if self.dimension is not None and matrix.shape[1] != self.dimension:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match index dimension {self.dimension}")
+
+            vocab_size = sum(len(values) for values in self._vocab.values())
+            codes = np.array([
+                [self._code(field, metadata.get(field, "Unknown")) for field in FILTER_FIELDS] + [1]
+                for metadata in metadatas
+            ], dtype=np.int32)
+
+            existing = self._rows_for(ids)
+            rows = []
+            new_rows = 0
+            for record_id in ids:
+                row = existing.get(record_id)
+                if row is None:
+                    row = self._size + new_rows
+                    existing[record_id] = row
+                    new_rows += 1
+                rows.append(row)
+
+            self._reserve(self._size + new_rows, matrix.shape[1])
+            positions = np.array(rows)
+            self._vectors[positions] = matrix
+            if self._reduced is not None:
+                self._reduced[positions] = matrix @ self._projection
+                self._reduced.flush()
+            # Vectors are written before the alive flags that make them visible
+            self._vectors.flush()
+            self._attributes[positions] = codes
+            self._attributes.flush()
+            if sum(len(values) for values in self._vocab.values()) != vocab_size:
+                with open(self._vocab_path, "w") as f:
+                    json.dump(self._vocab, f)
+
+            with self._sidecar:
+                self._sidecar.executemany(
+                    "INSERT OR REPLACE INTO records (row, id, document) VALUES (?, ?, ?)",
+                    [(row, record_id, document) for row, record_id, document in zip(rows, ids, documents)]
+                )
+            self._size += new_rows
+
+            if self._reduced is None and self._size >= self.coarse_min_rows:
+                self._fit_projection()
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Mark records as deleted; their rows are skipped by every query."""
+        with self._lock:
+            rows = list(self._rows_for(ids).values())
+            if not rows or self._attributes is None:
+                return
+            self._attributes[rows, ALIVE_COLUMN] = 0
+            self._attributes.flush()
+            with self._sidecar:
+                self._sidecar.executemany("UPDATE records SET document = NULL WHERE row = ?", [(row,) for row in rows])
+
+    def _rows_for(self, ids: Sequence[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self._sidecar.execute(
+                f"SELECT id, row FROM records WHERE id IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ).fetchall()
+            found.update(dict(rows))
+        return found
+
+    def _mask(self, filters: Optional[Dict[str, Union[str, Sequence[str]]]]) -> np.ndarray:
+        attributes = self._attributes[:self._size]
+        mask = attributes[:, ALIVE_COLUMN] == 1
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+            values = [value] if isinstance(value, str) else list(value)
+            codes = [self._vocab[field][v] for v in values if v in self._vocab[field]]
+            column = FILTER_FIELDS.index(field)
+            mask &= np.isin(attributes[:, column], codes)
+        return mask
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 10,
+        filters: Optional[Dict[str, Union[str, Sequence[str]]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the records most similar to vector.
+
+        Args:
+            vector: Query embedding
+            top_k: Maximum number of results
+            filters: Optional field -> value (or list of values) filters on project, category and level
+
+        Returns:
+            List of {"id", "score", "document"} dictionaries, best match first
+        """
+        with self._lock:
+            if self._vectors is None or top_k <= 0:
+                return []
+            vectors = self._vectors[:self._size]
+            reduced = None if self._reduced is None else self._reduced[:self._size]
+            projection = self._projection
+            mask = self._mask(filters)
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+        everything = candidates.size == len(mask)
+
+        shortlist = max(self.rerank_candidates, top_k)
+        if reduced is not None and candidates.size > shortlist:
+            # Coarse pass over the projected rows, then exact scores for the best of them
+            coarse = (reduced if everything else reduced[candidates]) @ (query @ projection)
+            best = np.argpartition(-coarse, shortlist - 1)[:shortlist]
+            candidates = np.sort(best if everything else candidates[best])
+            scores = vectors[candidates] @ query
+            everything = False
+        elif everything:
+            scores = vectors @ query
+        else:
+            # Only score the rows that survive the metadata filters
+            scores = vectors[candidates] @ query
+
+        k = min(top_k, scores.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        rows = best if everything else candidates[best]
+
+        placeholders = ", ".join("?" for _ in rows)
+        # The sidecar connection is shared with upsert and delete, so it is only used under the lock
+        with self._lock:
+            records = {
+                row: (record_id, document)
+                for row, record_id, document in self._sidecar.execute(
+                    f"SELECT row, id, document FROM records WHERE row IN ({placeholders})",
+                    [int(row) for row in rows]
+                )
+            }
+
+        return [
+            {"id": records[int(row)][0], "score": float(score), "document": records[int(row)][1]}
+            for row, score in zip(rows, scores[best])
+            if int(row) in records
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors = None
+            self._attributes = None
+            self._reduced = None
+            self._projection = None
+            self._sidecar.close()
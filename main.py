@@ -1,22 +1,122 @@
 import os
+import uuid
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
-from agents import initialize_crew, get_project_risk_assessment
+from agents import stream_project_risk_assessment
+from crew_pool import CrewPoolTimeout, get_crew_pool
+from llm_gateway import get_llm_gateway, llm_session
+from tracing import get_tracer, set_tracing_enabled
+from tool_output import get_tool_output_stats
+from export import EXPORT_FORMAT_LABELS, available_formats, get_risk_exporter
+from reports import archive_reports, get_report_job_manager
+from chat_store import trim_history
 from config import RISK_LEVELS, RISK_CATEGORIES, DEFAULT_PROJECTS, VECTOR_DB_TYPE
 from utils import format_chat_history, generate_risk_report_summary
+from risk_table import RiskTable
 from data_handlers import (
     get_project_data, 
+    invalidate_project_data_cache,
     load_chat_history, 
-    save_chat_history, 
+    save_chat_message, 
     initialize_vector_db,
     populate_vector_db_with_sample_data,
-    query_risks_from_vector_db
+    search_risks
 )
 
+# Sort choices for the risk list: label -> (column, ascending)
+RISK_SORT_OPTIONS = {
+    "Score (highest first)": ("score", False),
+    "Score (lowest first)": ("score", True),
+    "Newest first": ("date_identified", False),
+    "Oldest first": ("date_identified", True),
+    "Level (highest first)": ("level", False),
+    "Category": ("category", True),
+    "Status": ("status", True),
+    "Title": ("title", True)
+}
+
+# Columns shown in the risk list; the full risk is shown when a row is selected
+RISK_LIST_COLUMNS = ["level", "score", "title", "category", "probability", "impact", "status", "date_identified", "project"]
+
+# PDF report jobs listed in the Risk Analysis tab
+REPORT_BATCHES_SHOWN = 5  # most recent report requests listed per session
+REPORT_REFRESH_SECONDS = 2  # progress polling interval while reports render
+
+def export_risks(export_request: tuple, filtered_risks: RiskTable):
+    """Write (or reuse) the export file for an export request."""
+    export_format, project, days_back, levels, categories, search_query = export_request
+    exporter = get_risk_exporter()
+    if search_query is not None:
+        return exporter.export_table(export_format, filtered_risks)
+    return exporter.export_register(export_format, project, days_back, level=list(levels), category=list(categories))
+
+def render_export_link(artifact, file_name: str) -> None:
+    """Link to the export file; Streamlit's static file server streams it without loading it into the app."""
+    st.markdown(
+        f'<a href="{artifact.url}" download="{file_name}">⬇️ Download {artifact.rows} risks '
+        f'({artifact.size / 1024:,.0f} KiB)</a>',
+        unsafe_allow_html=True
+    )
+
+def render_report_jobs():
+    """List this session's PDF report jobs with their progress and downloads."""
+    manager = get_report_job_manager()
+    pending = False
+    for batch in st.session_state.report_batches[:REPORT_BATCHES_SHOWN]:
+        jobs = manager.jobs(batch["job_ids"])
+        if not jobs:
+            continue
+        done = [job for job in jobs if job.status == "done"]
+        pending = pending or not all(job.finished for job in jobs)
+        st.progress(
+            sum(job.progress for job in jobs) / len(jobs),
+            text=f"{batch['label']}: {len(done)} of {len(jobs)} reports ready"
+        )
+        for job in jobs:
+            if job.status == "failed":
+                st.error(f"{job.project}: {job.error}")
+            elif job.status == "done":
+                with open(job.path, "rb") as report_file:
+                    st.download_button(
+                        f"{job.project} ({job.size / 1024:,.0f} KiB)",
+                        data=report_file,
+                        file_name=job.file_name,
+                        mime="application/pdf",
+                        key=f"report_download_{batch['id']}_{job.id}"
+                    )
+        if len(done) > 1 and all(job.finished for job in jobs):
+            st.download_button(
+                "Download all as ZIP",
+                data=archive_reports(done),
+                file_name=f"risk_reports_{datetime.now().strftime('%Y%m%d')}.zip",
+                mime="application/zip",
+                key=f"report_bundle_{batch['id']}"
+            )
+    return pending
+
+@st.fragment(run_every=REPORT_REFRESH_SECONDS)
+def poll_report_jobs():
+    # Only this fragment reruns while reports render; the rest of the page stays as it is
+    if not render_report_jobs():
+        st.rerun()
+
+def show_report_jobs():
+    """Show the report jobs, polling for progress only while some are unfinished."""
+    manager = get_report_job_manager()
+    pending = any(
+        not job.finished
+        for batch in st.session_state.report_batches[:REPORT_BATCHES_SHOWN]
+        for job in manager.jobs(batch["job_ids"])
+    )
+    if pending:
+        poll_report_jobs()
+    else:
+        render_report_jobs()
+
 # Set page configuration
 st.set_page_config(
     page_title="AI Project Risk Management System",
@@ -26,24 +126,42 @@ st.set_page_config(
 )
 
 # Initialize session states
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = load_chat_history()
 if "current_project" not in st.session_state:
     st.session_state.current_project = "All Projects"
-if "crew" not in st.session_state:
-    try:
-        st.session_state.crew = initialize_crew()
-    except Exception as e:
-        st.error(f"Error initializing AI agents: {str(e)}")
-        st.session_state.crew = None
-if "vector_db" not in st.session_state:
-    st.session_state.vector_db = initialize_vector_db()
-    if not st.session_state.vector_db:
-        st.warning(f"Vector database ({VECTOR_DB_TYPE}) initialization failed. Some search functionality may be limited.")
-    else:
-        # Populate with sample data only if newly initialized
-        with st.spinner("Initializing risk database..."):
-            populate_vector_db_with_sample_data()
+if "session_id" not in st.session_state:
+    # Identifies this browser session in the LLM gateway's fair queue
+    st.session_state.session_id = uuid.uuid4().hex
+if "chat_id" not in st.session_state:
+    # Chats are stored per user (?user=...) or per chat link; the id is kept in the
+    # URL so reloading the page continues the same chat. There is no login: anyone with
+    # the link, or a guessed ?user= name, can read that chat. Generated chat ids are
+    # random, but deployments with real users need authentication in front of the app.
+    chat_id = st.query_params.get("user") or st.query_params.get("chat")
+    if not chat_id:
+        chat_id = st.session_state.session_id
+        st.query_params["chat"] = chat_id
+    st.session_state.chat_id = chat_id
+if "chat_history" not in st.session_state:
+    st.session_state.chat_history = load_chat_history(st.session_state.chat_id)
+
+# The vector store connection and the crews (see crew_pool.py) are shared by
+# all sessions in the process rather than created per browser session
+@st.cache_resource(show_spinner="Initializing risk database...")
+def get_shared_vector_db():
+    vector_db = initialize_vector_db()
+    if vector_db:
+        # Populate with sample data unless the index already holds the current data version
+        populate_vector_db_with_sample_data()
+    return vector_db
+
+vector_db = get_shared_vector_db()
+
+if "report_batches" not in st.session_state:
+    st.session_state.report_batches = []
+
+if not vector_db and "vector_db_warning_shown" not in st.session_state:
+    st.session_state.vector_db_warning_shown = True
+    st.warning(f"Vector database ({VECTOR_DB_TYPE}) initialization failed. Some search functionality may be limited.")
 
 # Main title and introduction
 st.title("🔍 AI-Powered Project Risk Management System")
@@ -87,8 +205,68 @@ with st.sidebar:
     
     # Refresh button
     if st.button("Refresh Analysis", type="primary"):
+        invalidate_project_data_cache()
+        # Re-embeds only risks that changed in the register since the last sync
+        populate_vector_db_with_sample_data()
+        # Kept search results would show the risks as they were before the refresh
+        st.session_state.pop("risk_search", None)
         st.toast("Refreshing risk analysis...", icon="🔄")
-        # This will trigger a state refresh
+    
+    # Load on the shared LLM server and analysis crews
+    with st.expander("System Load"):
+        gateway_stats = get_llm_gateway().stats()
+        pool_stats = get_crew_pool().stats()
+        st.metric("LLM requests in flight", f"{gateway_stats['in_flight']} / {gateway_stats['max_in_flight']}")
+        st.metric("LLM queue depth", gateway_stats["queue_depth"], help=f"Peak: {gateway_stats['max_queue_depth']}")
+        st.caption(
+            f"Average queue wait {gateway_stats['average_wait']:.2f}s · "
+            f"{gateway_stats['retries']} retries · {gateway_stats['failures']} failures"
+        )
+        st.caption(f"Crews busy: {pool_stats['in_use']} of {pool_stats['size']} · {pool_stats['waiting']} queries waiting")
+        tool_stats = get_tool_output_stats()
+        st.caption(
+            f"Tool output: {tool_stats['tokens_saved']:,} tokens saved over {tool_stats['calls']} calls · "
+            f"{tool_stats['omitted_entries']} entries omitted · {tool_stats['over_budget']} over budget"
+        )
+    
+    # Where this session's recent chat turns spent their time
+    with st.expander("Tracing"):
+        tracer = get_tracer()
+        tracing_enabled = st.toggle("Record traces", value=tracer.enabled, help="Applies to every session on this server")
+        if tracing_enabled != tracer.enabled:
+            set_tracing_enabled(tracing_enabled)
+        
+        session_traces = [
+            trace for trace in tracer.traces()
+            if trace.root.attributes.get("session") == st.session_state.session_id
+        ]
+        if not session_traces:
+            st.caption("No traces recorded for this session yet.")
+        else:
+            selected_trace = st.selectbox(
+                "Chat turn",
+                session_traces,
+                format_func=lambda trace: (
+                    f"{datetime.fromtimestamp(trace.started_at):%H:%M:%S} · "
+                    f"{trace.root.attributes.get('query', '')[:40]} ({trace.root.duration:.1f}s)"
+                )
+            )
+            summary = selected_trace.summary()
+            st.caption(
+                f"{summary['duration']:.2f}s total · {summary['prompt_tokens']} prompt / "
+                f"{summary['completion_tokens']} completion tokens · {summary['spans']} spans"
+            )
+            st.caption(" · ".join(
+                f"{category} {seconds:.2f}s" for category, seconds in sorted(summary["time_by_category"].items(), key=lambda item: -item[1])
+            ))
+            st.dataframe(pd.DataFrame(selected_trace.rows()), hide_index=True, use_container_width=True)
+            st.download_button(
+                "Download Chrome trace",
+                data=tracer.to_chrome_trace(session_traces),
+                file_name=f"risk_chat_trace_{datetime.now():%Y%m%d_%H%M%S}.json",
+                mime="application/json",
+                help="Open in chrome://tracing or ui.perfetto.dev"
+            )
 
 # Create tabs for different views
 tab1, tab2, tab3 = st.tabs(["Dashboard", "Risk Analysis", "Chat Assistant"])
@@ -104,12 +282,13 @@ with tab1:
         # Summary metrics
         col1, col2, col3, col4 = st.columns(4)
         
+        # Counts come from the store's rollups rather than a scan of every risk
         with col1:
-            total_risks = len(project_data["risks"])
+            total_risks = project_data["risk_counts"]["total"]
             st.metric("Total Risks", total_risks)
         
         with col2:
-            high_risks = len([r for r in project_data["risks"] if r["level"] == "High"])
+            high_risks = project_data["risk_counts"]["by_level"].get("High", 0)
             st.metric("High Risks", high_risks)
         
         with col3:
@@ -123,10 +302,12 @@ with tab1:
         
         # Risk trend chart
         st.subheader("Risk Trend Over Time")
+        # Daily average score of newly identified risks, one line per project
         fig = px.line(
-            project_data["trend_data"], 
+            pd.DataFrame(project_data["trend_data"], columns=["date", "risk_score", "project"]), 
             x="date", 
             y="risk_score",
+            color="project" if selected_project == "All Projects" else None,
             title="Overall Risk Score Trend",
             labels={"date": "Date", "risk_score": "Risk Score"}
         )
@@ -134,7 +315,7 @@ with tab1:
         
         # Risk distribution chart
         st.subheader("Risk Distribution by Category")
-        risk_by_category = pd.DataFrame(project_data["risk_by_category"])
+        risk_by_category = pd.DataFrame(project_data["risk_by_category"], columns=["category", "level", "count", "project"])
         fig2 = px.bar(
             risk_by_category,
             x="category",
@@ -164,71 +345,140 @@ with tab2:
     try:
         # Get project risks
         project_risks = project_data["risks"]
+        showing_search_results = False
         
         # If a search query was entered
         if search_query and search_button:
             with st.spinner("Searching risks database..."):
-                # Search risks in vector DB
-                if st.session_state.vector_db:
-                    vector_results = query_risks_from_vector_db(
-                        search_query, 
-                        project=selected_project if selected_project != "All Projects" else None,
-                        limit=10
-                    )
-                    if vector_results:
-                        st.success(f"Found {len(vector_results)} matching risks")
-                        project_risks = vector_results
-                    else:
-                        st.info("No matching risks found in the database. Showing all risks instead.")
+                # Search risks semantically, falling back to keyword search
+                search_results = search_risks(
+                    search_query, 
+                    project=selected_project if selected_project != "All Projects" else None,
+                    limit=10,
+                    vector_db=vector_db
+                )
+            # Kept in the session so that paging, sorting and export reruns still show the results
+            st.session_state.risk_search = {
+                "query": search_query,
+                "project": selected_project,
+                "results": search_results
+            }
+        
+        risk_search = st.session_state.get("risk_search")
+        if risk_search is not None and (risk_search["query"] != search_query or risk_search["project"] != selected_project):
+            # The query was edited or cleared, or another project selected
+            del st.session_state.risk_search
+            risk_search = None
+        if risk_search is not None:
+            if risk_search["results"]:
+                st.success(f"Found {len(risk_search['results'])} matching risks")
+                project_risks = RiskTable.from_records(risk_search["results"])
+                showing_search_results = True
+            else:
+                st.info("No matching risks found in the database. Showing all risks instead.")
         
         # Filter risks based on sidebar selections
-        filtered_risks = [
-            risk for risk in project_risks 
-            if risk["level"] in selected_risk_levels and risk["category"] in selected_categories
-        ]
+        filtered_risks = project_risks.filter(level=selected_risk_levels, category=selected_categories)
         
         if not filtered_risks:
             st.info("No risks match your current filters.")
         else:
-            # Display risks in expandable sections
-            for i, risk in enumerate(filtered_risks):
-                with st.expander(f"{risk['level']} Risk: {risk['title']}"):
-                    col1, col2 = st.columns([3, 1])
-                    
-                    with col1:
-                        st.markdown(f"**Description:** {risk['description']}")
-                        st.markdown(f"**Category:** {risk['category']}")
-                        st.markdown(f"**Impact:** {risk['impact']}")
-                        st.markdown(f"**Probability:** {risk['probability']}")
+            # Sorting and paging happen here on the server; only one page of rows reaches the browser
+            list_col1, list_col2, list_col3, list_col4 = st.columns([2, 1, 1, 1])
+            with list_col1:
+                sort_label = st.selectbox("Sort by", list(RISK_SORT_OPTIONS.keys()), key="risk_sort")
+            with list_col2:
+                page_size = st.selectbox("Rows per page", [10, 25, 50, 100], index=1, key="risk_page_size")
+            page_count = max((len(filtered_risks) + page_size - 1) // page_size, 1)
+            if st.session_state.get("risk_page", 1) > page_count:
+                # Narrower filters can leave the remembered page past the end
+                st.session_state.risk_page = page_count
+            with list_col3:
+                page_number = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="risk_page")
+            with list_col4:
+                compact_view = st.toggle("Compact view", key="risk_compact_view", help="Show every matching risk in one probability × impact chart")
+            
+            if compact_view:
+                # One vectorized chart for all matching risks instead of a gauge per risk
+                counts, average_scores = filtered_risks.rating_matrix("probability", "impact")
+                ratings = list(range(1, counts.shape[0] + 1))
+                heatmap = go.Figure(go.Heatmap(
+                    z=average_scores,
+                    x=ratings,
+                    y=ratings,
+                    text=counts,
+                    texttemplate="%{text}",
+                    colorscale=[[0, "green"], [0.5, "yellow"], [1, "red"]],
+                    zmin=0,
+                    zmax=100,
+                    colorbar={"title": "Avg score"},
+                    hovertemplate="Impact %{x}, probability %{y}<br>%{text} risks, average score %{z:.0f}<extra></extra>"
+                ))
+                heatmap.update_layout(
+                    title=f"{len(filtered_risks)} risks by probability and impact",
+                    xaxis_title="Impact",
+                    yaxis_title="Probability",
+                    height=450
+                )
+                st.plotly_chart(heatmap, use_container_width=True, key="risk_heatmap")
+            else:
+                sort_column, sort_ascending = RISK_SORT_OPTIONS[sort_label]
+                first = (page_number - 1) * page_size
+                page_risks = filtered_risks.sort_by(sort_column, ascending=sort_ascending)[first:first + page_size]
+                st.caption(f"Showing {first + 1}-{first + len(page_risks)} of {len(filtered_risks)} risks · select rows to see details")
+                
+                page_frame = page_risks.to_frame()
+                selection = st.dataframe(
+                    page_frame[[column for column in RISK_LIST_COLUMNS if column in page_frame.columns]],
+                    hide_index=True,
+                    use_container_width=True,
+                    on_select="rerun",
+                    selection_mode="multi-row",
+                    key=f"risk_list_{sort_label}_{page_size}_{page_number}"
+                )
+                
+                # Details and gauges are only built for the selected (expanded) rows
+                for position in selection.selection.rows:
+                    if position >= len(page_risks):
+                        continue
+                    risk = page_risks[position]
+                    with st.expander(f"{risk['level']} Risk: {risk['title']}", expanded=True):
+                        col1, col2 = st.columns([3, 1])
+                        
+                        with col1:
+                            st.markdown(f"**Description:** {risk['description']}")
+                            st.markdown(f"**Category:** {risk['category']}")
+                            st.markdown(f"**Impact:** {risk['impact']}")
+                            st.markdown(f"**Probability:** {risk['probability']}")
+                            
+                            # Mitigation strategies
+                            st.subheader("Mitigation Strategies")
+                            for idx, strategy in enumerate(risk['mitigation_strategies']):
+                                st.markdown(f"{idx + 1}. {strategy}")
                         
-                        # Mitigation strategies
-                        st.subheader("Mitigation Strategies")
-                        for idx, strategy in enumerate(risk['mitigation_strategies']):
-                            st.markdown(f"{idx + 1}. {strategy}")
-                    
-                    with col2:
-                        # Risk score gauge chart
-                        fig = go.Figure(go.Indicator(
-                            mode = "gauge+number",
-                            value = risk['score'],
-                            title = {'text': "Risk Score"},
-                            gauge = {
-                                'axis': {'range': [0, 100]},
-                                'bar': {'color': "darkgrey"},
-                                'steps': [
-                                    {'range': [0, 30], 'color': "green"},
-                                    {'range': [30, 70], 'color': "yellow"},
-                                    {'range': [70, 100], 'color': "red"}
-                                ],
-                                'threshold': {
-                                    'line': {'color': "red", 'width': 4},
-                                    'thickness': 0.75,
-                                    'value': risk['score']
+                        with col2:
+                            # Risk score gauge chart
+                            fig = go.Figure(go.Indicator(
+                                mode = "gauge+number",
+                                value = risk['score'],
+                                title = {'text': "Risk Score"},
+                                gauge = {
+                                    'axis': {'range': [0, 100]},
+                                    'bar': {'color': "darkgrey"},
+                                    'steps': [
+                                        {'range': [0, 30], 'color': "green"},
+                                        {'range': [30, 70], 'color': "yellow"},
+                                        {'range': [70, 100], 'color': "red"}
+                                    ],
+                                    'threshold': {
+                                        'line': {'color': "red", 'width': 4},
+                                        'thickness': 0.75,
+                                        'value': risk['score']
+                                    }
                                 }
-                            }
-                        ))
-                        fig.update_layout(height=250, margin=dict(l=10, r=10, t=50, b=10))
-                        st.plotly_chart(fig, use_container_width=True, key=f"risk_gauge_{i}")
+                            ))
+                            fig.update_layout(height=250, margin=dict(l=10, r=10, t=50, b=10))
+                            st.plotly_chart(fig, use_container_width=True, key=f"risk_gauge_{risk['id']}")
             
             # Risk report summary
             st.subheader("Risk Report Summary")
@@ -238,17 +488,58 @@ with tab2:
             # Export options
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.download_button(
-                    "Download Risk Report (CSV)",
-                    data=pd.DataFrame(filtered_risks).to_csv(index=False),
-                    file_name=f"risk_report_{selected_project.replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
+                # The export is only written when requested, streamed from the store in chunks
+                export_format = st.selectbox(
+                    "Export format",
+                    available_formats(),
+                    format_func=EXPORT_FORMAT_LABELS.get,
+                    key="export_format"
+                )
+                export_request = (
+                    export_format, selected_project, days_back,
+                    tuple(selected_risk_levels), tuple(selected_categories),
+                    risk_search["query"] if showing_search_results else None
                 )
+                if st.button("Prepare Risk Report Export"):
+                    with st.spinner("Exporting risks..."):
+                        st.session_state.risk_export = (export_request, export_risks(export_request, filtered_risks))
+                
+                prepared_export = st.session_state.get("risk_export")
+                if prepared_export is not None and prepared_export[0] == export_request:
+                    artifact = prepared_export[1]
+                    if not artifact.exists():
+                        # Evicted to make room for newer exports from other sessions; write it again
+                        with st.spinner("Exporting risks..."):
+                            artifact = export_risks(export_request, filtered_risks)
+                        st.session_state.risk_export = (export_request, artifact)
+                    render_export_link(artifact, artifact.file_name(
+                        f"risk_report_{selected_project.replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d')}"
+                    ))
             with col2:
+                # Reports render in worker processes; this script run only queues them
+                report_projects = DEFAULT_PROJECTS if selected_project == "All Projects" else [selected_project]
+                if selected_project != "All Projects" and st.checkbox("Report on every project", key="report_all_projects"):
+                    report_projects = DEFAULT_PROJECTS
+                if showing_search_results:
+                    st.caption("Reports cover the stored risks, not the search results.")
                 if st.button("Generate Detailed PDF Report"):
-                    st.info("PDF report generation would be implemented here")
+                    report_jobs = get_report_job_manager().submit(
+                        report_projects, days_back,
+                        level=None if set(selected_risk_levels) == set(RISK_LEVELS) else selected_risk_levels,
+                        category=None if set(selected_categories) == set(RISK_CATEGORIES) else selected_categories
+                    )
+                    st.session_state.report_batches.insert(0, {
+                        "id": uuid.uuid4().hex[:8],
+                        "label": f"{selected_project}, last {days_back} days",
+                        "job_ids": [job.id for job in report_jobs]
+                    })
+                show_report_jobs()
             with col3:
-                vector_db_type = "ChromaDB" if VECTOR_DB_TYPE == "chromadb" else "Pinecone"
+                vector_db_type = {
+                    "chromadb": "ChromaDB",
+                    "pinecone": "Pinecone",
+                    "local": "the local vector index"
+                }.get(VECTOR_DB_TYPE, "the SQLite risk store")
                 st.info(f"Risk data stored in {vector_db_type}")
         
     except Exception as e:
@@ -278,34 +569,42 @@ with tab3:
     
     if user_input:
         # Add user message to chat history
-        st.session_state.chat_history.append({"role": "user", "content": user_input})
+        user_message = {"role": "user", "content": user_input}
+        st.session_state.chat_history.append(user_message)
+        save_chat_message(st.session_state.chat_id, user_message)
         
         # Display user message
         with st.chat_message("user"):
             st.markdown(user_input)
         
-        # Generate AI response
+        # Generate AI response, streaming the final report as it is written
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing projects and risks..."):
-                try:
-                    if st.session_state.crew:
-                        response = get_project_risk_assessment(
-                            st.session_state.crew, 
-                            user_input, 
-                            selected_project
-                        )
-                    else:
-                        response = "I'm having trouble connecting to the risk analysis system. Please try again later."
-                except Exception as e:
-                    response = f"I encountered an error while analyzing your request: {str(e)}"
-                
+            status = None
+            try:
+                status = st.status("Analyzing projects and risks...", expanded=False)
+                with llm_session(st.session_state.session_id):
+                    stream = stream_project_risk_assessment(user_input, selected_project)
+                # A retried answer replaces the partial one, so render into a placeholder
+                answer = st.empty()
+                for text in stream.final_texts(on_progress=status.write):
+                    answer.markdown(text)
+                status.update(label="Analysis complete", state="complete")
+                response = stream.result
+            except CrewPoolTimeout:
+                status.update(label="Analysis queue full", state="error")
+                response = "All analysis agents are busy right now. Please try again in a few minutes."
+                st.markdown(response)
+            except Exception as e:
+                if status is not None:
+                    status.update(label="Analysis failed", state="error")
+                response = f"I encountered an error while analyzing your request: {str(e)}"
                 st.markdown(response)
         
-        # Add assistant response to chat history
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
-        
-        # Save chat history
-        save_chat_history(st.session_state.chat_history)
+        # Add assistant response to chat history, keeping only the most recent messages in memory
+        assistant_message = {"role": "assistant", "content": response}
+        st.session_state.chat_history.append(assistant_message)
+        save_chat_message(st.session_state.chat_id, assistant_message)
+        trim_history(st.session_state.chat_history)
         
         # Rerun to update the chat display
         st.rerun()
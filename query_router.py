@@ -0,0 +1,345 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Union
+from config import DEFAULT_PROJECTS, RISK_CATEGORIES, RISK_LEVELS
+
+# Questions that need reasoning rather than a lookup always go to the crew
+OPEN_ENDED_PATTERN = re.compile(
+    r"\b(why|explain|what if|predict|forecast|should (?:we|i)|how (?:can|do|should|to)|impact of|root cause)\b"
+)
+COMPARE_PATTERN = re.compile(r"\b(compare|comparison|versus|vs\.?|difference between)\b")
+COUNT_PATTERN = re.compile(r"\b(how many|number of|count of|count)\b")
+# What is being counted: up to a few qualifiers followed by "risk(s)"
+COUNT_SUBJECT_PATTERN = re.compile(r"\b(?:how many|number of|count of|count)\s+((?:[\w-]+\s+){0,4}?)risks?\b")
+TOP_PATTERN = re.compile(r"\b(top|biggest|highest|most critical|main|key|critical)\b.*\brisks?\b")
+TOP_COUNT_PATTERN = re.compile(r"\b(?:top|first|(\w+)\s+(?:biggest|highest|most critical|main|key))\s*(\w+)?")
+MITIGATION_PATTERN = re.compile(r"\b(mitigat\w*|strateg\w*|countermeasures?)\b")
+STATUS_PATTERN = re.compile(r"\b(status|progress|completion|budget|schedule|timeline|on track)\b")
+DAYS_PATTERN = re.compile(r"\b(?:last|past)\s+(\d+)\s+(day|week|month|quarter|year)s?\b")
+PERIOD_PATTERN = re.compile(r"\b(?:last|past|this)\s+(week|month|quarter|year)\b")
+# Time expressions other than a trailing window, which the tools cannot filter on
+UNSUPPORTED_TIME_PATTERN = re.compile(
+    r"\b(since|before|after|between|until|ago|yesterday|today|next|january|february|march|april|june|july|"
+    r"august|september|october|november|december|(?:19|20)\d{2})\b"
+)
+
+# A project the question names explicitly, which may not be one the tools know
+NAMED_PROJECT_PATTERNS = [
+    re.compile(r"\bproject\s+(?:called|named)\s+[\"']?([\w-][^\"'?.!,]*)", re.IGNORECASE),
+    re.compile(r"\bproject\s+[\"']([^\"']+)[\"']", re.IGNORECASE),
+    re.compile(r"\bthe\s+([A-Z][\w-]*(?:\s+[A-Z][\w-]*)*)\s+project\b")
+]
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
+}
+STATUS_WORDS = {
+    "active": "Active", "open": "Active", "mitigated": "Mitigated", "monitoring": "Monitoring",
+    "monitored": "Monitoring", "closed": "Closed", "resolved": "Closed"
+}
+# Words allowed between "how many" and "risks" besides levels, categories and statuses
+COUNT_FILLER_WORDS = {"the", "of", "our", "critical", "current", "identified", "new", "total"}
+DEFAULT_TOP_RISKS = 3
+
+class RoutedQuery:
+    """A question the router can answer with a tool call instead of the crew."""
+
+    def __init__(self, intent: str, params: Dict[str, Any]):
+        self.intent = intent
+        self.params = params
+
+    def __repr__(self) -> str:
+        return f"RoutedQuery({self.intent!r}, {self.params!r})"
+
+def find_projects(query: str) -> List[str]:
+    """Return the known projects named in the query, in order of appearance."""
+    lowered = query.lower()
+    found = [(lowered.find(project.lower()), project) for project in DEFAULT_PROJECTS if project.lower() in lowered]
+    return [project for _, project in sorted(found)]
+
+def names_unknown_project(query: str) -> bool:
+    """Return True if the query names a project, e.g. "project called Foo", that is not a known one."""
+    for pattern in NAMED_PROJECT_PATTERNS:
+        for match in pattern.finditer(query):
+            name = match.group(1).strip().lower()
+            if not any(name.startswith(project.lower()) for project in DEFAULT_PROJECTS):
+                return True
+    return False
+
+def _single_or_list(values: List[str]) -> Optional[Union[str, List[str]]]:
+    """A filter value: None for no values, the value itself for one, else the list."""
+    if not values:
+        return None
+    return values[0] if len(values) == 1 else values
+
+def find_level(query: str) -> Optional[Union[str, List[str]]]:
+    lowered = query.lower()
+    levels = [level for level in RISK_LEVELS if re.search(rf"\b{level.lower()}\b", lowered)]
+    if "critical" in lowered and "High" not in levels:
+        levels.append("High")
+    return _single_or_list(levels)
+
+def find_category(query: str) -> Optional[Union[str, List[str]]]:
+    lowered = query.lower()
+    return _single_or_list([category for category in RISK_CATEGORIES if re.search(rf"\b{category.lower()}\b", lowered)])
+
+def find_status(query: str) -> Optional[Union[str, List[str]]]:
+    lowered = query.lower()
+    statuses = []
+    for word, status in STATUS_WORDS.items():
+        if re.search(rf"\b{word}\b", lowered) and status not in statuses:
+            statuses.append(status)
+    return _single_or_list(statuses)
+
+def find_days_back(query: str) -> Optional[int]:
+    """Return the length in days of the window the query asks about, or None if it names none."""
+    lowered = query.lower()
+    match = DAYS_PATTERN.search(lowered)
+    if match:
+        return max(int(match.group(1)) * PERIOD_DAYS[match.group(2)], 1)
+    match = PERIOD_PATTERN.search(lowered)
+    if match:
+        return PERIOD_DAYS[match.group(1)]
+    return None
+
+def _parse_number(word: Optional[str]) -> Optional[int]:
+    if not word:
+        return None
+    if word.isdigit():
+        return int(word)
+    return NUMBER_WORDS.get(word)
+
+def find_top_count(query: str) -> Optional[int]:
+    """Return N from "top N risks" or "N biggest risks", or None if the query gives no number."""
+    for match in TOP_COUNT_PATTERN.finditer(query.lower()):
+        count = _parse_number(match.group(1)) or _parse_number(match.group(2))
+        if count:
+            return count
+    return None
+
+def counts_risks(query: str) -> bool:
+    """Return True if a counting question counts risks, rather than projects or anything else."""
+    match = COUNT_SUBJECT_PATTERN.search(query.lower())
+    if not match:
+        return False
+    qualifiers = COUNT_FILLER_WORDS | set(STATUS_WORDS)
+    qualifiers |= {level.lower() for level in RISK_LEVELS} | {category.lower() for category in RISK_CATEGORIES}
+    return all(word in qualifiers for word in match.group(1).split())
+
+def classify(query: str, selected_project: str) -> Optional[RoutedQuery]:
+    """
+    Classify a chat question with cheap rules.
+
+    Category, level, status, time window and "top N" constraints found in
+    the question are passed on to the tool. Questions with constraints the
+    tools cannot honor go to the crew instead, for example when a status
+    change is limited to a time window (the register only dates when a risk
+    was identified), when something other than risks is counted, or when
+    the question names a project the tools do not know.
+
+    Args:
+        query: The user's question
+        selected_project: The project selected in the sidebar, used when the question names none
+
+    Returns:
+        A RoutedQuery for factual questions, or None when the crew should answer
+    """
+    lowered = query.lower()
+    if OPEN_ENDED_PATTERN.search(lowered) or UNSUPPORTED_TIME_PATTERN.search(lowered):
+        return None
+    if names_unknown_project(query):
+        # Falling back to the selected project would answer about the wrong project
+        return None
+
+    projects = find_projects(query)
+    project = projects[0] if projects else selected_project
+    level = find_level(query)
+    category = find_category(query)
+    status = find_status(query)
+    window = find_days_back(query)
+    days_back = window or 30
+    filters = {"category": category, "level": level, "status": status}
+
+    if status is not None and window is not None and status != "Active":
+        # "Closed last month" is about when risks changed status, which the register does not record
+        return None
+
+    if COMPARE_PATTERN.search(lowered):
+        if category or level or status or window:
+            return None
+        if len(projects) < 2 and selected_project != "All Projects" and selected_project not in projects:
+            projects = [selected_project] + projects
+        if len(projects) >= 2:
+            return RoutedQuery("compare", {"projects": projects})
+        return None
+
+    if MITIGATION_PATTERN.search(lowered) and (category or level):
+        if status or window:
+            return None
+        return RoutedQuery("mitigation", {"project": project, "category": category, "level": level})
+
+    if COUNT_PATTERN.search(lowered) and "risk" in lowered:
+        if not counts_risks(query):
+            return None
+        return RoutedQuery("count", {"project": project, "days_back": days_back, **filters})
+
+    if TOP_PATTERN.search(lowered):
+        limit = find_top_count(query) or DEFAULT_TOP_RISKS
+        return RoutedQuery("top_risks", {"project": project, "days_back": days_back, "limit": limit, **filters})
+
+    if STATUS_PATTERN.search(lowered) and "risk" not in lowered:
+        return RoutedQuery("status", {"project": project, "days_back": days_back})
+
+    return None
+
+def _filter_text(value: Optional[Union[str, List[str]]]) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else " or ".join(value)
+
+def _describe_risks(params: Dict[str, Any], count: int) -> str:
+    """Describe the risks a count or ranking covers, e.g. "closed high-level Security risks"."""
+    words = []
+    if params.get("status"):
+        words.append(_filter_text(params["status"]).lower())
+    if params.get("level"):
+        words.append(f"{_filter_text(params['level']).lower()}-level")
+    if params.get("category"):
+        words.append(_filter_text(params["category"]))
+    words.append("risk" if count == 1 else "risks")
+    return " ".join(words)
+
+def _render_count(data: Dict[str, Any], params: Dict[str, Any]) -> str:
+    project = data["project"]
+    period = f"the last {params['days_back']} days"
+    count = data["total_risks"]
+    if any(params.get(name) for name in ("category", "level", "status")):
+        return f"**{project}** has **{count} {_describe_risks(params, count)}** identified in {period}."
+    return (
+        f"**{project}** has **{count} risks** identified in {period}:\n\n"
+        f"- High: {data['high_priority_risks']}\n"
+        f"- Medium: {data['medium_priority_risks']}\n"
+        f"- Low: {data['low_priority_risks']}"
+    )
+
+def _render_top_risks(data: Dict[str, Any], params: Dict[str, Any]) -> str:
+    top_risks = data.get("top_risks", [])
+    # Without a level filter the tool says which levels it ranked
+    ranked = dict(params, level=params.get("level") or data.get("top_risks_level"))
+    if not top_risks:
+        return f"**{data['project']}** has no {_describe_risks(ranked, 0)} in the last {params['days_back']} days."
+    lines = [
+        f"Top {len(top_risks)} {_describe_risks(ranked, len(top_risks))} for **{data['project']}** "
+        f"(last {params['days_back']} days):\n"
+    ]
+    for i, risk in enumerate(top_risks):
+        lines.append(
+            f"{i + 1}. **{risk['title']}** ({risk['category']}, score {risk['score']}, {risk['status']})"
+        )
+    lines.append(
+        f"\n{data['high_priority_risks']} high, {data['medium_priority_risks']} medium and "
+        f"{data['low_priority_risks']} low {_describe_risks(dict(params, level=None), 2)} in total."
+    )
+    return "\n".join(lines)
+
+def _render_compare(data: Dict[str, Any], params: Dict[str, Any]) -> str:
+    lines = [
+        "| Project | Total risks | High risks | Risk trend | Mitigation rate | Top categories |",
+        "|---|---|---|---|---|---|"
+    ]
+    for project in data["projects"]:
+        lines.append(
+            f"| {project['name']} | {project['total_risks']} | {project['high_risks']} | "
+            f"{project['risk_trend']:+.1f}% | {project['mitigation_rate']:.1f}% | "
+            f"{', '.join(project['top_risk_categories']) or '-'} |"
+        )
+    highest = max(data["projects"], key=lambda project: project["high_risks"])
+    lines.append(f"\n**{highest['name']}** currently carries the most high-level risks.")
+    return "\n".join(lines)
+
+def _render_mitigation(data: Dict[str, Any], params: Dict[str, Any], shown: int = 5) -> str:
+    scope = " ".join(filter(None, [_filter_text(params.get("level")), _filter_text(params.get("category"))]))
+    lines = [f"Mitigation strategies for {scope} risks in **{data['project']}**:\n"]
+    for strategy in data["strategies"][:shown]:
+        lines.append(f"**{strategy['risk_title']}** ({strategy['risk_level']})")
+        lines.extend(f"- {item}" for item in strategy["mitigation_strategies"])
+        lines.append("")
+    remaining = data["risk_count"] - min(shown, len(data["strategies"]))
+    if remaining > 0:
+        lines.append(f"_{remaining} more matching risks not shown._")
+    return "\n".join(lines).rstrip()
+
+def _render_status(data: Dict[str, Any], params: Dict[str, Any]) -> str:
+    lines = [
+        f"Status of **{data['name']}**: **{data['status']}**\n",
+        f"- Completion: {data['completion_percentage']:.1f}%",
+        f"- Budget: {data['budget_status']}",
+        f"- Resource utilization: {data['resource_utilization']:.1f}%",
+        f"- Timeline: {data['start_date']} to {data['end_date']}"
+    ]
+    lines.extend(f"- {key.replace('_', ' ').capitalize()}: {value}" for key, value in data.get("key_metrics", {}).items())
+    return "\n".join(lines)
+
+_tools: Dict[str, Any] = {}
+
+def _tool(name: str):
+    """Return a shared instance of the named tool class."""
+    if name not in _tools:
+        import tools
+        _tools[name] = getattr(tools, name)()
+    return _tools[name]
+
+def _call(routed: RoutedQuery) -> Union[Dict[str, Any], str]:
+    # collect() returns the tool's full result, before compact encoding for prompts
+    params = routed.params
+    if routed.intent in ("count", "top_risks"):
+        return _tool("RiskAnalysisTool").collect(
+            params["project"],
+            params["days_back"],
+            category=params["category"],
+            level=params["level"],
+            status=params["status"],
+            top_k=params.get("limit", DEFAULT_TOP_RISKS)
+        )
+    if routed.intent == "compare":
+        return _tool("ProjectComparisonTool").collect(", ".join(params["projects"]))
+    if routed.intent == "mitigation":
+        return _tool("MitigationStrategiesTool").collect(params["project"], params["category"], params["level"])
+    if routed.intent == "status":
+        return _tool("ProjectInfoTool").collect(params["project"], params["days_back"])
+    raise ValueError(f"Unknown intent: {routed.intent}")
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], str]] = {
+    "count": _render_count,
+    "top_risks": _render_top_risks,
+    "compare": _render_compare,
+    "mitigation": _render_mitigation,
+    "status": _render_status
+}
+
+def answer_directly(query: str, selected_project: str) -> Optional[str]:
+    """
+    Answer a factual question straight from the tools, bypassing the crew.
+
+    Args:
+        query: The user's question
+        selected_project: The currently selected project or "All Projects"
+
+    Returns:
+        A markdown answer, or None if the question should go to the crew
+    """
+    routed = classify(query, selected_project)
+    if routed is None:
+        return None
+
+    try:
+        data = _call(routed)
+        if isinstance(data, str):
+            # Tools report "nothing found" and invalid input as plain text
+            return data
+        return RENDERERS[routed.intent](data, routed.params)
+    except Exception as e:
+        # Let the crew handle anything the fast path cannot
+        print(f"Error answering routed query: {str(e)}")
+        return None
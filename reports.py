@@ -0,0 +1,367 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import textwrap
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from config import RISK_LEVELS, REPORT_DIRECTORY, REPORT_WORKERS, REPORT_MAX_JOBS, REPORT_TOP_RISKS
+from utils import risk_report_data
+
+# Share of a job's progress reached when it enters each status
+REPORT_PROGRESS = {
+    "queued": 0.0,
+    "collecting": 0.1,
+    "rendering": 0.4,
+    "done": 1.0,
+    "failed": 1.0
+}
+
+TOP_RISK_FIELDS = ["title", "category", "level", "score", "status", "date_identified"]
+
+# A4 portrait, in inches
+PAGE_SIZE = (8.27, 11.69)
+
+class ReportJob:
+    """One PDF report for one project, rendered in the background."""
+
+    def __init__(
+        self,
+        key: str,
+        project: str,
+        days_back: int,
+        level: Optional[List[str]],
+        category: Optional[List[str]]
+    ):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.project = project
+        self.days_back = days_back
+        self.level = level
+        self.category = category
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def progress(self) -> float:
+        return REPORT_PROGRESS[self.status]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def file_name(self) -> str:
+        stamp = datetime.fromtimestamp(self.created_at).strftime("%Y%m%d")
+        return f"risk_report_{self.project.replace(' ', '_').lower()}_{stamp}.pdf"
+
+def _wrap(text: str, width: int, max_lines: int = 3) -> str:
+    lines = textwrap.wrap(str(text), width=width, max_lines=max_lines, placeholder="...")
+    return "\n".join(lines)
+
+def _render_summary_page(report: Dict[str, Any]) -> Any:
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+
+    figure = Figure(figsize=PAGE_SIZE)
+    figure.text(0.08, 0.95, f"Risk Report: {report['project']}", fontsize=20, weight="bold", va="top")
+    scope = f"Last {report['days_back']} days, generated {report['generated_at']}"
+    for label, values in (("Levels", report["level"]), ("Categories", report["category"])):
+        if values is not None:
+            scope += f"\n{label}: {', '.join(values)}"
+    figure.text(0.08, 0.91, scope, fontsize=9, color="#555555", va="top")
+
+    if report["total"] == 0:
+        figure.text(0.08, 0.8, "No risks found matching the report filters.", fontsize=12, va="top")
+        return figure
+
+    level_counts = report["level_counts"]
+    figure.text(
+        0.08, 0.84,
+        f"Total risks: {report['total']}    "
+        + "    ".join(f"{level}: {count}" for level, count in level_counts.items()),
+        fontsize=12, va="top"
+    )
+
+    levels = list(level_counts)
+    level_axes = figure.add_axes([0.08, 0.5, 0.36, 0.28])
+    level_axes.bar(levels, [level_counts[level] for level in levels], color=[RISK_LEVELS[level]["color"] for level in levels])
+    level_axes.set_title("Risks by Level", fontsize=11)
+    level_axes.set_ylabel("Risks")
+    level_axes.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+    # Largest category at the top
+    categories = report["category_counts"][::-1]
+    category_axes = figure.add_axes([0.62, 0.5, 0.32, 0.28])
+    category_axes.barh([category for category, _ in categories], [count for _, count in categories], color="#4a7bd0")
+    category_axes.set_title("Risks by Category", fontsize=11)
+    category_axes.tick_params(axis="y", labelsize=8)
+    category_axes.set_xlabel("Risks")
+    category_axes.xaxis.set_major_locator(MaxNLocator(integer=True))
+
+    figure.text(0.08, 0.43, "Critical Attention Required", fontsize=13, weight="bold", va="top")
+    if not report["critical_risks"]:
+        figure.text(0.08, 0.4, "No high-level risks identified at this time.", fontsize=10, va="top")
+    y = 0.4
+    for i, risk in enumerate(report["critical_risks"]):
+        figure.text(0.08, y, f"{i + 1}. {_wrap(risk['title'], 90, 1)}", fontsize=10, weight="bold", va="top")
+        figure.text(0.1, y - 0.022, _wrap(risk["description"], 105), fontsize=9, va="top")
+        y -= 0.08
+    return figure
+
+def _render_top_risks_page(report: Dict[str, Any]) -> Any:
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=PAGE_SIZE)
+    figure.text(0.08, 0.95, "Highest-Scoring Risks", fontsize=16, weight="bold", va="top")
+    axes = figure.add_axes([0.05, 0.05, 0.9, 0.86])
+    axes.axis("off")
+    rows = [
+        [_wrap(risk["title"], 48, 1), risk["category"], risk["level"], str(risk["score"]), risk["status"], risk["date_identified"]]
+        for risk in report["top_risks"]
+    ]
+    table = axes.table(
+        cellText=rows,
+        colLabels=["Title", "Category", "Level", "Score", "Status", "Identified"],
+        colWidths=[0.38, 0.14, 0.08, 0.07, 0.13, 0.13],
+        cellLoc="left",
+        loc="upper center"
+    )
+    table.auto_set_font_size(False)
+    table.set_fontsize(7)
+    table.scale(1, 1.4)
+    for row, risk in enumerate(report["top_risks"], start=1):
+        table[row, 2].set_facecolor(RISK_LEVELS.get(risk["level"], {}).get("color", "white"))
+    return figure
+
+def render_report_pdf(report: Dict[str, Any], path: str) -> int:
+    """
+    Render a risk report to a PDF file.
+
+    Runs in a report worker process, so it takes only plain data and
+    writes the file itself rather than sending the PDF back.
+
+    Args:
+        report: Figures from risk_report_data plus the project, filters and top risks
+        path: File to write; replaced only once the PDF is complete
+
+    Returns:
+        Size of the written file in bytes
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        with PdfPages(temp_path, metadata={"Title": f"Risk Report: {report['project']}"}) as pdf:
+            pdf.savefig(_render_summary_page(report))
+            if report["top_risks"]:
+                pdf.savefig(_render_top_risks_page(report))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return os.path.getsize(path)
+
+def archive_reports(jobs: Sequence[ReportJob]) -> bytes:
+    """Bundle finished reports into one ZIP archive."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for job in jobs:
+            if job.status == "done":
+                archive.write(job.path, job.file_name)
+    return buffer.getvalue()
+
+class ReportJobManager:
+    """
+    Queues PDF report jobs and renders them in a pool of worker processes.
+
+    Submitting returns at once with one job per project. A single collector
+    thread reads each project's risks and computes the report figures, then
+    hands the plain data to the process pool, so chart rendering neither
+    blocks the Streamlit script thread nor holds the GIL of the app process,
+    and reports for several projects render in parallel. Jobs are keyed by
+    project, filters and data version: asking again for an unchanged report
+    returns the queued, running or finished job. Only the max_jobs most
+    recent jobs are kept, and the files of older finished ones are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: str = REPORT_DIRECTORY,
+        workers: int = REPORT_WORKERS,
+        max_jobs: int = REPORT_MAX_JOBS
+    ):
+        self.directory = directory
+        self.workers = workers
+        self.max_jobs = max_jobs
+        os.makedirs(directory, exist_ok=True)
+        # Jobs only live in memory, so files left by an earlier run can no longer be downloaded
+        for name in os.listdir(directory):
+            if name.endswith((".pdf", ".tmp")):
+                os.remove(os.path.join(directory, name))
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReportJob] = {}
+        self._jobs_by_key: Dict[str, ReportJob] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._collector = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-collector")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the app's threads and locks, as forked ones would
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def submit(
+        self,
+        projects: Sequence[str],
+        days_back: int,
+        level: Optional[Sequence[str]] = None,
+        category: Optional[Sequence[str]] = None
+    ) -> List[ReportJob]:
+        """
+        Queue a report for each project.
+
+        Args:
+            projects: Project names, one report each
+            days_back: Number of days of history to include
+            level: Risk levels to include, or None for all
+            category: Categories to include, or None for all
+
+        Returns:
+            The jobs, in the order of projects
+        """
+        from data_handlers import get_data_version
+
+        level = sorted(level) if level is not None else None
+        category = sorted(category) if category is not None else None
+        version = get_data_version()
+
+        jobs, queued = [], []
+        with self._lock:
+            for project in projects:
+                key = hashlib.sha256(json.dumps([project, days_back, level, category, version]).encode("utf-8")).hexdigest()[:24]
+                job = self._jobs_by_key.get(key)
+                if job is None or job.status == "failed" or job.id not in self._jobs:
+                    job = ReportJob(key, project, days_back, level, category)
+                    self._jobs[job.id] = job
+                    self._jobs_by_key[key] = job
+                    queued.append(job)
+                jobs.append(job)
+        for job in queued:
+            self._collector.submit(self._collect, job)
+        self._evict()
+        return jobs
+
+    def _collect(self, job: ReportJob) -> None:
+        from data_handlers import get_project_data
+
+        try:
+            job.status = "collecting"
+            risks = get_project_data(job.project, job.days_back)["risks"].filter(level=job.level, category=job.category)
+            report = risk_report_data(risks)
+            report["critical_risks"] = [
+                {"title": risk["title"], "description": risk["description"]} for risk in report["critical_risks"]
+            ]
+            report.update(
+                project=job.project,
+                days_back=job.days_back,
+                level=job.level,
+                category=job.category,
+                generated_at=datetime.now().strftime("%Y-%m-%d %H:%M"),
+                top_risks=[
+                    {field: risk[field] for field in TOP_RISK_FIELDS}
+                    for risk in risks.top_k(REPORT_TOP_RISKS).to_records()
+                ]
+            )
+
+            path = os.path.join(self.directory, f"{job.key}.pdf")
+            job.status = "rendering"
+            future = self._get_pool().submit(render_report_pdf, report, path)
+            future.add_done_callback(lambda done: self._finish(job, path, done))
+        except Exception as e:
+            self._fail(job, e)
+
+    def _finish(self, job: ReportJob, path: str, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            self._fail(job, error)
+            return
+        job.path = path
+        job.size = future.result()
+        job.finished_at = time.time()
+        job.status = "done"
+
+    def _fail(self, job: ReportJob, error: BaseException) -> None:
+        print(f"Error generating PDF report for {job.project}: {error}")
+        if isinstance(error, BrokenProcessPool):
+            # A worker died; start a fresh pool for the next job
+            with self._lock:
+                self._pool = None
+        job.error = str(error) or type(error).__name__
+        job.finished_at = time.time()
+        job.status = "failed"
+
+    def _evict(self) -> None:
+        with self._lock:
+            excess = len(self._jobs) - self.max_jobs
+            for job in list(self._jobs.values()):
+                if excess <= 0:
+                    break
+                if not job.finished:
+                    continue
+                del self._jobs[job.id]
+                if self._jobs_by_key.get(job.key) is job:
+                    del self._jobs_by_key[job.key]
+                if job.path is not None and os.path.exists(job.path):
+                    os.remove(job.path)
+                excess -= 1
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """Return a job by id, or None if it has been evicted."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, job_ids: Optional[Sequence[str]] = None) -> List[ReportJob]:
+        """Return the given jobs that are still kept, or all jobs, oldest first."""
+        with self._lock:
+            if job_ids is None:
+                return list(self._jobs.values())
+            return [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+
+    def shutdown(self) -> None:
+        self._collector.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+_report_job_manager = None
+_report_job_manager_lock = threading.Lock()
+
+def get_report_job_manager() -> ReportJobManager:
+    """Return the process-wide report job manager."""
+    global _report_job_manager
+    if _report_job_manager is None:
+        with _report_job_manager_lock:
+            if _report_job_manager is None:
+                _report_job_manager = ReportJobManager()
+    return _report_job_manager
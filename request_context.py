@@ -0,0 +1,105 @@
+import contextvars
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+class RequestContext:
+    """
+    State shared by every tool call made while answering one question.
+
+    Project data is built at most once per (project, days_back) and then
+    pinned for the rest of the request, so all agents reason over the same
+    snapshot even if the data cache is refreshed mid-run. Tool results are
+    memoized by tool name and arguments. Tasks running concurrently that
+    ask for the same thing wait for a single computation.
+    """
+
+    def __init__(self):
+        self._values: Dict[Hashable, Any] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the value stored under key, computing it once if missing."""
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    self.hits += 1
+                    return self._values[key]
+                self.misses += 1
+            value = compute()
+            with self._lock:
+                self._values[key] = value
+            return value
+
+    def project_data(self, project_name: str, days_back: int, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        return self.get_or_compute(("project_data", project_name, days_back), build)
+
+    def tool_result(self, tool_name: str, arguments: tuple, run: Callable[[], str]) -> str:
+        return self.get_or_compute(("tool", tool_name, arguments), run)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._values)}
+
+_current_request: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar("current_request", default=None)
+
+def current_request() -> Optional[RequestContext]:
+    """Return the active request context, or None outside a request."""
+    return _current_request.get()
+
+@contextmanager
+def request_scope() -> Iterator[RequestContext]:
+    """
+    Share data snapshots and tool results between the tool calls made in the block.
+
+    Nested scopes reuse the outer context. Threads started with a copy of the
+    caller's context (as the task scheduler does) join the same request.
+    """
+    context = _current_request.get()
+    if context is not None:
+        yield context
+        return
+
+    context = RequestContext()
+    token = _current_request.set(context)
+    try:
+        yield context
+    finally:
+        _current_request.reset(token)
+
+def memoized_tool(run: Callable[..., str]) -> Callable[..., str]:
+    """
+    Decorate a tool's _run method so repeated calls within a request are served from the request context.
+
+    Arguments are normalized through the method's signature, so positional,
+    keyword and defaulted forms of the same call share one result. The
+    run_manager callback argument is not part of the key.
+    """
+    signature = inspect.signature(run)
+
+    @functools.wraps(run)
+    def wrapper(self, *args: Any, **kwargs: Any) -> str:
+        context = _current_request.get()
+        if context is None:
+            return run(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple(
+            (name, repr(value)) for name, value in bound.arguments.items()
+            if name not in ("self", "run_manager")
+        )
+        return context.tool_result(self.name, arguments, lambda: run(self, *args, **kwargs))
+
+    return wrapper
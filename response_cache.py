@@ -0,0 +1,210 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from config import (
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_SEMANTIC_MATCH,
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD
+)
+
+def normalize_query(query: str) -> str:
+    """Lower-case a query, collapse whitespace and drop trailing punctuation."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+def cache_key(normalized_query: str, project: str, data_version: str) -> str:
+    return hashlib.sha256(f"{project}\x1f{data_version}\x1f{normalized_query}".encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Disk cache of crew answers keyed by normalized query, project and data version.
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once the stored answers exceed max_bytes. With semantic matching
+    enabled, a query that misses exactly can still hit an answer for a
+    near-identical question about the same project and data version.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        similarity_threshold: float = RESPONSE_CACHE_SIMILARITY_THRESHOLD
+    ):
+        """
+        Args:
+            path: SQLite file holding the cache
+            ttl: Seconds an answer stays valid
+            max_bytes: Size above which least recently used answers are evicted
+            embed_query: Embedding function for near-duplicate matching; None disables it
+            similarity_threshold: Minimum cosine similarity for a near-duplicate hit
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.embed_query = embed_query
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                project TEXT NOT NULL,
+                data_version TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses (project, data_version)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, query: str, project: str, data_version: str) -> Optional[str]:
+        """Return the cached answer for the query, or None."""
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            row = self._connection.execute(
+                "SELECT key, response FROM responses WHERE key = ?",
+                (cache_key(normalized, project, data_version),)
+            ).fetchone()
+            if row is not None:
+                return self._hit(row, now)
+            semantic = self.embed_query is not None and self._connection.execute(
+                "SELECT 1 FROM responses WHERE project = ? AND data_version = ? AND embedding IS NOT NULL LIMIT 1",
+                (project, data_version)
+            ).fetchone() is not None
+            # Commit the expiry now so it is not left in an open transaction
+            self._connection.commit()
+            if not semantic:
+                self.misses += 1
+                return None
+
+        # The embedding call goes to the model server, so other sessions' lookups must not wait on it
+        try:
+            query_embedding = self.embed_query(normalized)
+        except Exception as e:
+            print(f"Error embedding query for response cache: {str(e)}")
+            query_embedding = None
+
+        key = self._nearest(query_embedding, project, data_version) if query_embedding is not None else None
+        with self._lock:
+            row = None if key is None else self._connection.execute(
+                "SELECT key, response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.semantic_hits += 1
+            return self._hit(row, now)
+
+    def _hit(self, row: tuple, now: float) -> str:
+        # Caller holds self._lock
+        self.hits += 1
+        self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, row[0]))
+        self._connection.commit()
+        return row[1]
+
+    def _nearest(self, query_embedding: List[float], project: str, data_version: str) -> Optional[str]:
+        """Return the key of the most similar stored query above the threshold, scoring outside the cache lock."""
+        with self._lock:
+            candidates = self._connection.execute(
+                "SELECT key, embedding FROM responses WHERE project = ? AND data_version = ? AND embedding IS NOT NULL",
+                (project, data_version)
+            ).fetchall()
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # Embeddings of another size come from a different model and cannot match
+        candidates = [(key, blob) for key, blob in candidates if len(blob) == query.nbytes]
+        if not candidates:
+            return None
+        matrix = np.frombuffer(b"".join(blob for _, blob in candidates), dtype=np.float32).reshape(len(candidates), -1)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = np.divide(matrix @ query, norms, out=np.zeros(len(candidates), dtype=np.float32), where=norms > 0)
+        best = int(np.argmax(scores))
+        return candidates[best][0] if scores[best] >= self.similarity_threshold else None
+
+    def put(self, query: str, project: str, data_version: str, response: str) -> None:
+        """Store an answer, evicting old entries if the cache is over size."""
+        normalized = normalize_query(query)
+        embedding = None
+        if self.embed_query is not None:
+            try:
+                embedding = array("f", self.embed_query(normalized)).tobytes()
+            except Exception as e:
+                print(f"Error embedding query for response cache: {str(e)}")
+
+        now = time.time()
+        size = len(response.encode("utf-8")) + (len(embedding) if embedding else 0)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(normalized, project, data_version), normalized, project, data_version,
+                 response, embedding, now, now, size)
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total <= self.max_bytes * 0.9:
+                break
+            victims.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "entries": count,
+                "bytes": size,
+                "max_bytes": self.max_bytes
+            }
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                embed_query = None
+                if RESPONSE_CACHE_SEMANTIC_MATCH:
+                    from embeddings import get_embedding_service
+                    embed_query = get_embedding_service().embed_query
+                _response_cache = ResponseCache(embed_query=embed_query)
+    return _response_cache
@@ -0,0 +1,645 @@
+import json
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+import pandas as pd
+from config import RISK_DB_PATH
+
+# Columns stored for every risk, in insertion order
+RISK_COLUMNS = [
+    "id",
+    "project",
+    "title",
+    "description",
+    "category",
+    "level",
+    "score",
+    "probability",
+    "impact",
+    "date_identified",
+    "status",
+    "mitigation_strategies"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS risks (
+    id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    category TEXT NOT NULL,
+    level TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    probability INTEGER,
+    impact INTEGER,
+    date_identified TEXT NOT NULL,
+    status TEXT NOT NULL,
+    mitigation_strategies TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_risks_project_date ON risks (project, date_identified);
+CREATE INDEX IF NOT EXISTS idx_risks_category ON risks (category);
+CREATE INDEX IF NOT EXISTS idx_risks_level ON risks (level);
+CREATE INDEX IF NOT EXISTS idx_risks_status ON risks (status);
+CREATE INDEX IF NOT EXISTS idx_risks_date ON risks (date_identified);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('data_version', 0);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('refresh_generation', 0);
+"""
+
+# Rollups are keyed by these risk columns; date_identified holds the day (YYYY-MM-DD)
+ROLLUP_COLUMNS = ["project", "date_identified", "category", "level", "status"]
+
+# SQL adding or removing one risk row ({row} is NEW or OLD) to or from the rollups
+_ROLLUP_ADD = """
+    INSERT INTO risk_rollup (project, date_identified, category, level, status, count, score_sum)
+    VALUES ({row}.project, substr({row}.date_identified, 1, 10), {row}.category, {row}.level, {row}.status, 1, {row}.score)
+    ON CONFLICT (project, date_identified, category, level, status)
+    DO UPDATE SET count = count + 1, score_sum = score_sum + excluded.score_sum;
+    INSERT INTO project_daily_score (project, date_identified, count, score_sum)
+    VALUES ({row}.project, substr({row}.date_identified, 1, 10), 1, {row}.score)
+    ON CONFLICT (project, date_identified)
+    DO UPDATE SET count = count + 1, score_sum = score_sum + excluded.score_sum;
+"""
+_ROLLUP_REMOVE = """
+    UPDATE risk_rollup SET count = count - 1, score_sum = score_sum - {row}.score
+    WHERE project = {row}.project AND date_identified = substr({row}.date_identified, 1, 10)
+    AND category = {row}.category AND level = {row}.level AND status = {row}.status;
+    DELETE FROM risk_rollup WHERE count <= 0 AND project = {row}.project AND date_identified = substr({row}.date_identified, 1, 10);
+    UPDATE project_daily_score SET count = count - 1, score_sum = score_sum - {row}.score
+    WHERE project = {row}.project AND date_identified = substr({row}.date_identified, 1, 10);
+    DELETE FROM project_daily_score WHERE count <= 0 AND project = {row}.project AND date_identified = substr({row}.date_identified, 1, 10);
+"""
+
+# Materialized rollups kept in step with the risks table by triggers, inside the writing transaction
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS risk_rollup (
+    project TEXT NOT NULL,
+    date_identified TEXT NOT NULL,
+    category TEXT NOT NULL,
+    level TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    PRIMARY KEY (project, date_identified, category, level, status)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS project_daily_score (
+    project TEXT NOT NULL,
+    date_identified TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    PRIMARY KEY (project, date_identified)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_risks_rollup_insert AFTER INSERT ON risks BEGIN
+{_ROLLUP_ADD.format(row="NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_risks_rollup_delete AFTER DELETE ON risks BEGIN
+{_ROLLUP_REMOVE.format(row="OLD")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_risks_rollup_update
+AFTER UPDATE OF project, date_identified, category, level, status, score ON risks BEGIN
+{_ROLLUP_REMOVE.format(row="OLD")}
+{_ROLLUP_ADD.format(row="NEW")}
+END;
+"""
+
+REBUILD_ROLLUPS_SQL = """
+BEGIN;
+DELETE FROM risk_rollup;
+DELETE FROM project_daily_score;
+INSERT INTO risk_rollup (project, date_identified, category, level, status, count, score_sum)
+    SELECT project, substr(date_identified, 1, 10), category, level, status, COUNT(*), SUM(score)
+    FROM risks GROUP BY 1, 2, 3, 4, 5;
+INSERT INTO project_daily_score (project, date_identified, count, score_sum)
+    SELECT project, substr(date_identified, 1, 10), COUNT(*), SUM(score)
+    FROM risks GROUP BY 1, 2;
+INSERT OR REPLACE INTO store_meta (key, value) VALUES ('rollups_built', 1);
+COMMIT;
+"""
+
+SECONDARY_INDEXES = re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", SCHEMA)
+ROLLUP_TRIGGERS = re.findall(r"CREATE TRIGGER IF NOT EXISTS (\w+)", ROLLUP_SCHEMA)
+
+BUMP_VERSION_SQL = "UPDATE store_meta SET value = value + 1 WHERE key = 'data_version'"
+
+# A filter value may be a single value or a collection of accepted values
+FilterValue = Optional[Union[str, Sequence[str]]]
+
+def since_date(days_back: int) -> str:
+    """Return the earliest date_identified included in a days_back window."""
+    return (datetime.now() - timedelta(days=max(days_back - 1, 0))).strftime("%Y-%m-%d")
+
+class RiskRepository:
+    """SQLite-backed storage for project risks."""
+
+    def __init__(self, db_path: str = RISK_DB_PATH):
+        """
+        Open (and create if needed) the risk database.
+
+        Args:
+            db_path: Path to the SQLite file, or ":memory:" for a private in-memory store
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        # In-memory databases are private to one connection, so share it across threads
+        self._shared_connection = None
+        if db_path == ":memory:":
+            self._shared_connection = self._connect()
+        connection = self._connection()
+        connection.executescript(SCHEMA + ROLLUP_SCHEMA)
+        # Stores created before the rollups existed are aggregated once
+        if connection.execute("SELECT 1 FROM store_meta WHERE key = 'rollups_built'").fetchone() is None:
+            self.rebuild_rollups()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=self.db_path != ":memory:")
+        connection.row_factory = sqlite3.Row
+        if self.db_path != ":memory:":
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE only runs the rollup delete trigger for the replaced row with this on
+        connection.execute("PRAGMA recursive_triggers=ON")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection for the calling thread."""
+        if self._shared_connection is not None:
+            return self._shared_connection
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def subscribe(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """
+        Register a callback run with the written risks after every insert or status change.
+
+        Listeners let derived structures such as search indexes stay in step
+        with the store incrementally.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Remove a callback registered with subscribe; unknown listeners are ignored."""
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _notify(self, risks: List[Dict[str, Any]]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(risks)
+            except Exception as e:
+                print(f"Error in risk store listener: {str(e)}")
+
+    def insert_risks(self, risks: Iterable[Dict[str, Any]], project: Optional[str] = None) -> int:
+        """
+        Insert or replace risks in the store.
+
+        Args:
+            risks: Risk dictionaries as produced by generate_mock_risk
+            project: Project to file the risks under when a risk has no "project" key
+
+        Returns:
+            Number of rows written
+        """
+        rows = [self._to_row(risk, project) for risk in risks]
+        if not rows:
+            return 0
+
+        placeholders = ", ".join("?" for _ in RISK_COLUMNS)
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO risks ({', '.join(RISK_COLUMNS)}) VALUES ({placeholders})",
+                    rows
+                )
+                connection.execute(BUMP_VERSION_SQL)
+        if self._listeners:
+            self._notify([self._from_row(dict(zip(RISK_COLUMNS, row))) for row in rows])
+        return len(rows)
+
+    def insert_frame(self, frame: pd.DataFrame, chunk_size: int = 100_000) -> int:
+        """
+        Bulk insert or replace risks held in a DataFrame.
+
+        The frame must have every column in RISK_COLUMNS, with
+        mitigation_strategies already JSON-encoded, as produced by the
+        workload generator. Rows are written straight from the columns
+        without building a dictionary per risk.
+
+        Args:
+            frame: Risks to write
+            chunk_size: Rows per transaction
+
+        Returns:
+            Number of rows written
+        """
+        placeholders = ", ".join("?" for _ in RISK_COLUMNS)
+        sql = f"INSERT OR REPLACE INTO risks ({', '.join(RISK_COLUMNS)}) VALUES ({placeholders})"
+        written = 0
+        for start in range(0, len(frame), chunk_size):
+            chunk = frame.iloc[start:start + chunk_size]
+            # tolist() yields Python ints and strs, which SQLite binds without conversion
+            rows = list(zip(*(chunk[column].tolist() for column in RISK_COLUMNS)))
+            with self._write_lock:
+                connection = self._connection()
+                with connection:
+                    connection.executemany(sql, rows)
+                    connection.execute(BUMP_VERSION_SQL)
+            written += len(rows)
+            if self._listeners:
+                self._notify([self._from_row(dict(zip(RISK_COLUMNS, row))) for row in rows])
+        return written
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """
+        Drop the secondary indexes and rollup triggers while the block writes, then rebuild them.
+
+        Building an index or rollup once over the loaded rows is much cheaper
+        than updating it row by row during a bulk insert of millions of risks.
+        """
+        connection = self._connection()
+        with self._write_lock:
+            for name in SECONDARY_INDEXES:
+                connection.execute(f"DROP INDEX IF EXISTS {name}")
+            for name in ROLLUP_TRIGGERS:
+                connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+            connection.commit()
+        try:
+            yield
+        finally:
+            with self._write_lock:
+                connection.executescript(SCHEMA + ROLLUP_SCHEMA)
+            self.rebuild_rollups()
+
+    def rebuild_rollups(self) -> None:
+        """Recompute the rollup tables from every stored risk."""
+        with self._write_lock:
+            self._connection().executescript(REBUILD_ROLLUPS_SQL)
+
+    def update_status(self, risk_id: str, status: str) -> bool:
+        """Change the status of a stored risk. Returns False if the risk does not exist."""
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                cursor = connection.execute("UPDATE risks SET status = ? WHERE id = ?", (status, risk_id))
+                if cursor.rowcount > 0:
+                    connection.execute(BUMP_VERSION_SQL)
+        if cursor.rowcount > 0 and self._listeners:
+            self._notify(self.get_risks([risk_id]))
+        return cursor.rowcount > 0
+
+    def get_risks(self, risk_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """Return the stored risks with the given ids."""
+        if not risk_ids:
+            return []
+        placeholders = ", ".join("?" for _ in risk_ids)
+        sql = f"SELECT {', '.join(RISK_COLUMNS)} FROM risks WHERE id IN ({placeholders})"
+        return [self._from_row(row) for row in self._connection().execute(sql, list(risk_ids))]
+
+    def query_risks(
+        self,
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None,
+        order_by: str = "date_identified DESC",
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return risks matching the given filters.
+
+        Args:
+            project: Project name or list of names, or None / "All Projects" for every project
+            since: Earliest date_identified (YYYY-MM-DD), inclusive
+            until: Latest date_identified (YYYY-MM-DD), inclusive
+            category: Category or list of categories to include
+            level: Risk level or list of levels to include
+            status: Status or list of statuses to include
+            order_by: SQL ORDER BY clause
+            limit: Maximum number of rows to return
+
+        Returns:
+            List of risk dictionaries
+        """
+        where, params = self._where(project, since, until, category, level, status)
+        sql = f"SELECT {', '.join(RISK_COLUMNS)} FROM risks{where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [self._from_row(row) for row in self._connection().execute(sql, params)]
+
+    def query_frame(
+        self,
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None,
+        order_by: str = "date_identified DESC",
+        limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Same as query_risks, but return the rows as a DataFrame.
+
+        Mitigation strategies are left as JSON text and decoded lazily by RiskTable.
+        """
+        where, params = self._where(project, since, until, category, level, status)
+        sql = f"SELECT {', '.join(RISK_COLUMNS)} FROM risks{where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        frame = pd.read_sql_query(sql, self._connection(), params=params)
+        if frame.empty:
+            frame = pd.DataFrame(columns=RISK_COLUMNS)
+        return frame
+
+    def iter_frames(
+        self,
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None,
+        order_by: str = "date_identified DESC, id",
+        chunk_size: int = 50_000
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Same as query_frame, but yield the rows in DataFrames of at most chunk_size rows.
+
+        Rows are fetched from the cursor one chunk at a time, so memory use
+        does not grow with the number of matching risks.
+        """
+        for rows in self._iter_chunks(project, since, until, category, level, status, order_by, chunk_size):
+            yield pd.DataFrame.from_records(rows, columns=RISK_COLUMNS)
+
+    def iter_risks(
+        self,
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None,
+        order_by: str = "id",
+        chunk_size: int = 10_000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Same as query_risks, but yield the risk dictionaries one at a time.
+
+        Rows are fetched chunk_size at a time, so the whole register can be
+        walked without loading it into memory.
+        """
+        for rows in self._iter_chunks(project, since, until, category, level, status, order_by, chunk_size):
+            for row in rows:
+                yield self._from_row(dict(zip(RISK_COLUMNS, row)))
+
+    def _iter_chunks(self, project, since, until, category, level, status, order_by: str, chunk_size: int) -> Iterator[List[tuple]]:
+        where, params = self._where(project, since, until, category, level, status)
+        sql = f"SELECT {', '.join(RISK_COLUMNS)} FROM risks{where} ORDER BY {order_by}"
+        # A private connection keeps the open read from interleaving with the thread's other queries
+        connection = self._shared_connection or self._connect()
+        try:
+            cursor = connection.cursor()
+            # Plain tuples are much cheaper to build than sqlite3.Row objects
+            cursor.row_factory = None
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            if connection is not self._shared_connection:
+                connection.close()
+
+    def count_risks(
+        self,
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None
+    ) -> int:
+        """Return the number of risks matching the given filters."""
+        where, params = self._where(project, since, until, category, level, status)
+        return self._connection().execute(f"SELECT COUNT(*) FROM risks{where}", params).fetchone()[0]
+
+    def count_by(
+        self,
+        columns: Sequence[str],
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return risk counts grouped by the given columns, largest group first.
+
+        Args:
+            columns: Columns to group by, e.g. ["category", "level"]
+
+        Returns:
+            List of dictionaries with one key per column plus "count"
+        """
+        for column in columns:
+            if column not in RISK_COLUMNS:
+                raise ValueError(f"Unknown risk column: {column}")
+        group = ", ".join(columns)
+        where, params = self._where(project, since, until, category, level, status)
+        sql = f"SELECT {group}, COUNT(*) AS count FROM risks{where} GROUP BY {group} ORDER BY count DESC, {group}"
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def rollup_counts(
+        self,
+        columns: Sequence[str],
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Same as count_by, but read from the materialized rollup.
+
+        The cost depends on the number of (project, day, category, level,
+        status) groups in range rather than on the number of risks.
+
+        Args:
+            columns: Columns to group by, from ROLLUP_COLUMNS; date_identified groups by day
+
+        Returns:
+            List of dictionaries with one key per column plus "count" and
+            "average_score", largest group first
+        """
+        for column in columns:
+            if column not in ROLLUP_COLUMNS:
+                raise ValueError(f"Unknown rollup column: {column}")
+        where, params = self._where(project, since, until, category, level, status)
+        select = "".join(f"{column}, " for column in columns)
+        group = f" GROUP BY {', '.join(columns)}" if columns else ""
+        order = "".join(f", {column}" for column in columns)
+        sql = (
+            f"SELECT {select}SUM(count) AS count, CAST(SUM(score_sum) AS REAL) / SUM(count) AS average_score "
+            f"FROM risk_rollup{where}{group} HAVING SUM(count) > 0 ORDER BY count DESC{order}"
+        )
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def daily_scores(
+        self,
+        project: FilterValue = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return each project's daily risk score from the materialized rollup.
+
+        A day's score is the average score of the risks identified that day.
+
+        Returns:
+            List of dictionaries with project, date_identified, count and risk_score, oldest day first
+        """
+        where, params = self._where(project, since, until, None, None, None)
+        sql = (
+            "SELECT project, date_identified, count, CAST(score_sum AS REAL) / count AS risk_score "
+            f"FROM project_daily_score{where} ORDER BY project, date_identified"
+        )
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def data_version(self) -> int:
+        """Return a counter that increases with every write to the store."""
+        row = self._connection().execute("SELECT value FROM store_meta WHERE key = 'data_version'").fetchone()
+        return row[0] if row else 0
+
+    def refresh_generation(self) -> int:
+        """Return the number of manual refreshes recorded in the store."""
+        row = self._connection().execute("SELECT value FROM store_meta WHERE key = 'refresh_generation'").fetchone()
+        return row[0] if row else 0
+
+    def bump_refresh_generation(self) -> int:
+        """
+        Record a manual refresh and return the new generation.
+
+        The counter lives in the database file, so answers invalidated by a
+        refresh stay invalid after a restart.
+        """
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'refresh_generation'")
+                return connection.execute("SELECT value FROM store_meta WHERE key = 'refresh_generation'").fetchone()[0]
+
+    def has_project(self, project: str) -> bool:
+        """Return True if any risks are stored for the project."""
+        row = self._connection().execute("SELECT 1 FROM risks WHERE project = ? LIMIT 1", (project,)).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        """Close the calling thread's connection."""
+        if self._shared_connection is not None:
+            self._shared_connection.close()
+            self._shared_connection = None
+            return
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def _where(project, since, until, category, level, status):
+        clauses = []
+        params: List[Any] = []
+
+        if project == "All Projects":
+            project = None
+        if since:
+            clauses.append("date_identified >= ?")
+            params.append(since)
+        if until:
+            clauses.append("date_identified <= ?")
+            params.append(until)
+
+        for column, value in (("project", project), ("category", category), ("level", level), ("status", status)):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                clauses.append(f"{column} = ?")
+                params.append(value)
+            else:
+                values = list(value)
+                if not values:
+                    # An empty selection matches nothing
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    @staticmethod
+    def _to_row(risk: Dict[str, Any], project: Optional[str]) -> tuple:
+        return (
+            risk["id"],
+            risk.get("project", project),
+            risk["title"],
+            risk.get("description", ""),
+            risk["category"],
+            risk["level"],
+            int(risk.get("score", 0)),
+            int(risk.get("probability", 0)),
+            int(risk.get("impact", 0)),
+            risk["date_identified"],
+            risk.get("status", "Active"),
+            json.dumps(risk.get("mitigation_strategies", []))
+        )
+
+    @staticmethod
+    def _from_row(row: Union[sqlite3.Row, Dict[str, Any]]) -> Dict[str, Any]:
+        risk = dict(row)
+        risk["mitigation_strategies"] = json.loads(risk["mitigation_strategies"] or "[]")
+        return risk
+
+_repository = None
+_repository_lock = threading.Lock()
+
+def get_risk_repository() -> RiskRepository:
+    """Return the process-wide risk repository, opening it on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = RiskRepository(RISK_DB_PATH)
+    return _repository
+
+def set_risk_repository(repository: Optional[RiskRepository]) -> Optional[RiskRepository]:
+    """
+    Replace the process-wide risk repository, e.g. with a synthetic store for benchmarks.
+
+    Returns:
+        The repository that was in use before
+    """
+    global _repository
+    with _repository_lock:
+        previous, _repository = _repository, repository
+    return previous
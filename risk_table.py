@@ -0,0 +1,226 @@
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from config import RISK_CATEGORIES, RISK_LEVELS
+
+RISK_STATUSES = ["Active", "Mitigated", "Monitoring", "Closed"]
+
+# Columns held as pandas categoricals, with their known categories
+CATEGORICAL_COLUMNS = {
+    "category": RISK_CATEGORIES,
+    "level": list(RISK_LEVELS.keys()),
+    "status": RISK_STATUSES,
+    "project": None
+}
+
+# Value or collection of values accepted by RiskTable.filter
+FilterValue = Optional[Union[str, Sequence[str]]]
+
+def _to_python(value: Any) -> Any:
+    """Convert NumPy scalars to plain Python values so rows stay JSON serializable."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class RiskRow(Mapping):
+    """Read-only, dict-like view of one row of a RiskTable."""
+
+    __slots__ = ("_table", "_position")
+
+    def __init__(self, table: "RiskTable", position: int):
+        self._table = table
+        self._position = position
+
+    def __getitem__(self, key: str) -> Any:
+        columns = self._table._arrays()
+        if key not in columns:
+            raise KeyError(key)
+        value = columns[key][self._position]
+        if key == "mitigation_strategies" and isinstance(value, str):
+            return json.loads(value)
+        return _to_python(value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.columns)
+
+    def __len__(self) -> int:
+        return len(self._table.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a plain dictionary copy of the row."""
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f"RiskRow({self.to_dict()!r})"
+
+class RiskTable:
+    """
+    Columnar table of risks backed by a pandas DataFrame.
+
+    Category, level, status and project are stored as categoricals, so
+    filtering and counting are vectorized over integer codes. Iterating the
+    table yields RiskRow views, which behave like the risk dictionaries
+    older callers expect.
+    """
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None):
+        # A shallow copy, so converting columns never changes the caller's frame
+        frame = pd.DataFrame() if frame is None else frame.copy(deep=False)
+        for column, categories in CATEGORICAL_COLUMNS.items():
+            if column in frame.columns and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+                if categories is not None:
+                    extra = sorted(set(frame[column].dropna().unique()) - set(categories))
+                    frame[column] = pd.Categorical(frame[column], categories=list(categories) + extra)
+                else:
+                    frame[column] = frame[column].astype("category")
+        self._frame = frame.reset_index(drop=True)
+        self._column_arrays: Optional[Dict[str, np.ndarray]] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "RiskTable":
+        """Build a table from an iterable of risk dictionaries."""
+        if isinstance(records, RiskTable):
+            return records
+        return cls(pd.DataFrame.from_records(list(records)))
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._frame.columns)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        """Column arrays used for row access, materialized once per table."""
+        if self._column_arrays is None:
+            self._column_arrays = {column: self._frame[column].to_numpy() for column in self._frame.columns}
+        return self._column_arrays
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def __bool__(self) -> bool:
+        return len(self._frame) > 0
+
+    def __iter__(self) -> Iterator[RiskRow]:
+        for position in range(len(self._frame)):
+            yield RiskRow(self, position)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[RiskRow, "RiskTable"]:
+        if isinstance(index, slice):
+            return RiskTable(self._frame.iloc[index])
+        if index < 0:
+            index += len(self._frame)
+        if not 0 <= index < len(self._frame):
+            raise IndexError("RiskTable index out of range")
+        return RiskRow(self, index)
+
+    def filter(
+        self,
+        project: FilterValue = None,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None,
+        since: Optional[str] = None
+    ) -> "RiskTable":
+        """
+        Return the risks matching all given filters.
+
+        Args:
+            project: Project name or list of names
+            category: Category or list of categories
+            level: Risk level or list of levels
+            status: Status or list of statuses
+            since: Earliest date_identified (YYYY-MM-DD), inclusive
+
+        Returns:
+            A new RiskTable with the matching rows
+        """
+        if self._frame.empty:
+            return self
+
+        mask = np.ones(len(self._frame), dtype=bool)
+        for column, value in (("project", project), ("category", category), ("level", level), ("status", status)):
+            if value is None or column not in self._frame.columns:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            mask &= self._frame[column].isin(values).to_numpy()
+        if since is not None:
+            mask &= (self._frame["date_identified"] >= since).to_numpy()
+
+        return RiskTable(self._frame[mask])
+
+    def count_by(self, column: str) -> Dict[str, int]:
+        """Return the number of risks per value of column, including zero counts for known categories."""
+        if self._frame.empty or column not in self._frame.columns:
+            categories = CATEGORICAL_COLUMNS.get(column) or []
+            return {value: 0 for value in categories}
+        counts = self._frame[column].value_counts(sort=False)
+        return {str(key): int(count) for key, count in counts.items()}
+
+    def top_k(self, k: int, by: str = "score", ascending: bool = False) -> "RiskTable":
+        """Return the k risks with the highest (or lowest) values of column by."""
+        if self._frame.empty:
+            return self
+        if ascending:
+            return RiskTable(self._frame.nsmallest(k, by))
+        return RiskTable(self._frame.nlargest(k, by))
+
+    def sort_by(self, by: str, ascending: bool = True) -> "RiskTable":
+        """
+        Return the risks ordered by a column.
+
+        The sort is stable and ties keep the newest risks first. Level,
+        category and status sort in their natural order (Low < Medium < High).
+        """
+        if self._frame.empty or by not in self._frame.columns:
+            return self
+        keys, orders = [by], [ascending]
+        if by != "date_identified" and "date_identified" in self._frame.columns:
+            keys.append("date_identified")
+            orders.append(False)
+        return RiskTable(self._frame.sort_values(keys, ascending=orders, kind="mergesort", na_position="last"))
+
+    def rating_matrix(self, rows: str = "probability", columns: str = "impact", scale: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count risks and average their scores over a grid of two 1-to-scale ratings.
+
+        Args:
+            rows: Rating column along the first axis
+            columns: Rating column along the second axis
+            scale: Highest rating; ratings outside 1..scale are ignored
+
+        Returns:
+            Tuple of (counts, average scores) arrays of shape (scale, scale),
+            indexed [rating - 1]; cells without risks have a NaN average
+        """
+        counts = np.zeros((scale, scale), dtype=np.int64)
+        averages = np.full((scale, scale), np.nan)
+        if self._frame.empty:
+            return counts, averages
+
+        row_codes = pd.to_numeric(self._frame[rows], errors="coerce").fillna(0).to_numpy(dtype=np.int64) - 1
+        column_codes = pd.to_numeric(self._frame[columns], errors="coerce").fillna(0).to_numpy(dtype=np.int64) - 1
+        valid = (row_codes >= 0) & (row_codes < scale) & (column_codes >= 0) & (column_codes < scale)
+        cells = row_codes[valid] * scale + column_codes[valid]
+        scores = pd.to_numeric(self._frame["score"], errors="coerce").fillna(0).to_numpy(dtype=float)[valid]
+
+        counts = np.bincount(cells, minlength=scale * scale).reshape(scale, scale)
+        sums = np.bincount(cells, weights=scores, minlength=scale * scale).reshape(scale, scale)
+        np.divide(sums, counts, out=averages, where=counts > 0)
+        return counts, averages
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Return the table as a list of plain risk dictionaries."""
+        return [row.to_dict() for row in self]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return a copy of the underlying DataFrame with mitigation strategies decoded."""
+        frame = self._frame.copy()
+        if "mitigation_strategies" in frame.columns:
+            frame["mitigation_strategies"] = frame["mitigation_strategies"].map(
+                lambda value: json.loads(value) if isinstance(value, str) else value
+            )
+        return frame
+
+    def __repr__(self) -> str:
+        return f"RiskTable({len(self)} risks)"
@@ -0,0 +1,165 @@
+import contextvars
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+# Marker the ReAct prompt puts before an agent's answer; tokens before it are reasoning
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+class ResponseStream:
+    """
+    Thread-safe channel from a running crew to the UI.
+
+    The crew thread emits progress messages, LLM tokens tagged with the
+    stage (agent role) that produced them, and finally the complete result
+    or an error. The UI thread consumes them with final_texts().
+    """
+
+    def __init__(self, final_stage: Optional[str] = None):
+        self.final_stage = final_stage
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self._events: "queue.Queue[tuple]" = queue.Queue()
+
+    def emit_progress(self, message: str) -> None:
+        self._events.put(("progress", None, message))
+
+    def emit_token(self, stage: Optional[str], token: str) -> None:
+        self._events.put(("token", stage, token))
+
+    def emit_restart(self, stage: Optional[str]) -> None:
+        """Signal that the stage's current LLM call is starting over after a failed attempt."""
+        self._events.put(("restart", stage, None))
+
+    def finish(self, result: str) -> None:
+        self.result = result
+        self._events.put(("done", None, result))
+
+    def fail(self, error: BaseException) -> None:
+        self.error = error
+        self._events.put(("error", None, error))
+
+    def final_texts(self, on_progress: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+        """
+        Yield the final stage's answer as it grows, each time as the whole text so far.
+
+        The UI renders every value in place of the previous one. Reasoning
+        tokens the final agent produces before its "Final Answer:" marker
+        are held back. Progress messages are passed to on_progress.
+
+        When a call of the final stage is retried, held-back tokens are
+        dropped and the retried answer replaces the partial one once it
+        starts, so the answer is never shown twice. The last value is always
+        the complete result, which also covers runs that streamed nothing
+        (for example a cached response).
+
+        Raises:
+            The crew's exception if the run failed
+        """
+        text = ""
+        buffer = ""
+        answering = False
+
+        while True:
+            kind, stage, payload = self._events.get()
+            if kind == "progress":
+                if on_progress:
+                    on_progress(payload)
+            elif kind == "restart":
+                if stage != self.final_stage:
+                    continue
+                buffer = ""
+                answering = False
+            elif kind == "token":
+                if stage != self.final_stage:
+                    continue
+                if answering:
+                    text += payload
+                    yield text
+                    continue
+                buffer += payload
+                if FINAL_ANSWER_MARKER in buffer:
+                    answering = True
+                    text = buffer.split(FINAL_ANSWER_MARKER, 1)[1].lstrip()
+                    if text:
+                        yield text
+            elif kind == "done":
+                if text != payload:
+                    yield payload
+                return
+            elif kind == "error":
+                raise payload
+
+_current_stream: contextvars.ContextVar[Optional[ResponseStream]] = contextvars.ContextVar("current_stream", default=None)
+_current_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_stage", default=None)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Attribute LLM tokens produced inside the block to the named stage."""
+    token = _current_stage.set(name)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+def set_stage(name: str) -> None:
+    """Switch the stage inside a stage() block, for steps that run where no block can be opened around them."""
+    _current_stage.set(name)
+
+def restart_stage() -> None:
+    """Tell the active stream, if any, that the current stage's LLM call is being retried."""
+    stream = _current_stream.get()
+    if stream is not None:
+        stream.emit_restart(_current_stage.get())
+
+def emit_progress(message: str) -> None:
+    """Send a progress message to the active stream, if any."""
+    stream = _current_stream.get()
+    if stream is not None:
+        stream.emit_progress(message)
+
+_llm_stream_forwarding = False
+_llm_stream_forwarding_lock = threading.Lock()
+
+def forward_llm_stream_events() -> None:
+    """
+    Forward tokens from crewAI's streaming LLM calls to the active ResponseStream.
+
+    crewAI emits each chunk as an LLMStreamChunkEvent on its event bus. The
+    handlers run on the thread making the call, so the stream and stage
+    context variables of the running crew are visible. Safe to call more
+    than once; the handler is registered a single time.
+    """
+    global _llm_stream_forwarding
+    with _llm_stream_forwarding_lock:
+        if _llm_stream_forwarding:
+            return
+        from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+
+        def on_chunk(source: Any, event: LLMStreamChunkEvent) -> None:
+            stream = _current_stream.get()
+            if stream is not None:
+                stream.emit_token(_current_stage.get(), event.chunk)
+
+        crewai_event_bus.register_handler(LLMStreamChunkEvent, on_chunk)
+        _llm_stream_forwarding = True
+
+def run_streaming(stream: ResponseStream, target: Callable[..., str], *args: Any) -> threading.Thread:
+    """
+    Run target(*args) on a background thread with stream as the active stream.
+
+    The thread finishes the stream with target's result, or fails it with
+    the raised exception.
+    """
+    def run() -> None:
+        _current_stream.set(stream)
+        try:
+            stream.finish(str(target(*args)))
+        except BaseException as e:
+            stream.fail(e)
+
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(run,), daemon=True, name="crew-stream")
+    thread.start()
+    return thread
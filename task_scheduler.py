@@ -0,0 +1,166 @@
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from config import OLLAMA_MAX_PARALLEL_REQUESTS
+from streaming import stage
+from tracing import payload_size, span
+
+if TYPE_CHECKING:
+    # Only for annotations; the scheduler works with anything shaped like crewAI tasks
+    from crewai import Crew, Task
+
+# Separator between dependency outputs handed to a task as context
+CONTEXT_SEPARATOR = "\n\n----------\n\n"
+
+TaskCallback = Callable[["Task", Optional[str]], None]
+
+class TaskGraphScheduler:
+    """
+    Runs a crew's tasks as a dependency graph instead of a fixed sequence.
+
+    A task's dependencies are the tasks in its crewAI `context` list (filled
+    from the dependency lists built in tasks.py). A task is started as soon
+    as every task it depends on has finished, and independent tasks run
+    concurrently, up to max_concurrency at a time so the Ollama server is
+    not asked for more generations than it can serve.
+
+    Each task gets the tools Crew.kickoff would give it, including the
+    delegation tools of agents with allow_delegation. If a task fails, tasks
+    not yet started are cancelled and the error is raised without waiting
+    for the tasks still running.
+    """
+
+    def __init__(self, max_concurrency: int = OLLAMA_MAX_PARALLEL_REQUESTS):
+        self.max_concurrency = max(max_concurrency, 1)
+
+    @staticmethod
+    def tools_for(task: "Task", crew: Optional["Crew"]) -> List[Any]:
+        """Return the tools the task runs with, prepared the way Crew.kickoff prepares them."""
+        agent = task.agent
+        tools = list(task.tools or (agent.tools if agent else None) or [])
+        if crew is None or agent is None:
+            return tools
+        prepare = getattr(crew, "_prepare_tools", None)
+        if prepare is not None:
+            # Adds delegation, code execution and multimodal tools as the crew's own kickoff does
+            return prepare(agent, task, tools)
+        if agent.allow_delegation:
+            tools.extend(agent.get_delegation_tools([member for member in crew.agents if member is not agent]))
+        return tools
+
+    @staticmethod
+    def _execute(task: "Task", context: Optional[str], tools: List[Any]) -> Any:
+        # Tag LLM tokens with the agent running this task so streams can tell stages apart
+        role = task.agent.role if task.agent else "unknown"
+        with stage(role), span(f"task: {role}", "task", context_chars=len(context or "")) as current:
+            output = task.execute_sync(task.agent, context, tools)
+            current.set(**payload_size(getattr(output, "raw", None) or ""))
+            return output
+
+    @staticmethod
+    def dependencies(task: "Task") -> List["Task"]:
+        return list(task.context or [])
+
+    def run(
+        self,
+        tasks: List["Task"],
+        crew: Optional["Crew"] = None,
+        on_task_start: Optional[TaskCallback] = None,
+        on_task_complete: Optional[TaskCallback] = None
+    ) -> Dict[int, Any]:
+        """
+        Execute every task, respecting dependencies.
+
+        Args:
+            tasks: Tasks to run; dependencies must be in this list
+            crew: Crew the agents belong to, attached to each agent before it runs and
+                used to prepare each task's tools
+            on_task_start: Called with (task, None) when a task starts
+            on_task_complete: Called with (task, raw output) when a task finishes
+
+        Returns:
+            Mapping of task position in tasks to its TaskOutput
+        """
+        positions = {id(task): position for position, task in enumerate(tasks)}
+        waiting_on: Dict[int, set] = {}
+        dependents: Dict[int, List[int]] = {position: [] for position in range(len(tasks))}
+
+        for position, task in enumerate(tasks):
+            required = set()
+            for dependency in self.dependencies(task):
+                if id(dependency) not in positions:
+                    raise ValueError(f"Task {position} depends on a task that is not part of the graph")
+                required.add(positions[id(dependency)])
+                dependents[positions[id(dependency)]].append(position)
+            waiting_on[position] = required
+
+        if crew is not None:
+            for agent in crew.agents:
+                agent.crew = crew
+
+        outputs: Dict[int, Any] = {}
+        running: Dict[Future, int] = {}
+        # Tasks whose dependencies are done, started in order as worker slots free up
+        ready = deque(position for position in range(len(tasks)) if not waiting_on[position])
+        queued = set(ready)
+
+        if not ready and tasks:
+            raise ValueError("Task graph has no task without dependencies")
+
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="crew-task")
+
+        def start_ready() -> None:
+            while ready and len(running) < self.max_concurrency:
+                position = ready.popleft()
+                task = tasks[position]
+                context = CONTEXT_SEPARATOR.join(
+                    outputs[dependency].raw for dependency in sorted(waiting_on[position])
+                )
+                if on_task_start:
+                    on_task_start(task, None)
+                # Copy the caller's context vars (active stream, tracing) into the worker thread
+                future = pool.submit(
+                    contextvars.copy_context().run, self._execute, task, context or None, self.tools_for(task, crew)
+                )
+                running[future] = position
+
+        try:
+            start_ready()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    position = running.pop(future)
+                    outputs[position] = future.result()
+
+                    if on_task_complete:
+                        on_task_complete(tasks[position], outputs[position].raw)
+
+                    for dependent in dependents[position]:
+                        if dependent not in queued and all(required in outputs for required in waiting_on[dependent]):
+                            queued.add(dependent)
+                            ready.append(dependent)
+                start_ready()
+        except BaseException:
+            # Ready tasks are never started; return at once while running tasks finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+        if len(outputs) != len(tasks):
+            raise ValueError("Task graph contains a dependency cycle")
+        return outputs
+
+def run_task_graph(
+    crew: "Crew",
+    on_task_start: Optional[TaskCallback] = None,
+    on_task_complete: Optional[TaskCallback] = None
+) -> str:
+    """
+    Run the crew's current tasks with the dependency-aware scheduler.
+
+    Returns:
+        Raw output of the last task in crew.tasks
+    """
+    outputs = TaskGraphScheduler().run(crew.tasks, crew, on_task_start, on_task_complete)
+    return outputs[len(crew.tasks) - 1].raw
@@ -34,14 +34,7 @@ def create_analyze_market_conditions_task(agent, user_query: str, project: str)
         - Regulatory and compliance considerations
         - Technology evolution risks
         """,
-        context=[
-            {
-                "role": "user", 
-                "content": context,
-                "description": "User query context", 
-                "expected_output": "Analysis of market conditions affecting project risks"
-            }
-        ]
+        context=[]
     )
 
 # Project Status Tracking Task
@@ -76,14 +69,7 @@ def create_assess_project_status_task(agent, user_query: str, project: str) -> T
         - Quality and deliverable risks
         - Team and communication risks
         """,
-        context=[
-            {
-                "role": "user", 
-                "content": context,
-                "description": "User query context about project status", 
-                "expected_output": "Assessment of internal project risks"
-            }
-        ]
+        context=[]
     )
 
 # Risk Scoring Task
@@ -116,15 +102,7 @@ def create_score_project_risks_task(agent, user_query: str, project: str, depend
         - Risk categorization by type and urgency
         - Controllability assessment for each risk
         """,
-        context=[
-            {
-                "role": "user", 
-                "content": context,
-                "description": "User query context about risk prioritization", 
-                "expected_output": "Quantitative risk assessment with priorities"
-            }
-        ],
-        dependencies=dependencies
+        context=dependencies
     )
 
 # Risk Assessment Task
@@ -158,15 +136,7 @@ def create_generate_risk_assessment_task(agent, user_query: str, project: str, d
         - Contingency plans for unavoidable risks
         - Overall project risk level assessment
         """,
-        context=[
-            {
-                "role": "user", 
-                "content": context,
-                "description": "User query context for risk assessment", 
-                "expected_output": "Comprehensive risk assessment with mitigation strategies"
-            }
-        ],
-        dependencies=dependencies
+        context=dependencies
     )
 
 # Reporting Task
@@ -200,13 +170,5 @@ def create_generate_risk_report_task(agent, user_query: str, project: str, depen
         - Offer clear recommendations for action
         - Be conversational yet informative in tone
         """,
-        context=[
-            {
-                "role": "user", 
-                "content": context,
-                "description": "User query about project risks that needs a response", 
-                "expected_output": "Comprehensive and conversational risk assessment report"
-            }
-        ],
-        dependencies=dependencies
+        context=dependencies
     )
@@ -0,0 +1,138 @@
+import copy
+import json
+import threading
+import time
+
+import pytest
+
+import data_handlers
+from cache import TTLCache, freeze
+from risk_store import RiskRepository, set_risk_repository
+
+
+class BlockingBuild:
+    """A cache factory that counts its calls and waits until released."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return self.value
+
+
+def run_in_thread(function, results, *args):
+    thread = threading.Thread(target=lambda: results.append(function(*args)))
+    thread.start()
+    return thread
+
+
+def test_concurrent_misses_share_one_build():
+    cache = TTLCache(ttl=60)
+    build = BlockingBuild("data")
+    results = []
+
+    threads = [run_in_thread(cache.get_or_set, results, "key", build) for _ in range(8)]
+    assert build.started.wait(5)
+    time.sleep(0.05)
+    build.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert build.calls == 1
+    assert results == ["data"] * 8
+    assert cache.get("key") == "data"
+
+
+def test_build_of_invalidated_key_is_not_stored():
+    cache = TTLCache(ttl=60)
+    build = BlockingBuild("stale")
+    results = []
+
+    thread = run_in_thread(cache.get_or_set, results, "key", build)
+    assert build.started.wait(5)
+    cache.invalidate("key")
+    build.release.set()
+    thread.join()
+
+    # The caller still gets its result, but the next caller builds again
+    assert results == ["stale"]
+    assert cache.get("key") is None
+    assert cache.get_or_set("key", lambda: "fresh") == "fresh"
+
+
+def test_invalidating_another_key_keeps_the_build():
+    cache = TTLCache(ttl=60)
+    cache.set("other", 1)
+    build = BlockingBuild("data")
+    results = []
+
+    thread = run_in_thread(cache.get_or_set, results, "key", build)
+    assert build.started.wait(5)
+    cache.invalidate("other")
+    build.release.set()
+    thread.join()
+
+    assert cache.get("key") == "data"
+    assert cache.get("other") is None
+
+
+def test_invalidate_matching_covers_builds_in_progress():
+    cache = TTLCache(ttl=60)
+    cache.set(("Cloud Migration", 7), "cached")
+    cache.set(("ERP Implementation", 7), "kept")
+    build = BlockingBuild("building")
+    results = []
+
+    thread = run_in_thread(cache.get_or_set, results, ("Cloud Migration", 30), build)
+    assert build.started.wait(5)
+    cache.invalidate_matching(lambda key: key[0] == "Cloud Migration")
+    build.release.set()
+    thread.join()
+
+    assert cache.keys() == [("ERP Implementation", 7)]
+
+
+def test_frozen_values_are_shared_read_only():
+    data = freeze({"trend_data": [{"date": "2026-10-01", "risk_score": 42.0}], "key_metrics": {"resource_count": 5}})
+
+    with pytest.raises(TypeError):
+        data["status"] = "On Track"
+    with pytest.raises(TypeError):
+        data["trend_data"].append({})
+    with pytest.raises(TypeError):
+        data["key_metrics"].update(resource_count=6)
+
+    assert json.loads(json.dumps(data)) == data
+    copied = copy.deepcopy(data)
+    copied["trend_data"].append({})
+    assert len(data["trend_data"]) == 1
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = RiskRepository(str(tmp_path / "risks.db"))
+    previous = set_risk_repository(repository)
+    data_handlers.invalidate_project_data_cache()
+    yield repository
+    set_risk_repository(previous)
+    data_handlers.invalidate_project_data_cache()
+    repository.close()
+
+
+def test_store_writes_invalidate_cached_project_data(repository):
+    project = "Cloud Migration"
+    first = data_handlers.get_project_data(project, 30)
+    assert data_handlers.get_project_data(project, 30) is first
+
+    risk = dict(first["risks"][0].to_dict(), id="NEW-RISK", title="Freshly identified risk")
+    repository.insert_risks([risk])
+
+    refreshed = data_handlers.get_project_data(project, 30)
+    assert refreshed is not first
+    assert "NEW-RISK" in {row["id"] for row in refreshed["risks"]}
@@ -0,0 +1,90 @@
+import os
+import threading
+
+from chat_store import WELCOME_MESSAGE, ChatStore, _safe_id
+
+
+def message(i: int):
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+
+
+def line_count(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def test_new_chat_starts_with_welcome_message(tmp_path):
+    store = ChatStore(str(tmp_path), window=5)
+    assert store.load("new-chat") == [WELCOME_MESSAGE]
+
+
+def test_append_keeps_order_and_loads_last_window(tmp_path):
+    store = ChatStore(str(tmp_path), window=5, compact_factor=100)
+    for i in range(8):
+        store.append("chat", message(i))
+
+    assert store.load("chat") == [message(i) for i in range(3, 8)]
+    assert line_count(store.path("chat")) == 8
+
+
+def test_concurrent_appends_are_not_interleaved(tmp_path):
+    store = ChatStore(str(tmp_path), window=1_000, compact_factor=100)
+    threads = [
+        threading.Thread(target=lambda t=t: [store.append("chat", message(t * 100 + i)) for i in range(50)])
+        for t in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loaded = store.load("chat")
+    assert len(loaded) == 200
+    assert sorted(m["content"] for m in loaded) == sorted(f"message {t * 100 + i}" for t in range(4) for i in range(50))
+
+
+def test_append_after_torn_line_stays_readable(tmp_path):
+    store = ChatStore(str(tmp_path), window=5, compact_factor=100)
+    store.append("chat", message(0))
+    with open(store.path("chat"), "ab") as f:
+        f.write(b'{"role": "user", "cont')
+
+    # A fresh store, as after a restart
+    store = ChatStore(str(tmp_path), window=5, compact_factor=100)
+    store.append("chat", message(1))
+    assert store.load("chat") == [message(0), message(1)]
+
+
+def test_compaction_keeps_last_window(tmp_path):
+    store = ChatStore(str(tmp_path), window=4, compact_factor=2)
+    for i in range(8):
+        store.append("chat", message(i))
+    store.flush()
+
+    assert line_count(store.path("chat")) == 4
+    assert store.load("chat") == [message(i) for i in range(4, 8)]
+
+    # Appends after compaction continue the log
+    store.append("chat", message(8))
+    assert store.load("chat") == [message(i) for i in range(5, 9)]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_distinct_ids_use_distinct_files(tmp_path):
+    store = ChatStore(str(tmp_path), window=5)
+    store.append("a b", message(0))
+    store.append("a_b", message(1))
+    store.append("../a", message(2))
+
+    assert store.load("a b") == [message(0)]
+    assert store.load("a_b") == [message(1)]
+    assert store.load("../a") == [message(2)]
+    assert os.path.dirname(store.path("../a")) == str(tmp_path)
+    # Ids of safe characters keep the file names they had before the encoding
+    assert _safe_id("3f2a9c0e4b7d") == "3f2a9c0e4b7d"
+
+
+def test_long_ids_are_hashed(tmp_path):
+    first, second = "x" * 300 + "1", "x" * 300 + "2"
+    assert _safe_id(first) != _safe_id(second)
+    assert len(_safe_id(first)) <= 128
@@ -0,0 +1,137 @@
+import math
+import statistics
+import time
+
+import pytest
+
+import data_handlers
+from lexical_search import BM25Index, risk_terms, tokenize
+from risk_store import RiskRepository, set_risk_repository
+from workload import generate_risk_frame, project_names
+
+PROJECTS = project_names(5)
+
+
+def reference_scores(risks, query, k1=1.5, b=0.75):
+    """Okapi BM25 computed directly from the risks, for checking the index."""
+    documents = {risk["id"]: risk_terms(risk) for risk in risks}
+    average_length = sum(sum(terms.values()) for terms in documents.values()) / len(documents)
+    scores = {}
+    for term in set(tokenize(query)):
+        matches = [risk_id for risk_id, terms in documents.items() if term in terms]
+        if not matches:
+            continue
+        idf = math.log(1 + (len(documents) - len(matches) + 0.5) / (len(matches) + 0.5))
+        for risk_id in matches:
+            frequency = documents[risk_id][term]
+            norm = k1 * (1 - b + b * sum(documents[risk_id].values()) / average_length)
+            scores[risk_id] = scores.get(risk_id, 0.0) + idf * frequency * (k1 + 1) / (frequency + norm)
+    return scores
+
+
+def make_index(risks):
+    by_id = {risk["id"]: risk for risk in risks}
+    index = BM25Index(lambda risk_ids: [by_id[risk_id] for risk_id in risk_ids if risk_id in by_id])
+    index.add_many(risks)
+    return index, by_id
+
+
+@pytest.fixture(scope="module")
+def risks():
+    return generate_risk_frame(3_000, PROJECTS, seed=7).to_dict("records")
+
+
+@pytest.mark.parametrize("query, filters", [
+    ("security vendor delay", {}),
+    ("budget overrun", {"project": PROJECTS[1]}),
+    ("schedule delay", {"level": "High"}),
+    ("technical debt quality", {"category": "Quality", "project": "All Projects"})
+])
+def test_search_matches_reference_ranking(risks, query, filters):
+    index, _ = make_index(risks)
+    results = index.search(query, limit=10, **filters)
+
+    allowed = {
+        risk["id"] for risk in risks
+        if all(risk[field] == value for field, value in filters.items() if value != "All Projects")
+    }
+    expected = sorted((score for risk_id, score in reference_scores(risks, query).items() if risk_id in allowed), reverse=True)[:10]
+    assert [score for _, score in results] == pytest.approx(expected, rel=1e-5)
+    reference = reference_scores(risks, query)
+    for risk, score in results:
+        assert risk["id"] in allowed
+        assert score == pytest.approx(reference[risk["id"]], rel=1e-5)
+
+
+def test_replace_and_remove_update_postings(risks):
+    index, by_id = make_index(risks[:100])
+    risk = dict(risks[0], title="Quantum entanglement outage", description="")
+    by_id[risk["id"]] = risk
+    index.add(risk)
+
+    assert len(index) == 100
+    assert [found["id"] for found, _ in index.search("quantum")] == [risk["id"]]
+
+    index.remove(risk["id"])
+    assert risk["id"] not in index
+    assert index.search("quantum") == []
+    # A freed slot is reused by the next new risk
+    index.add(dict(risk, id="NEW-1"))
+    by_id["NEW-1"] = dict(risk, id="NEW-1")
+    assert [found["id"] for found, _ in index.search("quantum")] == ["NEW-1"]
+
+
+def test_search_drops_risks_missing_from_store(risks):
+    index, by_id = make_index(risks[:50])
+    top_id, _ = index.top_ids("budget", limit=1)[0]
+    del by_id[top_id]
+    assert top_id not in [risk["id"] for risk, _ in index.search("budget", limit=5)]
+
+
+def test_index_follows_the_active_risk_store(tmp_path, risks):
+    first, second = RiskRepository(str(tmp_path / "first.db")), RiskRepository(str(tmp_path / "second.db"))
+    first.insert_risks(risks[:3])
+    second.insert_risks(risks[3:5])
+    previous = set_risk_repository(first)
+    data_handlers.reset_lexical_index()
+    try:
+        index = data_handlers.get_lexical_index()
+        assert len(index) == 3
+
+        set_risk_repository(second)
+        rebuilt = data_handlers.get_lexical_index()
+        assert rebuilt is not index and len(rebuilt) == 2
+        # The old index no longer follows writes to the store it was built from
+        first.insert_risks(risks[5:6])
+        assert len(index) == 3
+
+        data_handlers.reset_lexical_index()
+        second.insert_risks(risks[6:7])
+        assert len(rebuilt) == 2
+    finally:
+        set_risk_repository(previous)
+        data_handlers.reset_lexical_index()
+        first.close()
+        second.close()
+
+
+def test_search_latency_on_100k_risks():
+    risks = generate_risk_frame(100_000, project_names(20), seed=1).to_dict("records")
+    index, _ = make_index(risks)
+    queries = [
+        ("security vendor delay", {}),
+        ("budget overrun", {}),
+        ("data security breach", {"project": PROJECTS[0]}),
+        ("schedule", {"level": "High"}),
+        ("strategy", {})
+    ]
+    timings = []
+    for query, filters in queries:
+        # The first query of a term after a write computes the term's scores
+        index.search(query, 10, **filters)
+        for _ in range(20):
+            started = time.perf_counter()
+            index.search(query, 10, **filters)
+            timings.append(time.perf_counter() - started)
+
+    assert statistics.median(timings) < 0.001
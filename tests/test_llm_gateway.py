@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import pytest
+import requests
+
+from llm_gateway import LLMDeadlineExceeded, LLMGateway
+
+
+class StubOllamaServer:
+    """Local HTTP server answering Ollama's /api/chat, with scripted failures and latency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        # Statuses returned by the next requests before answering normally
+        self.failures: List[int] = []
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/chat"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    status = stub.failures.pop(0) if stub.failures else 200
+                try:
+                    time.sleep(stub.delay)
+                    body = {"error": "server busy"} if status != 200 else {
+                        "model": "llama3",
+                        "message": {"role": "assistant", "content": "ok"},
+                        "done": True
+                    }
+                    payload = json.dumps(body).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "StubOllamaServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def chat(url: str):
+    """Return a request function for the gateway, as crewAI's LLM would make."""
+    def request() -> str:
+        response = requests.post(url, json={"model": "llama3", "messages": [{"role": "user", "content": "hi"}]}, timeout=5)
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+    return request
+
+
+def test_gateway_limits_concurrent_requests():
+    gateway = LLMGateway(max_in_flight=2, max_retries=0)
+    results = []
+
+    with StubOllamaServer(delay=0.05) as server:
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(gateway.call(chat(server.url), session_id=f"s{i % 3}")))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == ["ok"] * 8
+    assert server.requests == 8
+    assert server.max_in_flight == 2
+    assert gateway.stats()["in_flight"] == 0
+
+
+def test_gateway_retries_transient_errors_with_backoff():
+    delays = []
+    gateway = LLMGateway(max_in_flight=1, max_retries=3, backoff=0.2, backoff_max=1.0, sleep=delays.append)
+
+    with StubOllamaServer() as server:
+        server.failures = [503, 503]
+        assert gateway.call(chat(server.url)) == "ok"
+
+    assert server.requests == 3
+    assert gateway.retries == 2
+    # Exponential backoff with jitter between half and the full delay
+    assert 0.1 <= delays[0] <= 0.2
+    assert 0.2 <= delays[1] <= 0.4
+
+
+def test_gateway_does_not_retry_permanent_errors():
+    delays = []
+    gateway = LLMGateway(max_in_flight=1, max_retries=3, sleep=delays.append)
+
+    with StubOllamaServer() as server:
+        server.failures = [404]
+        with pytest.raises(requests.HTTPError):
+            gateway.call(chat(server.url))
+
+    assert server.requests == 1
+    assert delays == []
+    assert gateway.failures == 1
+
+
+def test_gateway_gives_up_when_retry_would_pass_deadline():
+    gateway = LLMGateway(max_in_flight=1, max_retries=5, backoff=10.0, backoff_max=10.0, sleep=lambda seconds: None)
+
+    with StubOllamaServer() as server:
+        server.failures = [503]
+        with pytest.raises(LLMDeadlineExceeded):
+            gateway.call(chat(server.url), deadline=time.monotonic() + 1.0)
+
+    assert server.requests == 1
+    assert gateway.deadline_exceeded == 1
+
+
+def test_gateway_deadline_expires_while_queued():
+    gateway = LLMGateway(max_in_flight=1, max_retries=0)
+
+    with StubOllamaServer(delay=0.5) as server:
+        holder = threading.Thread(target=gateway.call, args=(chat(server.url),), kwargs={"session_id": "a"})
+        holder.start()
+        while gateway.stats()["in_flight"] == 0:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        with pytest.raises(LLMDeadlineExceeded):
+            gateway.call(chat(server.url), session_id="b", deadline=started + 0.1)
+        waited = time.monotonic() - started
+        holder.join()
+
+    assert 0.1 <= waited < 0.4
+    assert server.requests == 1
+    assert gateway.stats()["queue_depth"] == 0
@@ -0,0 +1,28 @@
+import os
+
+from local_vector_index import LocalVectorIndex
+
+
+def upsert(index, ids):
+    index.upsert(
+        ids=ids,
+        vectors=[[1.0, float(i)] for i, _ in enumerate(ids)],
+        metadatas=[{"project": "Cloud Migration"} for _ in ids],
+        documents=[f"doc {record_id}" for record_id in ids]
+    )
+
+
+def test_missing_arrays_start_the_sidecar_over(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    upsert(index, ["A", "B", "C"])
+    index.close()
+    for name in ("vectors.npy", "attributes.npy"):
+        os.remove(tmp_path / name)
+
+    reopened = LocalVectorIndex(str(tmp_path))
+    assert len(reopened) == 0
+    upsert(reopened, ["C", "D"])
+
+    assert len(reopened) == 2
+    assert reopened.count() == 2
+    assert sorted(hit["id"] for hit in reopened.query([1.0, 0.0], top_k=5)) == ["C", "D"]
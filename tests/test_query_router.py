@@ -0,0 +1,142 @@
+import pytest
+
+import query_router
+from query_router import answer_directly, classify
+
+
+def test_top_risks_keeps_category():
+    routed = classify("What are the main risks to the schedule?", "All Projects")
+    assert routed.intent == "top_risks"
+    assert routed.params["category"] == "Schedule"
+
+
+def test_top_risks_keeps_level_and_category():
+    routed = classify("What critical security risks do we have", "Cloud Migration")
+    assert routed.intent == "top_risks"
+    assert routed.params["project"] == "Cloud Migration"
+    assert routed.params["level"] == "High"
+    assert routed.params["category"] == "Security"
+
+
+@pytest.mark.parametrize("query, limit", [
+    ("top 5 risks", 5),
+    ("show the top five risks", 5),
+    ("list the 10 biggest risks", 10),
+    ("top risks", 3)
+])
+def test_top_risks_keeps_requested_count(query, limit):
+    routed = classify(query, "All Projects")
+    assert routed.intent == "top_risks"
+    assert routed.params["limit"] == limit
+
+
+def test_count_keeps_status_and_window():
+    routed = classify("How many open risks were identified in the last 2 weeks?", "All Projects")
+    assert routed.intent == "count"
+    assert routed.params["status"] == "Active"
+    assert routed.params["days_back"] == 14
+
+
+@pytest.mark.parametrize("query", [
+    # The register does not record when a risk was closed
+    "How many risks were closed last month",
+    # Counts projects, not risks
+    "How many projects are at risk?",
+    # Dates other than a trailing window
+    "top risks since January",
+    "Compare security risks between Cloud Migration and ERP Implementation"
+])
+def test_unsupported_constraints_go_to_the_crew(query):
+    assert classify(query, "All Projects") is None
+
+
+@pytest.mark.parametrize("query", [
+    "How many risks does the project called Foo have?",
+    "top 5 risks for project 'Apollo'",
+    "What are the main risks for the Apollo Rollout project?"
+])
+def test_unknown_named_project_goes_to_the_crew(query):
+    assert classify(query, "Cloud Migration") is None
+
+
+def test_known_named_project_is_routed():
+    routed = classify("How many risks does the project called Cloud Migration have?", "All Projects")
+    assert routed.intent == "count"
+    assert routed.params["project"] == "Cloud Migration"
+
+
+class StubTool:
+    """Stands in for a tool, returning canned collect() results and recording the calls."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def collect(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return self.result
+
+
+def risk(title, level, category="Security", score=80):
+    return {"title": title, "level": level, "category": category, "score": score, "status": "Active"}
+
+
+@pytest.fixture
+def stub_tools(monkeypatch):
+    tools = {}
+    monkeypatch.setattr(query_router, "_tools", tools)
+    return tools
+
+
+def test_answer_ranks_all_levels_for_a_category(stub_tools):
+    stub_tools["RiskAnalysisTool"] = StubTool({
+        "project": "Cloud Migration",
+        "total_risks": 2,
+        "high_priority_risks": 0,
+        "medium_priority_risks": 1,
+        "low_priority_risks": 1,
+        "top_risks": [risk("Weak IAM policies", "Medium", score=55), risk("Stale TLS certificates", "Low", score=20)],
+        "top_risks_level": None
+    })
+    answer = answer_directly("top 5 security risks for Cloud Migration", "All Projects")
+
+    assert answer.startswith("Top 2 Security risks for **Cloud Migration**")
+    assert "Weak IAM policies" in answer and "Stale TLS certificates" in answer
+    assert "high-level" not in answer
+    _, kwargs = stub_tools["RiskAnalysisTool"].calls[0]
+    assert kwargs["category"] == "Security" and kwargs["level"] is None and kwargs["top_k"] == 5
+
+
+def test_answer_names_high_level_ranking(stub_tools):
+    stub_tools["RiskAnalysisTool"] = StubTool({
+        "project": "All Projects",
+        "total_risks": 4,
+        "high_priority_risks": 1,
+        "medium_priority_risks": 2,
+        "low_priority_risks": 1,
+        "top_risks": [risk("Data loss during cutover", "High")],
+        "top_risks_level": "High"
+    })
+    answer = answer_directly("top risks", "All Projects")
+    assert answer.startswith("Top 1 high-level risk for **All Projects**")
+
+
+def test_answer_mitigation_for_several_levels(stub_tools):
+    stub_tools["MitigationStrategiesTool"] = StubTool({
+        "project": "Cloud Migration",
+        "risk_count": 2,
+        "strategies": [
+            {"risk_title": "Data loss during cutover", "risk_level": "High", "mitigation_strategies": ["Rehearse the cutover"]},
+            {"risk_title": "Stale TLS certificates", "risk_level": "Low", "mitigation_strategies": ["Automate renewal"]}
+        ]
+    })
+    answer = answer_directly("mitigations for high and low risks", "Cloud Migration")
+
+    assert answer.startswith("Mitigation strategies for Low or High risks in **Cloud Migration**")
+    assert "- Rehearse the cutover" in answer and "- Automate renewal" in answer
+
+
+def test_answer_unknown_named_project_calls_no_tool(stub_tools):
+    stub_tools["RiskAnalysisTool"] = StubTool({})
+    assert answer_directly("How many risks does the project called Foo have?", "Cloud Migration") is None
+    assert stub_tools["RiskAnalysisTool"].calls == []
@@ -0,0 +1,30 @@
+import sqlite3
+
+from response_cache import ResponseCache
+
+
+def embed(text: str):
+    return [1.0, 0.0, 0.0] if "risk" in text else [0.0, 1.0, 0.0]
+
+
+def test_near_duplicate_query_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"), embed_query=embed, similarity_threshold=0.9)
+    cache.put("What are the top risks?", "Cloud Migration", "1", "Three high risks.")
+
+    assert cache.get("Which risks matter most", "Cloud Migration", "1") == "Three high risks."
+    assert cache.get("How is the budget", "Cloud Migration", "1") is None
+    assert cache.get("Which risks matter most", "Cloud Migration", "2") is None
+
+
+def test_expiry_is_committed_on_semantic_lookups(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(path, ttl=60, embed_query=embed)
+    cache.put("What are the top risks?", "Cloud Migration", "1", "Three high risks.")
+    cache.put("Old question", "Cloud Migration", "1", "Stale.")
+    cache._connection.execute("UPDATE responses SET created_at = 0 WHERE query = 'old question'")
+    cache._connection.commit()
+
+    assert cache.get("How is the budget", "Cloud Migration", "1") is None
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT query FROM responses").fetchall() == [("what are the top risks",)]
@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+from risk_store import RiskRepository
+from workload import generate_risk_frame, load_risk_repository, project_names
+
+PROJECTS = project_names(3)
+
+
+def make_risk(risk_id: str, **fields):
+    risk = {
+        "id": risk_id,
+        "project": PROJECTS[0],
+        "title": f"Risk {risk_id}",
+        "description": "",
+        "category": "Technical",
+        "level": "High",
+        "score": 80,
+        "probability": 4,
+        "impact": 5,
+        "date_identified": "2026-10-01",
+        "status": "Active",
+        "mitigation_strategies": []
+    }
+    risk.update(fields)
+    return risk
+
+
+def grouped_from_risks(db_path: str):
+    """The rollup rows recomputed with a GROUP BY over the risks table."""
+    with sqlite3.connect(db_path) as connection:
+        rollup = connection.execute(
+            "SELECT project, substr(date_identified, 1, 10), category, level, status, COUNT(*), SUM(score) "
+            "FROM risks GROUP BY 1, 2, 3, 4, 5"
+        ).fetchall()
+        daily = connection.execute(
+            "SELECT project, substr(date_identified, 1, 10), COUNT(*), SUM(score) FROM risks GROUP BY 1, 2"
+        ).fetchall()
+    return sorted(rollup), sorted(daily)
+
+
+def materialized(db_path: str):
+    """The rollup rows maintained by the triggers."""
+    with sqlite3.connect(db_path) as connection:
+        rollup = connection.execute(
+            "SELECT project, date_identified, category, level, status, count, score_sum FROM risk_rollup"
+        ).fetchall()
+        daily = connection.execute("SELECT project, date_identified, count, score_sum FROM project_daily_score").fetchall()
+    return sorted(rollup), sorted(daily)
+
+
+def assert_rollups_match(repository: RiskRepository):
+    assert materialized(repository.db_path) == grouped_from_risks(repository.db_path)
+    # count_by groups on the full date_identified, so days are only checked in the tables above
+    for columns in (["level"], ["category", "status"], ["project", "category", "level", "status"]):
+        expected = {tuple(row[column] for column in columns): row["count"] for row in repository.count_by(columns)}
+        actual = {tuple(row[column] for column in columns): row["count"] for row in repository.rollup_counts(columns)}
+        assert actual == expected
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = RiskRepository(str(tmp_path / "risks.db"))
+    yield repository
+    repository.close()
+
+
+def test_insert_updates_rollups(repository):
+    repository.insert_risks([
+        make_risk("r1"),
+        make_risk("r2", category="Budget", level="Medium", score=50),
+        make_risk("r3", project=PROJECTS[1], date_identified="2026-10-02T09:30:00")
+    ])
+    assert_rollups_match(repository)
+    assert repository.rollup_counts([])[0]["count"] == 3
+
+
+def test_replace_moves_risk_between_groups(repository):
+    repository.insert_risks([make_risk("r1"), make_risk("r2")])
+    # Same id, every grouped column and the score changed
+    repository.insert_risks([make_risk(
+        "r1", project=PROJECTS[2], category="Scope", level="Low", score=20,
+        date_identified="2026-09-15", status="Monitoring"
+    )])
+    assert_rollups_match(repository)
+    assert repository.rollup_counts([])[0]["count"] == 2
+
+
+def test_status_change_updates_rollups(repository):
+    repository.insert_risks([make_risk("r1"), make_risk("r2")])
+    assert repository.update_status("r1", "Closed")
+    assert_rollups_match(repository)
+    statuses = {row["status"]: row["count"] for row in repository.rollup_counts(["status"])}
+    assert statuses == {"Active": 1, "Closed": 1}
+
+
+def test_delete_removes_empty_groups(repository):
+    repository.insert_risks([make_risk("r1"), make_risk("r2", category="Budget")])
+    # The repository has no delete method, so the row is removed directly
+    connection = repository._connection()
+    with connection:
+        connection.execute("DELETE FROM risks WHERE id = ?", ("r2",))
+    assert_rollups_match(repository)
+    assert [row["category"] for row in repository.rollup_counts(["category"])] == ["Technical"]
+
+
+def test_bulk_load_rebuilds_rollups(repository):
+    repository.insert_risks([make_risk("existing")])
+    written = load_risk_repository(repository, 5_000, PROJECTS, days_back=90, seed=3, chunk_size=1_000)
+    assert written == 5_000
+    assert_rollups_match(repository)
+
+    # Writes after the bulk load go through the recreated triggers again
+    frame = generate_risk_frame(200, PROJECTS, days_back=90, seed=3, id_offset=5_000)
+    repository.insert_frame(frame)
+    repository.update_status(frame["id"].iloc[0], "Closed")
+    assert_rollups_match(repository)
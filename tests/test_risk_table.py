@@ -0,0 +1,20 @@
+import pandas as pd
+
+from risk_table import RiskTable
+
+
+def test_building_a_table_leaves_the_callers_frame_unchanged():
+    frame = pd.DataFrame({
+        "id": ["R1", "R2"],
+        "project": ["Cloud Migration", "ERP Implementation"],
+        "category": ["Technical", "Financial"],
+        "level": ["High", "Low"],
+        "status": ["Active", "Closed"]
+    })
+    dtypes = frame.dtypes.copy()
+
+    table = RiskTable(frame)
+
+    assert frame.dtypes.equals(dtypes)
+    assert isinstance(table._frame["level"].dtype, pd.CategoricalDtype)
+    assert [row["id"] for row in table.filter(level="High")] == ["R1"]
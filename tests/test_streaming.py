@@ -0,0 +1,57 @@
+from streaming import ResponseStream
+
+FINAL = "Reporting Agent"
+
+
+def answer(stream: ResponseStream) -> str:
+    """The text left visible once every value has been rendered in place of the previous one."""
+    texts = list(stream.final_texts())
+    assert texts[-1] == stream.result
+    return texts[-1]
+
+
+def test_streams_only_final_answer_of_final_stage():
+    stream = ResponseStream(final_stage=FINAL)
+    stream.emit_token("Risk Scoring Agent", "Final Answer: scores")
+    stream.emit_token(FINAL, "Thought: summarise\nFinal Answer: ")
+    stream.emit_token(FINAL, "All clear.")
+    stream.finish("All clear.")
+    assert answer(stream) == "All clear."
+
+
+def test_retry_before_answer_drops_held_back_tokens():
+    stream = ResponseStream(final_stage=FINAL)
+    stream.emit_token(FINAL, "Thought: summarise\nFinal Ans")
+    stream.emit_restart(FINAL)
+    stream.emit_token(FINAL, "Thought: summarise\nFinal Answer: Two high risks.")
+    stream.finish("Two high risks.")
+    assert answer(stream) == "Two high risks."
+
+
+def test_retry_during_answer_does_not_repeat_tokens():
+    stream = ResponseStream(final_stage=FINAL)
+    stream.emit_token(FINAL, "Final Answer: Two high")
+    stream.emit_restart(FINAL)
+    stream.emit_token(FINAL, "Final Answer: Two high ")
+    stream.emit_token(FINAL, "risks.")
+    stream.finish("Two high risks.")
+
+    texts = list(stream.final_texts())
+    # The retried answer replaces the partial one instead of following it
+    assert texts == ["Two high", "Two high ", "Two high risks."]
+    assert texts[-1] == stream.result
+
+
+def test_cached_response_is_shown_once():
+    stream = ResponseStream(final_stage=FINAL)
+    stream.finish("Cached answer.")
+    assert list(stream.final_texts()) == ["Cached answer."]
+
+
+def test_retry_of_other_stage_is_ignored():
+    stream = ResponseStream(final_stage=FINAL)
+    stream.emit_token(FINAL, "Final Answer: Two")
+    stream.emit_restart("Market Analysis Agent")
+    stream.emit_token(FINAL, " high risks.")
+    stream.finish("Two high risks.")
+    assert answer(stream) == "Two high risks."
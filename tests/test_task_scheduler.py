@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+import pytest
+
+from task_scheduler import CONTEXT_SEPARATOR, TaskGraphScheduler
+
+
+class StubOutput:
+    def __init__(self, raw: str):
+        self.raw = raw
+
+
+class StubAgent:
+    def __init__(self, role: str, allow_delegation: bool = False):
+        self.role = role
+        self.allow_delegation = allow_delegation
+        self.tools: List[str] = []
+        self.crew = None
+
+    def get_delegation_tools(self, agents):
+        return [f"delegate to {agent.role}" for agent in agents]
+
+
+class StubTask:
+    """Has the parts of crewAI's Task the scheduler uses; work() produces the output."""
+
+    def __init__(self, name: str, context: Optional[list] = None, work: Optional[Callable[[], None]] = None,
+                 allow_delegation: bool = False):
+        self.name = name
+        self.agent = StubAgent(name, allow_delegation)
+        self.context = context or []
+        self.tools: List[str] = []
+        self.work = work
+        self.received_context = None
+        self.received_tools = None
+        self.started = None
+        self.finished = None
+
+    def execute_sync(self, agent, context=None, tools=None):
+        self.started = time.monotonic()
+        self.received_context = context
+        self.received_tools = tools
+        if self.work:
+            self.work()
+        self.finished = time.monotonic()
+        return StubOutput(f"{self.name} done")
+
+
+class StubCrew:
+    def __init__(self, tasks):
+        self.agents = [task.agent for task in tasks]
+
+
+def test_runs_tasks_in_dependency_order_with_independent_tasks_in_parallel():
+    # Both roots must be running at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    market = StubTask("market", work=barrier.wait)
+    status = StubTask("status", work=barrier.wait)
+    scoring = StubTask("scoring", context=[market, status])
+    report = StubTask("report", context=[scoring])
+    tasks = [market, status, scoring, report]
+
+    outputs = TaskGraphScheduler(max_concurrency=2).run(tasks)
+
+    assert [outputs[position].raw for position in range(4)] == ["market done", "status done", "scoring done", "report done"]
+    assert scoring.started >= max(market.finished, status.finished)
+    assert report.started >= scoring.finished
+    assert scoring.received_context == CONTEXT_SEPARATOR.join(["market done", "status done"])
+    assert report.received_context == "scoring done"
+    assert market.received_context is None
+
+
+def test_failure_cancels_pending_tasks_without_waiting_for_running_ones():
+    release = threading.Event()
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError("LLM unavailable")
+
+    slow = StubTask("slow", work=lambda: release.wait(5))
+    failing = StubTask("failing", work=fail)
+    queued = StubTask("queued")
+    dependent = StubTask("dependent", context=[failing])
+    completed = []
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="LLM unavailable"):
+        TaskGraphScheduler(max_concurrency=2).run(
+            [slow, failing, queued, dependent],
+            on_task_complete=lambda task, _: completed.append(task.name)
+        )
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 1.0
+    assert queued.started is None
+    assert dependent.started is None
+    assert completed == []
+
+
+def test_delegating_agent_gets_delegation_tools():
+    manager = StubTask("manager", allow_delegation=True)
+    worker = StubTask("worker")
+    crew = StubCrew([manager, worker])
+
+    TaskGraphScheduler().run([manager, worker], crew)
+
+    assert manager.received_tools == ["delegate to worker"]
+    assert worker.received_tools == []
+    assert manager.agent.crew is crew
+
+
+def test_crew_prepares_tools_when_it_can():
+    task = StubTask("analyst")
+    task.tools = ["risk_analysis_tool"]
+    crew = StubCrew([task])
+    crew._prepare_tools = lambda agent, prepared_task, tools: tools + [f"prepared for {agent.role}"]
+
+    TaskGraphScheduler().run([task], crew)
+
+    assert task.received_tools == ["risk_analysis_tool", "prepared for analyst"]
@@ -0,0 +1,57 @@
+import json
+
+from tool_output import encode, encode_tool_output, estimate_tokens, get_tool_output_stats, max_records, token_budget
+
+
+def strategies(count: int, per_risk: int):
+    return {
+        "project": "Cloud Migration",
+        "strategies": [
+            {
+                "risk_title": f"Risk {i}",
+                "mitigation_strategies": [f"Strategy {j} for risk {i}, described at some length" for j in range(per_risk)]
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def test_small_result_is_only_minified():
+    data = {"project": "Cloud Migration", "total_risks": 3}
+    text, omitted = encode(data, budget=100)
+    assert json.loads(text) == data
+    assert omitted == 0
+
+
+def test_nested_lists_are_cut_within_budget():
+    # Few risks, but each with many strategies: cutting only the outer list cannot fit the budget
+    data = strategies(count=2, per_risk=60)
+    text, omitted = encode(data, budget=200)
+
+    assert estimate_tokens(text) <= 200
+    assert omitted > 0
+    encoded = json.loads(text)
+    table = encoded["strategies"]
+    column = table["columns"].index("mitigation_strategies")
+    kept = [len(row[column]) for row in table["rows"]]
+    assert all(0 < count < 60 for count in kept)
+    assert omitted == 2 * 60 - sum(kept)
+
+
+def test_over_budget_result_is_counted_not_printed(capsys):
+    before = get_tool_output_stats()
+    text = encode_tool_output("mitigation_strategies_tool", {"fields": {f"field_{i}": i for i in range(2_000)}, "items": [1, 2]})
+    after = get_tool_output_stats()
+
+    assert after["calls"] == before["calls"] + 1
+    assert after["over_budget"] == before["over_budget"] + 1
+    assert json.loads(text)["items"] == [1]
+    assert capsys.readouterr().out == ""
+
+
+def test_max_records_covers_what_the_encoder_keeps():
+    data = strategies(500, 1)
+    limit = max_records("mitigation_strategies_tool", estimate_tokens(json.dumps(["Risk 0", []])))
+    text = encode_tool_output("mitigation_strategies_tool", data)
+    assert estimate_tokens(text) <= token_budget("mitigation_strategies_tool")
+    assert len(json.loads(text)["strategies"]["rows"]) <= limit
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from vector_sync import HashManifest, VectorSync, get_vector_sync
+
+
+class StubIndex:
+    """Records the calls VectorSync makes to a Pinecone-style or local index."""
+
+    def __init__(self, fail_on_call: int = 0):
+        self.upserts = []
+        self.deleted = []
+        self.fail_on_call = fail_on_call
+
+    def upsert(self, ids, vectors, metadatas, documents):
+        if len(self.upserts) + 1 == self.fail_on_call:
+            raise RuntimeError("index unavailable")
+        self.upserts.append(list(ids))
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+
+
+class StubEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(text))] for text in texts]
+
+
+def make_risks(count: int, title: str = "Risk"):
+    return [{"id": f"R{i}", "title": f"{title} {i}", "description": "", "project": "Cloud Migration"} for i in range(count)]
+
+
+def test_changed_risks_are_embedded_and_written_per_batch():
+    sync = VectorSync("local", HashManifest(), batch_size=4)
+    index = StubIndex()
+    embed = StubEmbedder()
+    read = []
+
+    def risks():
+        for risk in make_risks(10):
+            read.append(risk["id"])
+            # Each batch is written before the risks of the next one are read
+            assert len(read) <= sum(len(ids) for ids in index.upserts) + 4
+            yield risk
+
+    stats = sync.sync({"index": index}, risks(), embed_documents=embed)
+
+    assert embed.calls == [4, 4, 2]
+    assert index.upserts == [["R0", "R1", "R2", "R3"], ["R4", "R5", "R6", "R7"], ["R8", "R9"]]
+    assert stats == {"upserted": 10, "deleted": 0, "unchanged": 0}
+
+
+def test_resync_writes_only_changes_and_prunes_missing():
+    sync = VectorSync("local", HashManifest(), batch_size=4)
+    index = StubIndex()
+    embed = StubEmbedder()
+    sync.sync({"index": index}, make_risks(6), embed_documents=embed)
+
+    risks = make_risks(5)
+    risks[2]["title"] = "Changed"
+    index.upserts = []
+    stats = sync.sync({"index": index}, risks, embed_documents=embed, prune_missing=True)
+
+    assert index.upserts == [["R2"]]
+    assert index.deleted == ["R5"]
+    assert stats == {"upserted": 1, "deleted": 1, "unchanged": 4}
+    assert sync.plan(risks) == {"upserts": [], "deletes": [], "unchanged": 5}
+
+
+def test_failed_batch_keeps_written_batches_in_manifest(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    sync = VectorSync("local", HashManifest(path), batch_size=4)
+
+    with pytest.raises(RuntimeError, match="index unavailable"):
+        sync.sync({"index": StubIndex(fail_on_call=2)}, make_risks(10), embed_documents=StubEmbedder())
+
+    with open(path) as f:
+        assert sorted(json.load(f)) == ["R0", "R1", "R2", "R3"]
+    assert VectorSync("local", HashManifest(path)).plan(make_risks(10))["unchanged"] == 4
+
+
+def test_each_backend_gets_its_own_sync(tmp_path):
+    local = get_vector_sync("local", None)
+    chroma = get_vector_sync("chromadb", None)
+
+    assert local is get_vector_sync("local", None)
+    assert (local.db_type, chroma.db_type) == ("local", "chromadb")
+    assert local.manifest is not chroma.manifest
+    path = str(tmp_path / "sync_manifest.json")
+    assert get_vector_sync("local", path).manifest.path == path
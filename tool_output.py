@@ -0,0 +1,199 @@
+import json
+import threading
+from typing import Any, Dict, List, Tuple
+from config import TOOL_OUTPUT_TOKEN_BUDGETS, TOOL_OUTPUT_DEFAULT_TOKEN_BUDGET, TOOL_OUTPUT_MAX_TEXT_LENGTH
+
+# Rough characters per token for English text and JSON punctuation
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def minify(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def _is_records(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 1 and all(isinstance(item, dict) for item in value)
+
+def _shorten(value: Any, max_length: int) -> Any:
+    if isinstance(value, str) and len(value) > max_length:
+        return value[:max_length - 1] + "…"
+    if isinstance(value, list):
+        return [_shorten(item, max_length) for item in value]
+    if isinstance(value, dict):
+        return {key: _shorten(item, max_length) for key, item in value.items()}
+    return value
+
+def tabulate(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Encode a list of dicts as column names plus rows, so keys are written once."""
+    columns: List[str] = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    return {"columns": columns, "rows": [[record.get(column) for column in columns] for record in records]}
+
+def _compact(data: Any, max_text_length: int) -> Any:
+    """Shorten long strings and turn lists of records into tables, recursively."""
+    if _is_records(data):
+        return tabulate([_compact(record, max_text_length) for record in data])
+    if isinstance(data, dict):
+        return {key: _compact(value, max_text_length) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_compact(item, max_text_length) for item in data]
+    return _shorten(data, max_text_length)
+
+def _cap_lists(data: Any, keep: int) -> Tuple[Any, int]:
+    """
+    Cut every list, at any depth, to its first keep entries.
+
+    A dict's cut list gets a "<key>_omitted" marker next to it.
+
+    Returns:
+        Tuple of (capped data, number of list entries dropped)
+    """
+    if isinstance(data, list):
+        omitted = max(len(data) - keep, 0)
+        items = []
+        for item in data[:keep]:
+            item, dropped = _cap_lists(item, keep)
+            items.append(item)
+            omitted += dropped
+        return items, omitted
+    if isinstance(data, dict):
+        capped: Dict[str, Any] = {}
+        omitted = 0
+        for key, value in data.items():
+            capped[key], dropped = _cap_lists(value, keep)
+            omitted += dropped
+            if isinstance(value, list) and len(value) > keep:
+                capped[f"{key}_omitted"] = f"{len(value) - keep} more omitted"
+        return capped, omitted
+    return data, 0
+
+def _longest_list(data: Any) -> int:
+    if isinstance(data, list):
+        return max([len(data)] + [_longest_list(item) for item in data])
+    if isinstance(data, dict):
+        return max([0] + [_longest_list(value) for value in data.values()])
+    return 0
+
+def encode(data: Any, budget: int, max_text_length: int = TOOL_OUTPUT_MAX_TEXT_LENGTH) -> Tuple[str, int]:
+    """
+    Encode a tool result compactly within a token budget.
+
+    The result is minified, lists of records become tables and long strings
+    are shortened. If it is still over budget, every list at any depth
+    (such as each risk's mitigation strategies) is cut to its first k
+    entries, with k as large as the budget allows, and markers record how
+    many were dropped; tools list entries best first (by score or
+    relevance), so these are the top k. If even one entry per list is over
+    budget, that encoding is returned; callers can compare its size with
+    the budget.
+
+    Args:
+        data: JSON-serializable tool result
+        budget: Target size in estimated tokens
+        max_text_length: Longest string kept in full
+
+    Returns:
+        Tuple of (encoded text, number of list entries omitted)
+    """
+    text = minify(_compact(data, max_text_length))
+    longest = _longest_list(data)
+    if estimate_tokens(text) <= budget or longest <= 1:
+        return text, 0
+
+    def capped(keep: int) -> Tuple[str, int]:
+        trimmed, omitted = _cap_lists(data, keep)
+        return minify(_compact(trimmed, max_text_length)), omitted
+
+    # Binary search for the most entries per list that fit the budget
+    low, high = 1, longest - 1
+    best = capped(1)
+    while low <= high:
+        keep = (low + high) // 2
+        candidate = capped(keep)
+        if estimate_tokens(candidate[0]) <= budget:
+            best, low = candidate, keep + 1
+        else:
+            high = keep - 1
+    return best
+
+class ToolOutputStats:
+    """Running totals of tokens saved by compact tool output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.verbose_tokens = 0
+        self.compact_tokens = 0
+        self.omitted_entries = 0
+        self.over_budget = 0
+
+    def record(self, verbose_tokens: int, compact_tokens: int, omitted: int, over_budget: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.verbose_tokens += verbose_tokens
+            self.compact_tokens += compact_tokens
+            self.omitted_entries += omitted
+            self.over_budget += int(over_budget)
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "verbose_tokens": self.verbose_tokens,
+                "compact_tokens": self.compact_tokens,
+                "tokens_saved": self.verbose_tokens - self.compact_tokens,
+                "omitted_entries": self.omitted_entries,
+                "over_budget": self.over_budget
+            }
+
+_stats = ToolOutputStats()
+
+def get_tool_output_stats() -> Dict[str, int]:
+    return _stats.to_dict()
+
+def token_budget(tool_name: str) -> int:
+    """Return the token budget of a tool's output."""
+    return TOOL_OUTPUT_TOKEN_BUDGETS.get(tool_name, TOOL_OUTPUT_DEFAULT_TOKEN_BUDGET)
+
+def max_records(tool_name: str, min_record_tokens: int) -> int:
+    """
+    Return the most records a tool's output can hold, for tools that fetch their records with a LIMIT.
+
+    Args:
+        tool_name: Name of the tool, used to look up its budget
+        min_record_tokens: Fewest tokens one record takes once encoded
+
+    Returns:
+        An upper bound on the records the encoder keeps within the budget
+    """
+    return max(token_budget(tool_name) // max(min_record_tokens, 1), 1)
+
+def encode_tool_output(tool_name: str, data: Any) -> str:
+    """
+    Encode a tool's result for an agent prompt within the tool's token budget.
+
+    Plain-text results (such as "no risks found" messages) are returned unchanged.
+    Token savings, omitted entries and results left over budget are counted
+    in get_tool_output_stats().
+
+    Args:
+        tool_name: Name of the tool, used to look up its budget
+        data: The tool's result
+
+    Returns:
+        The compact encoding
+    """
+    if isinstance(data, str):
+        return data
+
+    budget = token_budget(tool_name)
+    text, omitted = encode(data, budget)
+
+    verbose_tokens = estimate_tokens(json.dumps(data, indent=2, default=str))
+    compact_tokens = estimate_tokens(text)
+    _stats.record(verbose_tokens, compact_tokens, omitted, over_budget=compact_tokens > budget)
+    return text
@@ -1,13 +1,17 @@
 from langchain.tools import BaseTool
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, Optional, Union
 import os
 import pandas as pd
 from datetime import datetime, timedelta
 import random
 from pydantic import BaseModel, Field
 from langchain_core.callbacks.manager import CallbackManagerForToolRun
-from data_handlers import get_project_data, query_risks_from_vector_db
+from data_handlers import get_project_data, search_risks, is_known_project, unknown_project_message
+from risk_store import get_risk_repository
+from risk_table import FilterValue, RiskTable
+from request_context import memoized_tool
+from tracing import traced_tool
+from tool_output import encode_tool_output, max_records
 from config import RISK_LEVELS, RISK_CATEGORIES, DEFAULT_PROJECTS
 
 class ProjectDataInput(BaseModel):
@@ -23,27 +27,36 @@ class ProjectInfoTool(BaseTool):
     """
     args_schema = ProjectDataInput
     
+    @traced_tool
+    @memoized_tool
     def _run(self, project_name: str, days_back: int = 30, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Get project information."""
         try:
-            # Get project data using the data handler
-            project_data = get_project_data(project_name, days_back)
-            
-            # Extract relevant project info
-            info = {
-                "name": project_name,
-                "status": project_data.get("status", "Unknown"),
-                "completion_percentage": project_data.get("completion_percentage", 0),
-                "budget_status": project_data.get("budget_status", "Unknown"),
-                "resource_utilization": project_data.get("resource_utilization", 0),
-                "start_date": project_data.get("start_date", "Unknown"),
-                "end_date": project_data.get("end_date", "Unknown"),
-                "key_metrics": project_data.get("key_metrics", {})
-            }
-            
-            return json.dumps(info, indent=2)
+            return encode_tool_output(self.name, self.collect(project_name, days_back))
         except Exception as e:
             return f"Error retrieving project information: {str(e)}"
+    
+    def collect(self, project_name: str, days_back: int = 30) -> Union[Dict[str, Any], str]:
+        """Return the result as plain data, or a message when there is nothing to report."""
+        if not is_known_project(project_name):
+            return unknown_project_message(project_name)
+        
+        # Get project data using the data handler
+        project_data = get_project_data(project_name, days_back)
+        
+        # Extract relevant project info
+        info = {
+            "name": project_name,
+            "status": project_data.get("status", "Unknown"),
+            "completion_percentage": project_data.get("completion_percentage", 0),
+            "budget_status": project_data.get("budget_status", "Unknown"),
+            "resource_utilization": project_data.get("resource_utilization", 0),
+            "start_date": project_data.get("start_date", "Unknown"),
+            "end_date": project_data.get("end_date", "Unknown"),
+            "key_metrics": project_data.get("key_metrics", {})
+        }
+        
+        return info
 
 class RiskAnalysisTool(BaseTool):
     """Tool for analyzing project risks."""
@@ -54,28 +67,64 @@ class RiskAnalysisTool(BaseTool):
     """
     args_schema = ProjectDataInput
     
+    @traced_tool
+    @memoized_tool
     def _run(self, project_name: str, days_back: int = 30, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Analyze project risks."""
         try:
-            # Get project data using the data handler
-            project_data = get_project_data(project_name, days_back)
-            
-            # Extract risk information
-            risks = project_data.get("risks", [])
-            risk_summary = {
-                "project": project_name,
-                "total_risks": len(risks),
-                "high_priority_risks": len([r for r in risks if r["level"] == "High"]),
-                "medium_priority_risks": len([r for r in risks if r["level"] == "Medium"]),
-                "low_priority_risks": len([r for r in risks if r["level"] == "Low"]),
-                "risk_trend": project_data.get("risk_trend", 0),
-                "top_risks": [r for r in risks if r["level"] == "High"][:3],
-                "risk_categories": project_data.get("risk_by_category", [])
-            }
-            
-            return json.dumps(risk_summary, indent=2)
+            return encode_tool_output(self.name, self.collect(project_name, days_back))
         except Exception as e:
             return f"Error analyzing project risks: {str(e)}"
+    
+    def collect(
+        self,
+        project_name: str,
+        days_back: int = 30,
+        category: FilterValue = None,
+        level: FilterValue = None,
+        status: FilterValue = None,
+        top_k: int = 3
+    ) -> Union[Dict[str, Any], str]:
+        """
+        Return the result as plain data, or a message when there is nothing to report.
+        
+        Args:
+            project_name: Project name or "All Projects"
+            days_back: Number of days of risks to include
+            category: Only count and rank risks in these categories
+            level: Only count and rank risks at these levels; without it, and without a category or
+                status filter, the top risks are the high-level ones if there are any
+            status: Only count and rank risks with these statuses
+            top_k: Number of top risks to return
+        """
+        if not is_known_project(project_name):
+            return unknown_project_message(project_name)
+        
+        # Get project data using the data handler
+        project_data = get_project_data(project_name, days_back)
+        
+        # Extract risk information
+        risks = RiskTable.from_records(project_data.get("risks", [])).filter(category=category, level=level, status=status)
+        level_counts = risks.count_by("level")
+        # An unfiltered ranking favours high-level risks; a filtered one ranks every level
+        ranked, ranked_level = risks, None
+        if level is None and category is None and status is None:
+            high_risks = risks.filter(level="High")
+            if len(high_risks):
+                ranked, ranked_level = high_risks, "High"
+        risk_summary = {
+            "project": project_name,
+            "total_risks": len(risks),
+            "high_priority_risks": level_counts.get("High", 0),
+            "medium_priority_risks": level_counts.get("Medium", 0),
+            "low_priority_risks": level_counts.get("Low", 0),
+            "risk_trend": project_data.get("risk_trend", 0),
+            "top_risks": ranked.top_k(top_k).to_records(),
+            "top_risks_level": ranked_level,
+            "risk_categories": project_data.get("risk_by_category", [])
+        }
+        
+        return risk_summary
 
 class MarketAnalysisTool(BaseTool):
     """Tool for analyzing market conditions relevant to project risks."""
@@ -86,25 +135,37 @@ class MarketAnalysisTool(BaseTool):
     """
     args_schema = ProjectDataInput
     
+    @traced_tool
+    @memoized_tool
     def _run(self, project_name: str, days_back: int = 30, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Analyze market conditions."""
         try:
-            # Get project data using the data handler
-            project_data = get_project_data(project_name, days_back)
-            
-            # Extract market information
-            market_info = {
-                "industry_trends": project_data.get("market_data", {}).get("industry_trends", []),
-                "economic_indicators": project_data.get("market_data", {}).get("economic_indicators", {}),
-                "competitor_activities": project_data.get("market_data", {}).get("competitor_activities", []),
-                "regulatory_changes": project_data.get("market_data", {}).get("regulatory_changes", []),
-                "technology_trends": project_data.get("market_data", {}).get("technology_trends", []),
-                "market_risk_impact": project_data.get("market_data", {}).get("market_risk_impact", "Medium")
-            }
-            
-            return json.dumps(market_info, indent=2)
+            return encode_tool_output(self.name, self.collect(project_name, days_back))
         except Exception as e:
             return f"Error analyzing market conditions: {str(e)}"
+    
+    def collect(self, project_name: str, days_back: int = 30) -> Union[Dict[str, Any], str]:
+        """Return the result as plain data, or a message when there is nothing to report."""
+        if not is_known_project(project_name):
+            return unknown_project_message(project_name)
+        
+        # Get project data using the data handler
+        project_data = get_project_data(project_name, days_back)
+        
+        # Extract market information
+        market_info = {
+            "industry_trends": project_data.get("market_data", {}).get("industry_trends", []),
+            "economic_indicators": project_data.get("market_data", {}).get("economic_indicators", {}),
+            "competitor_activities": project_data.get("market_data", {}).get("competitor_activities", []),
+            "regulatory_changes": project_data.get("market_data", {}).get("regulatory_changes", []),
+            "technology_trends": project_data.get("market_data", {}).get("technology_trends", []),
+            "market_risk_impact": project_data.get("market_data", {}).get("market_risk_impact", "Medium")
+        }
+        
+        return market_info
+
+# Fewest tokens one risk takes in the mitigation strategies output: its level, category, score and a short title
+MITIGATION_RECORD_MIN_TOKENS = 10
 
 class MitigationStrategiesTool(BaseTool):
     """Tool for generating risk mitigation strategies."""
@@ -114,41 +175,59 @@ class MitigationStrategiesTool(BaseTool):
     or for high-priority risks in a project.
     """
     
+    @traced_tool
+    @memoized_tool
     def _run(self, project_name: str, risk_category: Optional[str] = None, risk_level: Optional[str] = None, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Generate mitigation strategies."""
         try:
-            # Get project data
-            project_data = get_project_data(project_name, 30)
-            
-            # Filter risks based on category and level if provided
-            risks = project_data.get("risks", [])
-            if risk_category:
-                risks = [r for r in risks if r["category"] == risk_category]
-            if risk_level:
-                risks = [r for r in risks if r["level"] == risk_level]
-            
-            # If no risks match the criteria
-            if not risks:
-                return f"No risks found matching the specified criteria for project '{project_name}'."
-            
-            # Extract mitigation strategies
-            mitigation_info = {
-                "project": project_name,
-                "risk_count": len(risks),
-                "strategies": []
-            }
-            
-            for risk in risks:
-                mitigation_info["strategies"].append({
-                    "risk_title": risk["title"],
-                    "risk_level": risk["level"],
-                    "risk_category": risk["category"],
-                    "mitigation_strategies": risk["mitigation_strategies"]
-                })
-            
-            return json.dumps(mitigation_info, indent=2)
+            return encode_tool_output(self.name, self.collect(project_name, risk_category, risk_level))
         except Exception as e:
             return f"Error generating mitigation strategies: {str(e)}"
+    
+    def collect(self, project_name: str, risk_category: Optional[str] = None, risk_level: Optional[str] = None) -> Union[Dict[str, Any], str]:
+        """Return the result as plain data, or a message when there is nothing to report."""
+        if not is_known_project(project_name):
+            return unknown_project_message(project_name)
+        
+        # Query matching risks from the risk store, most severe first, within the window of the request's snapshot
+        window = get_project_data(project_name, 30)["window"]
+        filters = {
+            "project": window["projects"],
+            "since": window["since"],
+            "category": risk_category or None,
+            "level": risk_level or None
+        }
+        repository = get_risk_repository()
+        # The count comes from the rollups; only as many rows as the output budget can show are read
+        risk_count = sum(row["count"] for row in repository.rollup_counts(["level"], **filters))
+        
+        # If no risks match the criteria
+        if not risk_count:
+            return f"No risks found matching the specified criteria for project '{project_name}'."
+        
+        risks = repository.query_risks(
+            **filters,
+            order_by="score DESC, date_identified DESC",
+            limit=max_records(self.name, MITIGATION_RECORD_MIN_TOKENS)
+        )
+        
+        # Extract mitigation strategies
+        mitigation_info = {
+            "project": project_name,
+            "risk_count": risk_count,
+            "strategies": []
+        }
+        
+        for risk in risks:
+            mitigation_info["strategies"].append({
+                "risk_title": risk["title"],
+                "risk_level": risk["level"],
+                "risk_category": risk["category"],
+                "risk_score": risk["score"],
+                "mitigation_strategies": risk["mitigation_strategies"]
+            })
+        
+        return mitigation_info
 
 class ProjectComparisonTool(BaseTool):
     """Tool for comparing risks between multiple projects."""
@@ -158,37 +237,49 @@ class ProjectComparisonTool(BaseTool):
     Provide a comma-separated list of project names to compare.
     """
     
+    @traced_tool
+    @memoized_tool
     def _run(self, projects: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Compare risks between projects."""
         try:
-            # Parse project names from comma-separated string
-            project_list = [p.strip() for p in projects.split(",")]
-            
-            # Validate project names
-            valid_projects = [p for p in project_list if p in DEFAULT_PROJECTS or p == "All Projects"]
-            if not valid_projects:
-                return f"No valid projects found in the list: {projects}. Available projects are: {', '.join(DEFAULT_PROJECTS)}"
-            
-            # Get data for each project
-            comparison = {"projects": []}
-            
-            for project in valid_projects:
-                project_data = get_project_data(project, 30)
-                
-                project_info = {
-                    "name": project,
-                    "total_risks": len(project_data.get("risks", [])),
-                    "high_risks": len([r for r in project_data.get("risks", []) if r["level"] == "High"]),
-                    "risk_trend": project_data.get("risk_trend", 0),
-                    "top_risk_categories": [c["category"] for c in project_data.get("risk_by_category", [])[:3]],
-                    "mitigation_rate": project_data.get("mitigation_rate", 0)
-                }
-                
-                comparison["projects"].append(project_info)
-            
-            return json.dumps(comparison, indent=2)
+            return encode_tool_output(self.name, self.collect(projects))
         except Exception as e:
             return f"Error comparing projects: {str(e)}"
+    
+    def collect(self, projects: str) -> Union[Dict[str, Any], str]:
+        """Return the result as plain data, or a message when there is nothing to report."""
+        # Parse project names from comma-separated string
+        project_list = [p.strip() for p in projects.split(",")]
+        
+        # Validate project names
+        valid_projects = [p for p in project_list if is_known_project(p)]
+        if not valid_projects:
+            return f"No valid projects found in the list: {projects}. Available projects are: {', '.join(DEFAULT_PROJECTS)}"
+        
+        # Get data for each project
+        comparison = {"projects": []}
+        
+        for project in valid_projects:
+            # Counts are the snapshot's materialized rollups rather than a walk over every risk
+            project_data = get_project_data(project, 30)
+            risk_counts = project_data["risk_counts"]
+            category_counts: Dict[str, int] = {}
+            for row in project_data["risk_by_category"]:
+                category_counts[row["category"]] = category_counts.get(row["category"], 0) + row["count"]
+            top_categories = sorted(category_counts, key=lambda category: (-category_counts[category], category))
+            
+            project_info = {
+                "name": project,
+                "total_risks": risk_counts["total"],
+                "high_risks": risk_counts["by_level"].get("High", 0),
+                "risk_trend": project_data.get("risk_trend", 0),
+                "top_risk_categories": top_categories[:3],
+                "mitigation_rate": project_data.get("mitigation_rate", 0)
+            }
+            
+            comparison["projects"].append(project_info)
+        
+        return comparison
 
 class RiskSearchInput(BaseModel):
     query: str = Field(description="The semantic search query to find relevant risks")
@@ -200,30 +291,40 @@ class SemanticRiskSearchTool(BaseTool):
     name = "semantic_risk_search_tool"
     description = """
     Use this tool to semantically search for risks across projects based on natural language queries.
-    This tool uses a vector database to find risks that are semantically similar to the query.
+    This tool uses a vector database to find risks that are semantically similar to the query,
+    combined with keyword (BM25) ranking.
     """
     args_schema = RiskSearchInput
     
+    @traced_tool
+    @memoized_tool
     def _run(self, query: str, project_name: str, limit: int = 10, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Search for risks matching the semantic query."""
         try:
-            # Query the vector database
-            project = None if project_name == "All Projects" else project_name
-            results = query_risks_from_vector_db(query, project, limit)
-            
-            if not results:
-                return f"No risks found matching the query: '{query}' for project '{project_name}'."
-            
-            search_results = {
-                "query": query,
-                "project": project_name,
-                "total_results": len(results),
-                "risks": results
-            }
-            
-            return json.dumps(search_results, indent=2)
+            return encode_tool_output(self.name, self.collect(query, project_name, limit))
         except Exception as e:
             return f"Error searching for risks: {str(e)}"
+    
+    def collect(self, query: str, project_name: str, limit: int = 10) -> Union[Dict[str, Any], str]:
+        """Return the result as plain data, or a message when there is nothing to report."""
+        if not is_known_project(project_name):
+            return unknown_project_message(project_name)
+        
+        # Query the vector database, with BM25 keyword ranking as fallback and re-ranking signal
+        project = None if project_name == "All Projects" else project_name
+        results = search_risks(query, project, limit)
+        
+        if not results:
+            return f"No risks found matching the query: '{query}' for project '{project_name}'."
+        
+        search_results = {
+            "query": query,
+            "project": project_name,
+            "total_results": len(results),
+            "risks": results
+        }
+        
+        return search_results
 
 # Get all available tools
 def get_tools() -> List[BaseTool]:
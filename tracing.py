@@ -0,0 +1,311 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from config import TRACING_ENABLED, TRACE_HISTORY_SIZE, TRACE_MAX_SPANS
+from tool_output import estimate_tokens
+
+class Span:
+    """One timed operation inside a trace, with its nested child spans."""
+
+    __slots__ = ("name", "category", "start", "end", "thread_id", "thread_name", "attributes", "children")
+
+    def __init__(self, name: str, category: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.attributes = attributes
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes such as token counts or payload sizes."""
+        self.attributes.update(attributes)
+
+class _NullSpan:
+    """Stand-in returned when no trace is being recorded; ignores everything."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Trace:
+    """All spans recorded while handling one chat turn."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.root = Span(name, "trace", attributes)
+        self.span_count = 1
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+
+    def add_child(self, parent: Span, span: Span) -> bool:
+        # Tasks run on worker threads, so children can be added concurrently
+        with self._lock:
+            if self.span_count >= TRACE_MAX_SPANS:
+                self.dropped_spans += 1
+                return False
+            self.span_count += 1
+            parent.children.append(span)
+            return True
+
+    def spans(self) -> Iterator[tuple]:
+        """Yield (depth, span) for every span, depth first in start order."""
+        stack = [(0, self.root)]
+        while stack:
+            depth, span = stack.pop()
+            yield depth, span
+            for child in sorted(span.children, key=lambda child: child.start, reverse=True):
+                stack.append((depth + 1, child))
+
+    def summary(self) -> Dict[str, Any]:
+        """Total time and tokens, and time spent in each span category."""
+        by_category: Dict[str, float] = {}
+        tokens = {"prompt_tokens": 0, "completion_tokens": 0}
+        # Count only the outermost span of a category so nested ones are not counted twice
+        stack = [(self.root, frozenset())]
+        while stack:
+            span, enclosing = stack.pop()
+            if span.category == "llm":
+                for key in tokens:
+                    tokens[key] += span.attributes.get(key, 0)
+            if span.category not in enclosing and span.category != "trace":
+                by_category[span.category] = by_category.get(span.category, 0.0) + span.duration
+            stack.extend((child, enclosing | {span.category}) for child in span.children)
+        return {
+            "id": self.id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration": self.root.duration,
+            "spans": self.span_count,
+            "dropped_spans": self.dropped_spans,
+            "time_by_category": by_category,
+            **tokens
+        }
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Flatten the span tree into display rows, indented by depth."""
+        return [
+            {
+                "span": "  " * depth + span.name,
+                "category": span.category,
+                "start_ms": round((span.start - self.root.start) * 1000, 1),
+                "duration_ms": round(span.duration * 1000, 1),
+                "thread": span.thread_name,
+                "details": ", ".join(f"{key}={value}" for key, value in span.attributes.items())
+            }
+            for depth, span in self.spans()
+        ]
+
+    def to_chrome_events(self, pid: int) -> List[Dict[str, Any]]:
+        """Return the spans as Chrome trace "complete" events (microsecond timestamps)."""
+        offset = self.started_at - self.root.start
+        return [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start + offset) * 1_000_000),
+                "dur": round(span.duration * 1_000_000),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {key: value if isinstance(value, (int, float, bool)) else str(value) for key, value in span.attributes.items()}
+            }
+            for _, span in self.spans()
+        ]
+
+class Tracer:
+    """
+    Records nested spans for chat turns and keeps the most recent traces.
+
+    Spans are only recorded inside a trace started with trace(). Everywhere
+    else, and always while tracing is disabled, span() is a context variable
+    lookup that yields a shared no-op span, so instrumented hot paths cost
+    next to nothing. Spans follow the context into threads started with a
+    copy of it, as the streaming runner and task scheduler do.
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, history: int = TRACE_HISTORY_SIZE):
+        self.enabled = enabled
+        self._traces: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("trace_span", default=None)
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Record everything in the block as one trace.
+
+        Inside an active trace this nests as an ordinary span instead.
+        """
+        if self._current.get() is not None:
+            with self.span(name, "function", **attributes) as span:
+                yield span
+            return
+        if not self.enabled:
+            yield NULL_SPAN
+            return
+
+        trace = Trace(name, attributes)
+        with self._lock:
+            self._traces.append(trace)
+        token = self._current.set((trace, trace.root))
+        try:
+            yield trace.root
+        except BaseException as e:
+            trace.root.set(error=type(e).__name__)
+            raise
+        finally:
+            trace.root.end = time.perf_counter()
+            self._current.reset(token)
+
+    @contextmanager
+    def span(self, name: str, category: str = "function", **attributes: Any) -> Iterator[Any]:
+        """Time the block as a child of the current span, if a trace is active."""
+        current = self._current.get()
+        if current is None:
+            yield NULL_SPAN
+            return
+
+        trace, parent = current
+        span = Span(name, category, attributes)
+        if not trace.add_child(parent, span):
+            yield NULL_SPAN
+            return
+        token = self._current.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            self._current.reset(token)
+
+    def record(self, name: str, category: str, start: float, **attributes: Any) -> None:
+        """
+        Add an already finished span, from start (a time.perf_counter() value) until now.
+
+        Used where only the end of an operation can be observed, such as the
+        task callbacks of a sequential crew kickoff.
+        """
+        current = self._current.get()
+        if current is None:
+            return
+        trace, parent = current
+        span = Span(name, category, attributes)
+        span.start, span.end = start, time.perf_counter()
+        trace.add_child(parent, span)
+
+    def active(self) -> bool:
+        return self._current.get() is not None
+
+    def traces(self) -> List[Trace]:
+        """Return the recorded traces, most recent first."""
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+    def to_chrome_trace(self, traces: Optional[List[Trace]] = None) -> str:
+        """
+        Export traces in the Chrome trace event format.
+
+        The JSON can be opened in chrome://tracing or Perfetto.
+        """
+        pid = os.getpid()
+        events = []
+        for trace in (self.traces() if traces is None else traces):
+            events.extend(trace.to_chrome_events(pid))
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+_tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+def set_tracing_enabled(enabled: bool) -> None:
+    """Turn recording of new traces on or off; traces already running finish normally."""
+    _tracer.enabled = enabled
+
+def trace(name: str, **attributes: Any):
+    return _tracer.trace(name, **attributes)
+
+def span(name: str, category: str = "function", **attributes: Any):
+    return _tracer.span(name, category, **attributes)
+
+def payload_size(value: Any) -> Dict[str, int]:
+    """Describe the size of a result cheaply, without serializing it."""
+    if isinstance(value, str):
+        return {"chars": len(value), "tokens": estimate_tokens(value)}
+    if isinstance(value, dict):
+        risks = value.get("risks")
+        return {"keys": len(value), "risks": len(risks)} if risks is not None else {"keys": len(value)}
+    try:
+        return {"items": len(value)}
+    except TypeError:
+        return {}
+
+def _describe_arguments(args: tuple, kwargs: Dict[str, Any]) -> str:
+    # Only scalar arguments are shown; large payloads are summarized by type
+    def describe(value: Any) -> str:
+        if value is None or isinstance(value, (str, int, float, bool)):
+            text = repr(value)
+            return text if len(text) <= 80 else text[:77] + "..."
+        return type(value).__name__
+
+    return ", ".join(
+        [describe(arg) for arg in args]
+        + [f"{key}={describe(value)}" for key, value in kwargs.items() if key != "run_manager"]
+    )
+
+def traced(category: str = "data", name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a function so each call inside a trace is recorded as a span with its result size."""
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _tracer.active():
+                return function(*args, **kwargs)
+            with _tracer.span(span_name, category, arguments=_describe_arguments(args, kwargs)) as current:
+                result = function(*args, **kwargs)
+                current.set(**payload_size(result))
+                return result
+
+        return wrapper
+    return decorator
+
+def traced_tool(run: Callable[..., str]) -> Callable[..., str]:
+    """Decorate a tool's _run method so each call is recorded as a span with its arguments and output size."""
+
+    @functools.wraps(run)
+    def wrapper(self, *args: Any, **kwargs: Any) -> str:
+        if not _tracer.active():
+            return run(self, *args, **kwargs)
+        with _tracer.span(self.name, "tool", arguments=_describe_arguments(args, kwargs)) as current:
+            result = run(self, *args, **kwargs)
+            current.set(**payload_size(result))
+            return result
+
+    return wrapper
@@ -1,9 +1,9 @@
-import json
-import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import pandas as pd
-from config import CHAT_SAVE_PATH, RISK_LEVELS
+from config import RISK_LEVELS
+from risk_table import RiskTable
+from tracing import traced
 
 def format_chat_history(chat_history: List[Dict[str, str]]) -> str:
     """Format chat history into a string representation."""
@@ -14,36 +14,6 @@ def format_chat_history(chat_history: List[Dict[str, str]]) -> str:
         formatted += f"{role.upper()}: {content}\n\n"
     return formatted
 
-def save_chat_history(chat_history: List[Dict[str, str]]) -> None:
-    """Save chat history to a file."""
-    try:
-        with open(CHAT_SAVE_PATH, 'w') as f:
-            json.dump(chat_history, f)
-    except Exception as e:
-        print(f"Error saving chat history: {str(e)}")
-
-def load_chat_history() -> List[Dict[str, str]]:
-    """Load chat history from a file if it exists, otherwise return an empty list."""
-    try:
-        if os.path.exists(CHAT_SAVE_PATH):
-            with open(CHAT_SAVE_PATH, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading chat history: {str(e)}")
-    
-    # Return welcome message if chat history doesn't exist or there's an error
-    return [
-        {
-            "role": "assistant",
-            "content": """
-            👋 Welcome to the AI Project Risk Management System! I can help you identify, 
-            assess, and mitigate risks across your IT projects. You can ask me about specific 
-            projects, compare risk profiles between projects, or get recommendations for 
-            risk mitigation strategies. How can I assist you today?
-            """
-        }
-    ]
-
 def risk_level_from_score(score: float) -> str:
     """Convert a numerical risk score to a risk level string."""
     for level, data in RISK_LEVELS.items():
@@ -69,44 +39,57 @@ def format_timestamp(dt: datetime) -> str:
     """Format a datetime object into a human-readable string."""
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
-def generate_risk_report_summary(project_name: str, risks: List[Dict[str, Any]]) -> str:
+def risk_report_data(risks: Union[RiskTable, List[Dict[str, Any]]], critical_limit: int = 3) -> Dict[str, Any]:
+    """
+    Compute the figures behind a risk report summary.
+
+    Args:
+        risks: Risks to summarize
+        critical_limit: Number of high-level risks listed as needing attention
+
+    Returns:
+        Dictionary with the total, counts per level, non-zero category counts
+        (largest first) and the first high-level risks as plain dicts
+    """
+    risks = RiskTable.from_records(risks)
+    level_counts = risks.count_by("level")
+    
+    # Categories with at least one risk, highest count first
+    category_counts = [(category, count) for category, count in risks.count_by("category").items() if count > 0]
+    sorted_categories = sorted(category_counts, key=lambda x: x[1], reverse=True)
+    
+    return {
+        "total": len(risks),
+        "level_counts": {level: level_counts.get(level, 0) for level in RISK_LEVELS},
+        "category_counts": sorted_categories,
+        "critical_risks": risks.filter(level="High")[:critical_limit].to_records()
+    }
+
+@traced()
+def generate_risk_report_summary(project_name: str, risks: Union[RiskTable, List[Dict[str, Any]]]) -> str:
     """Generate a summary of the risk report for a project."""
     if not risks:
         return "No risks found matching the current filters."
     
-    # Count risks by level
-    high_risks = len([r for r in risks if r["level"] == "High"])
-    medium_risks = len([r for r in risks if r["level"] == "Medium"])
-    low_risks = len([r for r in risks if r["level"] == "Low"])
-    
-    # Get categories with highest risk count
-    categories = {}
-    for risk in risks:
-        category = risk["category"]
-        if category in categories:
-            categories[category] += 1
-        else:
-            categories[category] = 1
-    
-    sorted_categories = sorted(categories.items(), key=lambda x: x[1], reverse=True)
-    top_categories = sorted_categories[:3] if len(sorted_categories) >= 3 else sorted_categories
+    report = risk_report_data(risks)
+    level_counts = report["level_counts"]
+    top_categories = report["category_counts"][:3]
     
     # Generate summary
     summary = f"## Risk Summary for {project_name}\n\n"
-    summary += f"**Total Risks:** {len(risks)}\n\n"
+    summary += f"**Total Risks:** {report['total']}\n\n"
     summary += f"**Risk Breakdown:**\n"
-    summary += f"- High: {high_risks}\n"
-    summary += f"- Medium: {medium_risks}\n"
-    summary += f"- Low: {low_risks}\n\n"
+    summary += f"- High: {level_counts['High']}\n"
+    summary += f"- Medium: {level_counts['Medium']}\n"
+    summary += f"- Low: {level_counts['Low']}\n\n"
     
     summary += f"**Top Risk Categories:**\n"
     for category, count in top_categories:
         summary += f"- {category}: {count} risks\n"
     
     summary += f"\n**Critical Attention Required:**\n"
-    if high_risks > 0:
-        critical_risks = [r for r in risks if r["level"] == "High"]
-        for i, risk in enumerate(critical_risks[:3]):
+    if report["critical_risks"]:
+        for i, risk in enumerate(report["critical_risks"]):
             summary += f"{i + 1}. **{risk['title']}** - {risk['description'][:100]}...\n"
     else:
         summary += "No high-level risks identified at this time.\n"
@@ -0,0 +1,316 @@
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from config import (
+    VECTOR_DB_TYPE,
+    CHROMA_PERSIST_DIRECTORY,
+    CHROMA_PERSISTENT,
+    LOCAL_VECTOR_INDEX_DIRECTORY,
+    VECTOR_INDEX_MANIFEST_PATH,
+    VECTOR_SYNC_MANIFEST_PATH,
+    VECTOR_DATA_VERSION,
+    PINECONE_API_KEY,
+    PINECONE_ENVIRONMENT,
+    PINECONE_INDEX_NAME
+)
+
+# Names of the Chroma collections opened for every connection
+CHROMA_COLLECTIONS = {
+    "risks": "project_risks",
+    "projects": "projects",
+    "market": "market_data"
+}
+
+class VectorDBConnectionManager:
+    """
+    Process-wide owner of the vector database client and its collection handles.
+
+    The connection is created lazily on first use and then shared by every
+    Streamlit session and every tool call, so semantic searches reuse one
+    client (and, for in-memory Chroma, one store) instead of building a new
+    one per query.
+    """
+
+    def __init__(self, db_type: str = VECTOR_DB_TYPE, persistent: bool = CHROMA_PERSISTENT,
+                 manifest_path: str = VECTOR_INDEX_MANIFEST_PATH,
+                 local_directory: str = LOCAL_VECTOR_INDEX_DIRECTORY):
+        self.db_type = db_type
+        self.persistent = persistent
+        self.manifest_path = manifest_path
+        self.local_directory = local_directory
+        self._connection: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        # Manifest for stores that do not outlive the process (in-memory Chroma)
+        self._memory_manifest: Optional[Dict[str, Any]] = None
+        self.connected_at: Optional[float] = None
+
+    def get_connection(self) -> Dict[str, Any]:
+        """
+        Return the shared connection, creating it on first use.
+
+        Returns:
+            Dictionary with "client" and "collections" (Chroma) or "index" (Pinecone),
+            or {"disabled": True} when the vector database is unavailable
+        """
+        connection = self._connection
+        if connection is not None:
+            return connection
+
+        with self._lock:
+            if self._connection is None:
+                self._connection = self._connect()
+                self.connected_at = time.time()
+            return self._connection
+
+    def _connect(self) -> Dict[str, Any]:
+        if self.db_type == "none":
+            print("Vector database functionality is disabled")
+            return {"disabled": True}
+        elif self.db_type == "chromadb":
+            return self._connect_chromadb()
+        elif self.db_type == "pinecone":
+            return self._connect_pinecone()
+        elif self.db_type == "local":
+            return self._connect_local()
+        else:
+            print(f"Unsupported vector database type: {self.db_type}")
+            return {"disabled": True}
+
+    def _connect_chromadb(self) -> Dict[str, Any]:
+        try:
+            import chromadb
+            from chromadb.config import Settings
+        except ImportError:
+            print("ChromaDB not installed. Please install it with 'pip install chromadb'")
+            return {"disabled": True}
+
+        if self.persistent:
+            # Open (or create) the on-disk index so a restart keeps what was embedded
+            os.makedirs(CHROMA_PERSIST_DIRECTORY, exist_ok=True)
+            client = chromadb.PersistentClient(
+                path=CHROMA_PERSIST_DIRECTORY,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        else:
+            client = chromadb.Client(Settings(is_persistent=False))
+
+        # Create collections if they don't exist
+        try:
+            collections = {
+                key: client.get_or_create_collection(name)
+                for key, name in CHROMA_COLLECTIONS.items()
+            }
+        except Exception as e:
+            print(f"Error creating ChromaDB collections: {str(e)}")
+            return {"disabled": True}
+
+        return {
+            "type": "chromadb",
+            "client": client,
+            "collections": collections
+        }
+
+    def _connect_pinecone(self) -> Dict[str, Any]:
+        try:
+            import pinecone
+        except ImportError:
+            print("Pinecone not installed. Please install it with 'pip install pinecone-client'")
+            return {"disabled": True}
+
+        pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
+
+        # Check if index exists, if not this would error in a real implementation
+        # but for demo purposes we'll just return the index
+        index = pinecone.Index(PINECONE_INDEX_NAME)
+        return {
+            "type": "pinecone",
+            "client": pinecone,
+            "index": index
+        }
+
+    def _connect_local(self) -> Dict[str, Any]:
+        from local_vector_index import LocalVectorIndex
+
+        index = LocalVectorIndex(self.local_directory)
+        return {
+            "type": "local",
+            "client": index,
+            "index": index
+        }
+
+    def is_connected(self) -> bool:
+        """Return True if a live (non-disabled) connection has been created."""
+        connection = self._connection
+        return connection is not None and not connection.get("disabled", False)
+
+    def health_check(self) -> Dict[str, Any]:
+        """
+        Check that the shared connection is usable.
+
+        Returns:
+            Dictionary with "healthy", "backend", latency in milliseconds and an optional error
+        """
+        connection = self.get_connection()
+        status = {"backend": self.db_type, "healthy": False, "latency_ms": None, "error": None}
+
+        if connection.get("disabled"):
+            status["error"] = "disabled"
+            return status
+
+        started = time.perf_counter()
+        try:
+            if self.db_type == "chromadb":
+                connection["client"].heartbeat()
+                for collection in connection["collections"].values():
+                    collection.count()
+            elif self.db_type == "pinecone":
+                connection["index"].describe_index_stats()
+            elif self.db_type == "local":
+                connection["index"].count()
+            status["healthy"] = True
+        except Exception as e:
+            status["error"] = str(e)
+        status["latency_ms"] = (time.perf_counter() - started) * 1000
+        return status
+
+    def outlives_process(self) -> bool:
+        """Return True if the store keeps its data across restarts, so manifests belong on disk."""
+        return self.db_type in ("pinecone", "local") or (self.db_type == "chromadb" and self.persistent)
+
+    def sync_manifest_path(self) -> Optional[str]:
+        """
+        Return where the vector sync keeps its hash manifest, or None if the store does not outlive the process.
+
+        The local index keeps it in its own directory, so removing the index
+        also forgets what was synced into it. Other backends use one file per
+        backend, so switching backends triggers a full sync.
+        """
+        if not self.outlives_process():
+            return None
+        if self.db_type == "local":
+            return os.path.join(self.local_directory, "sync_manifest.json")
+        root, extension = os.path.splitext(VECTOR_SYNC_MANIFEST_PATH)
+        return f"{root}_{self.db_type}{extension}"
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Return the manifest describing what is currently indexed, if any."""
+        if not self.outlives_process():
+            return self._memory_manifest
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading vector index manifest: {str(e)}")
+            return None
+
+    def write_manifest(self, record_count: int, data_version: str = VECTOR_DATA_VERSION, **details: Any) -> None:
+        """
+        Record what was just indexed.
+
+        Args:
+            record_count: Number of risk records written to the index
+            data_version: Version stamp of the indexed data
+            details: Extra fields stored alongside, e.g. the projects indexed
+        """
+        connection = self._connection
+        if connection and not connection.get("disabled", False):
+            # Duplicate ids collapse on insert, so record what the store actually holds
+            if self.db_type == "chromadb":
+                record_count = connection["collections"]["risks"].count()
+            elif self.db_type == "local":
+                record_count = connection["index"].count()
+
+        manifest = {
+            "backend": self.db_type,
+            "data_version": data_version,
+            "record_count": record_count,
+            "indexed_at": datetime.now().isoformat(timespec="seconds"),
+            **details
+        }
+        if not self.outlives_process():
+            self._memory_manifest = manifest
+            return
+
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def index_is_current(self, data_version: str = VECTOR_DATA_VERSION) -> bool:
+        """
+        Return True if the risk index already holds data_version, so population can be skipped.
+
+        For Chroma and the local index the manifest's record count is also
+        checked against the store, which catches an index directory that was
+        wiped or partially written.
+        """
+        connection = self.get_connection()
+        if connection.get("disabled"):
+            return False
+
+        manifest = self.read_manifest()
+        if not manifest or manifest.get("data_version") != data_version:
+            return False
+        if manifest.get("backend", self.db_type) != self.db_type:
+            return False
+
+        try:
+            if self.db_type == "chromadb":
+                return connection["collections"]["risks"].count() == manifest.get("record_count")
+            if self.db_type == "local":
+                return connection["index"].count() == manifest.get("record_count")
+        except Exception as e:
+            print(f"Error checking vector index: {str(e)}")
+            return False
+        return True
+
+    def reconnect(self) -> Dict[str, Any]:
+        """Drop the current connection and open a new one."""
+        self.shutdown()
+        return self.get_connection()
+
+    def shutdown(self) -> None:
+        """Release the client and collection handles."""
+        with self._lock:
+            connection = self._connection
+            self._connection = None
+            self.connected_at = None
+
+        if not connection or connection.get("disabled"):
+            return
+
+        client = connection.get("client")
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing vector database client: {str(e)}")
+
+_manager = VectorDBConnectionManager()
+
+def get_vector_db_manager() -> VectorDBConnectionManager:
+    """Return the process-wide vector database connection manager."""
+    return _manager
+
+def set_vector_db_manager(manager: VectorDBConnectionManager) -> VectorDBConnectionManager:
+    """
+    Replace the process-wide connection manager, e.g. with one over a benchmark index.
+
+    Returns:
+        The manager that was in use before
+    """
+    global _manager
+    previous, _manager = _manager, manager
+    return previous
+
+atexit.register(_manager.shutdown)
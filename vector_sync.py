@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from config import VECTOR_SYNC_BATCH_SIZE
+
+def chunked(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    """Yield successive slices of items with at most size elements each."""
+    size = max(int(size), 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def risk_text(risk: Dict[str, Any]) -> str:
+    """Return the text that is embedded for a risk."""
+    return f"{risk.get('title', '')} {risk.get('description', '')}"
+
+def chroma_record(risk: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the document and metadata stored in Chroma for a risk."""
+    return {
+        "document": json.dumps(risk),
+        "metadata": {
+            "project": risk.get("project", "Unknown"),
+            "category": risk.get("category", "Unknown"),
+            "level": risk.get("level", "Unknown"),
+            "score": str(risk.get("score", 0))
+        }
+    }
+
+def pinecone_record(risk: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the embedded text and metadata stored in Pinecone for a risk."""
+    return {
+        "document": risk_text(risk),
+        "metadata": {
+            "project": risk.get("project", "Unknown"),
+            "category": risk.get("category", "Unknown"),
+            "level": risk.get("level", "Unknown"),
+            "score": risk.get("score", 0),
+            "data": json.dumps(risk)
+        }
+    }
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Return a stable hash of a record's embedded text and metadata."""
+    payload = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class HashManifest:
+    """
+    Map of record id to content hash for everything written to the vector store.
+
+    With a path the manifest is kept in a JSON file next to the index;
+    without one it only lives as long as the process, matching an
+    in-memory store.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._hashes = json.load(f)
+            except Exception as e:
+                print(f"Error loading vector sync manifest: {str(e)}")
+
+    def get(self, record_id: str) -> Optional[str]:
+        return self._hashes.get(record_id)
+
+    def ids(self) -> List[str]:
+        return list(self._hashes.keys())
+
+    def update(self, hashes: Dict[str, str]) -> None:
+        with self._lock:
+            self._hashes.update(hashes)
+
+    def remove(self, record_ids: Iterable[str]) -> None:
+        with self._lock:
+            for record_id in record_ids:
+                self._hashes.pop(record_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hashes = {}
+
+    def save(self) -> None:
+        """Write the manifest atomically; a no-op for in-memory manifests."""
+        if not self.path:
+            return
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self._hashes, f)
+            os.replace(temp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+class VectorSync:
+    """
+    Incremental writer for the risk collection of the vector store.
+
+    Every risk is hashed over exactly what would be written (embedded text
+    plus metadata). Only ids whose hash is new or different are re-embedded
+    and upserted, and ids that were tombstoned are deleted, so a re-sync
+    costs time proportional to what changed.
+    """
+
+    def __init__(self, db_type: str, manifest: HashManifest, batch_size: int = VECTOR_SYNC_BATCH_SIZE):
+        self.db_type = db_type
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+    def _record(self, risk: Dict[str, Any]) -> Dict[str, Any]:
+        if self.db_type in ("pinecone", "local"):
+            return pinecone_record(risk)
+        return chroma_record(risk)
+
+    def _changed_batches(self, risks: Iterable[Dict[str, Any]], seen: Set[str],
+                         counts: Dict[str, int]) -> Iterator[List[Tuple[str, Tuple[Dict[str, Any], str]]]]:
+        """
+        Hash risks as they stream in and yield the changed ones in batches.
+
+        Args:
+            risks: Current risk dictionaries
+            seen: Filled with the id of every risk read
+            counts: Its "unchanged" entry is incremented for every risk whose hash matches the manifest
+
+        Yields:
+            Lists of at most batch_size (id, (record, hash)) pairs
+        """
+        size = max(int(self.batch_size), 1)
+        batch: List[Tuple[str, Tuple[Dict[str, Any], str]]] = []
+        for risk in risks:
+            risk = dict(risk)
+            record = self._record(risk)
+            digest = content_hash(record)
+            seen.add(risk["id"])
+            if self.manifest.get(risk["id"]) == digest:
+                counts["unchanged"] += 1
+                continue
+            batch.append((risk["id"], (record, digest)))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _deletes(self, deleted_ids: Optional[Iterable[str]], prune_missing: bool, seen: Set[str]) -> List[str]:
+        """Return the ids to delete once every current risk has been seen."""
+        deletes = set(deleted_ids or [])
+        if prune_missing:
+            deletes.update(record_id for record_id in self.manifest.ids() if record_id not in seen)
+        deletes.difference_update(seen)
+        return sorted(deletes)
+
+    def plan(self, risks: Iterable[Dict[str, Any]], deleted_ids: Optional[Iterable[str]] = None,
+             prune_missing: bool = False) -> Dict[str, Any]:
+        """
+        Work out which records need writing or deleting, without touching the store.
+
+        Args:
+            risks: Current risk dictionaries
+            deleted_ids: Ids of risks that were removed and must be deleted from the store
+            prune_missing: Treat risks as the full register and delete every known id not in it
+
+        Returns:
+            Dictionary with the "upserts" and "deletes" ids and the "unchanged" count
+        """
+        seen: Set[str] = set()
+        counts = {"unchanged": 0}
+        upserts = [record_id for batch in self._changed_batches(risks, seen, counts) for record_id, _ in batch]
+        return {
+            "upserts": upserts,
+            "deletes": self._deletes(deleted_ids, prune_missing, seen),
+            "unchanged": counts["unchanged"]
+        }
+
+    def sync(self, vector_db: Dict[str, Any], risks: Iterable[Dict[str, Any]],
+             deleted_ids: Optional[Iterable[str]] = None, prune_missing: bool = False,
+             embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None) -> Dict[str, int]:
+        """
+        Bring the vector store in line with the given risks.
+
+        Changed risks are embedded and written one batch at a time as they
+        are read, so memory stays bounded by the batch size however many
+        risks changed.
+
+        Args:
+            vector_db: Connection handle from the vector DB connection manager
+            risks: Current risk dictionaries
+            deleted_ids: Ids of tombstoned risks to delete
+            prune_missing: Treat risks as the full register and delete every known id not in it
+            embed_documents: Embedding function for Pinecone and the local index; defaults to the cached embedding service
+
+        Returns:
+            Counts of "upserted", "deleted" and "unchanged" records
+        """
+        with self._lock:
+            seen: Set[str] = set()
+            counts = {"unchanged": 0}
+            upserted = 0
+            deletes: List[str] = []
+
+            try:
+                for batch in self._changed_batches(risks, seen, counts):
+                    if self.db_type == "chromadb":
+                        self._upsert_chroma(vector_db, batch)
+                    elif self.db_type in ("pinecone", "local"):
+                        if embed_documents is None:
+                            from embeddings import get_embedding_service
+                            embed_documents = get_embedding_service().embed_documents
+                        vectors = embed_documents([record["document"] for _, (record, _) in batch])
+                        embedded = {record_id: values for (record_id, _), values in zip(batch, vectors)}
+                        if self.db_type == "pinecone":
+                            self._upsert_pinecone(vector_db, batch, embedded)
+                        else:
+                            self._upsert_local(vector_db, batch, embedded)
+                    self.manifest.update({record_id: digest for record_id, (_, digest) in batch})
+                    upserted += len(batch)
+
+                deletes = self._deletes(deleted_ids, prune_missing, seen)
+                for batch in chunked(deletes, self.batch_size):
+                    if self.db_type == "chromadb":
+                        vector_db["collections"]["risks"].delete(ids=list(batch))
+                    elif self.db_type in ("pinecone", "local"):
+                        vector_db["index"].delete(ids=list(batch))
+                    self.manifest.remove(batch)
+            finally:
+                # Saved once, but also when a batch fails, so a retry skips the batches already written
+                if upserted or deletes:
+                    self.manifest.save()
+
+            return {
+                "upserted": upserted,
+                "deleted": len(deletes),
+                "unchanged": counts["unchanged"]
+            }
+
+    @staticmethod
+    def _upsert_chroma(vector_db: Dict[str, Any], batch: Sequence[Any]) -> None:
+        vector_db["collections"]["risks"].upsert(
+            ids=[record_id for record_id, _ in batch],
+            documents=[record["document"] for _, (record, _) in batch],
+            metadatas=[record["metadata"] for _, (record, _) in batch]
+        )
+
+    @staticmethod
+    def _upsert_pinecone(vector_db: Dict[str, Any], batch: Sequence[Any], embedded: Dict[str, List[float]]) -> None:
+        vector_db["index"].upsert(vectors=[
+            {"id": record_id, "values": embedded[record_id], "metadata": record["metadata"]}
+            for record_id, (record, _) in batch
+        ])
+
+    @staticmethod
+    def _upsert_local(vector_db: Dict[str, Any], batch: Sequence[Any], embedded: Dict[str, List[float]]) -> None:
+        vector_db["index"].upsert(
+            ids=[record_id for record_id, _ in batch],
+            vectors=[embedded[record_id] for record_id, _ in batch],
+            metadatas=[record["metadata"] for _, (record, _) in batch],
+            documents=[record["metadata"]["data"] for _, (record, _) in batch]
+        )
+
+_vector_syncs: Dict[Tuple[str, Optional[str]], VectorSync] = {}
+_vector_sync_lock = threading.Lock()
+
+def get_vector_sync(db_type: str, manifest_path: Optional[str]) -> VectorSync:
+    """
+    Return the process-wide VectorSync for a backend.
+
+    One instance is kept per (db_type, manifest_path), so switching the
+    vector DB manager to another backend also switches record format and
+    manifest.
+
+    Args:
+        db_type: Vector database backend
+        manifest_path: File keeping the hash manifest, or None for a store that does not outlive the process
+    """
+    key = (db_type, manifest_path)
+    with _vector_sync_lock:
+        if key not in _vector_syncs:
+            _vector_syncs[key] = VectorSync(db_type, HashManifest(manifest_path))
+        return _vector_syncs[key]
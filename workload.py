@@ -0,0 +1,223 @@
+import argparse
+import json
+import time
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from config import DEFAULT_PROJECTS, RISK_CATEGORIES, RISK_LEVELS, RISK_TITLES
+from risk_store import RISK_COLUMNS, RiskRepository
+from risk_table import RISK_STATUSES, RiskTable
+
+# Relative frequency of each risk category
+CATEGORY_WEIGHTS = {
+    "Resource": 14, "Schedule": 16, "Budget": 12, "Technical": 15, "Quality": 9, "Scope": 8,
+    "Communication": 6, "External": 5, "Vendor": 5, "Regulatory": 3, "Market": 3, "Security": 4
+}
+
+# Probability and impact ratings (1-5) lean towards the middle of the scale
+RATING_WEIGHTS = np.array([0.15, 0.25, 0.3, 0.2, 0.1])
+
+# Mean age in days of identified risks; newer risks are more common
+RISK_AGE_SCALE = 60
+
+# Chance that a risk of a given age (days) has been closed or mitigated grows towards this ceiling
+RESOLVED_CEILING = 0.8
+RESOLVED_HALF_LIFE = 45
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+def project_names(count: int) -> List[str]:
+    """Return count project names, starting with the default projects."""
+    names = list(DEFAULT_PROJECTS[:count])
+    names.extend(f"Project {i:05d}" for i in range(len(names), count))
+    return names
+
+def _level_codes(scores: np.ndarray) -> np.ndarray:
+    """Map risk scores to indexes into RISK_LEVELS using its thresholds."""
+    thresholds = np.array([data["threshold"] for data in RISK_LEVELS.values()])
+    return np.minimum(np.searchsorted(thresholds, scores, side="left"), len(thresholds) - 1)
+
+def generate_risk_frame(
+    count: int,
+    projects: Sequence[str],
+    days_back: int = 365,
+    seed: int = 0,
+    end_date: Optional[date] = None,
+    id_offset: int = 0
+) -> pd.DataFrame:
+    """
+    Generate synthetic risks with vectorized NumPy sampling.
+
+    Projects follow a Zipf-like size distribution. Scores come from
+    probability × impact, and levels from the RISK_LEVELS thresholds.
+    Identification dates are skewed towards the recent past, and older risks
+    are more often closed or mitigated. Ids are unique across frames generated
+    with the same seed and non-overlapping id ranges.
+
+    Args:
+        count: Number of risks
+        projects: Project names to spread the risks over
+        days_back: Risks are identified within this many days before end_date
+        seed: Random seed; the same arguments always give the same frame
+        end_date: Most recent identification date (default today)
+        id_offset: Index of the first risk, used to keep ids unique across chunks
+
+    Returns:
+        DataFrame with the RISK_COLUMNS columns, mitigation_strategies JSON-encoded
+    """
+    rng = np.random.default_rng([seed, id_offset])
+    end_date = end_date or datetime.now().date()
+    projects = np.asarray(projects, dtype=object)
+
+    project_weights = 1.0 / np.arange(1, len(projects) + 1) ** 0.8
+    project_codes = rng.choice(len(projects), size=count, p=project_weights / project_weights.sum())
+
+    category_weights = np.array([CATEGORY_WEIGHTS.get(category, 1) for category in RISK_CATEGORIES], dtype=float)
+    category_codes = rng.choice(len(RISK_CATEGORIES), size=count, p=category_weights / category_weights.sum())
+    title_codes = rng.integers(0, len(RISK_TITLES), size=count)
+
+    probability = rng.choice(5, size=count, p=RATING_WEIGHTS) + 1
+    impact = rng.choice(5, size=count, p=RATING_WEIGHTS) + 1
+    score = np.clip(probability * impact * 4 + rng.integers(-3, 4, size=count), 1, 100)
+    level_codes = _level_codes(score)
+
+    age = np.minimum(rng.exponential(RISK_AGE_SCALE, size=count).astype(np.int64), days_back - 1)
+    resolved_chance = RESOLVED_CEILING * (1 - 0.5 ** (age / RESOLVED_HALF_LIFE))
+    resolved = rng.random(count) < resolved_chance
+    # Resolved risks are Mitigated or Closed; open ones are Active or Monitoring
+    status_codes = np.where(resolved, rng.choice([1, 3], size=count), rng.choice([0, 2], size=count, p=[0.7, 0.3]))
+
+    levels = np.array(list(RISK_LEVELS.keys()), dtype=object)
+    categories = np.array(RISK_CATEGORIES, dtype=object)
+    titles = np.array([f"{category} {title}" for category in RISK_CATEGORIES for title in RISK_TITLES], dtype=object)
+    description_prefixes = np.array(
+        [f"This is a {level.lower()}-level risk related to {category.lower()} for " for level in levels for category in categories],
+        dtype=object
+    )
+    strategies = np.array(
+        [json.dumps([f"Strategy {i} for {category} risk" for i in range(1, 4)]) for category in RISK_CATEGORIES],
+        dtype=object
+    )
+    day_strings = np.datetime_as_string(np.datetime64(end_date, "D") - np.arange(days_back), unit="D").astype(object)
+
+    ids = f"SYN-{seed}-" + pd.Series(np.arange(id_offset, id_offset + count)).astype(str).str.zfill(10)
+
+    frame = pd.DataFrame({
+        "id": ids.to_numpy(dtype=object),
+        "project": projects[project_codes],
+        "title": titles[category_codes * len(RISK_TITLES) + title_codes],
+        "description": description_prefixes[level_codes * len(categories) + category_codes] + projects[project_codes] + ".",
+        "category": categories[category_codes],
+        "level": levels[level_codes],
+        "score": score.astype(np.int64),
+        "probability": probability.astype(np.int64),
+        "impact": impact.astype(np.int64),
+        "date_identified": day_strings[age],
+        "status": np.array(RISK_STATUSES, dtype=object)[status_codes],
+        "mitigation_strategies": strategies[category_codes]
+    })
+    return frame[RISK_COLUMNS]
+
+def iter_risk_frames(
+    count: int,
+    projects: Sequence[str],
+    days_back: int = 365,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    end_date: Optional[date] = None
+) -> Iterator[pd.DataFrame]:
+    """Generate count risks as a sequence of frames of at most chunk_size rows."""
+    for offset in range(0, count, chunk_size):
+        yield generate_risk_frame(min(chunk_size, count - offset), projects, days_back, seed, end_date, offset)
+
+def generate_risk_table(count: int, projects: Sequence[str], days_back: int = 365, seed: int = 0) -> RiskTable:
+    """Generate synthetic risks straight into a columnar RiskTable."""
+    frames = list(iter_risk_frames(count, projects, days_back, seed))
+    return RiskTable(pd.concat(frames, ignore_index=True) if frames else None)
+
+def load_risk_repository(
+    repository: RiskRepository,
+    count: int,
+    projects: Sequence[str],
+    days_back: int = 365,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Generate synthetic risks and bulk insert them into a risk repository.
+
+    Returns:
+        Number of risks written
+    """
+    written = 0
+    with repository.bulk_load():
+        for frame in iter_risk_frames(count, projects, days_back, seed, chunk_size):
+            written += repository.insert_frame(frame)
+    return written
+
+def generate_trend_frame(projects: Sequence[str], days_back: int, seed: int = 0, end_date: Optional[date] = None) -> pd.DataFrame:
+    """
+    Generate daily risk-score trends for many projects at once.
+
+    Each project follows the same momentum random walk as
+    generate_mock_trend_data: a daily variation in [-5, 8] is added to a base
+    score that itself drifts by a fifth of each variation, clipped to [10, 95].
+
+    Returns:
+        DataFrame with date, risk_score and project columns
+    """
+    rng = np.random.default_rng(seed)
+    end_date = end_date or datetime.now().date()
+    days = days_back + 1
+    base = rng.integers(30, 71, size=(len(projects), 1)).astype(float)
+    variation = rng.integers(-5, 9, size=(len(projects), days))
+    drift = np.cumsum(variation * 0.2, axis=1) - variation * 0.2
+    scores = np.clip(base + drift + variation, 10, 95)
+
+    dates = np.datetime_as_string(np.datetime64(end_date, "D") - np.arange(days_back, -1, -1), unit="D")
+    return pd.DataFrame({
+        "date": np.tile(dates, len(projects)),
+        "risk_score": scores.ravel(),
+        "project": np.repeat(np.asarray(projects, dtype=object), days)
+    })
+
+def generate_risk_by_category_frame(projects: Sequence[str], seed: int = 0) -> pd.DataFrame:
+    """
+    Generate risk counts by category and level for many projects at once.
+
+    As in generate_mock_risk_by_category, 70% of categories have risks and
+    60% of levels within those have 1-5 risks.
+
+    Returns:
+        DataFrame with category, level, count and project columns
+    """
+    rng = np.random.default_rng(seed)
+    levels = list(RISK_LEVELS.keys())
+    shape = (len(projects), len(RISK_CATEGORIES), len(levels))
+    present = (rng.random(shape[:2]) > 0.3)[:, :, None] & (rng.random(shape) > 0.4)
+    counts = rng.integers(1, 6, size=shape)
+    project_codes, category_codes, level_codes = np.nonzero(present)
+    return pd.DataFrame({
+        "category": np.asarray(RISK_CATEGORIES, dtype=object)[category_codes],
+        "level": np.asarray(levels, dtype=object)[level_codes],
+        "count": counts[present],
+        "project": np.asarray(projects, dtype=object)[project_codes]
+    })
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load synthetic risks into a risk store for scale testing.")
+    parser.add_argument("--risks", type=int, default=1_000_000, help="Number of risks to generate")
+    parser.add_argument("--projects", type=int, default=1000, help="Number of projects")
+    parser.add_argument("--days-back", type=int, default=365, help="Spread of identification dates in days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", default="synthetic_risks.db", help="SQLite file to write, or :memory:")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    repository = RiskRepository(args.db)
+    written = load_risk_repository(repository, args.risks, project_names(args.projects), args.days_back, args.seed)
+    print(f"Wrote {written} risks for {args.projects} projects to {args.db} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()